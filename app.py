@@ -1,117 +1,263 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
-from models import db, Task, FocusTime, UserRecommendation, CrawledData
-from ml_model import FocusTimePredictor
+from models import db, Task, FocusTime, UserRecommendation, CrawledData, CrawlRun, CrawledStats, DailyStats, SchedulerLease, task_tags, TASK_FIELDS
+from ml_model import FocusTimePredictor, FEATURE_NAMES, BACKENDS
+from features import TrainingSetBuilder
+from tuning import tune, DEFAULT_GRID
+from trainer import TrainingWorker
+from model_store import ModelStore
+from rollup import (task_snapshot, record_task_change, record_focus_session, rebuild_daily_stats,
+                    window_summary, window_tag_counts)
+from feature_stats import user_feature_stats, crawled_feature_stats, encode_tag
+from tagging import sync_task_tags, tag_filter, migrate_task_tags
+from versioning import bump_version, get_version, get_versions
+from changelog import record_task_changes, task_changes
+from cache import TTLCache
+from validators import validate_task_data, validate_scenarios
+from batch import apply_task_batch, MAX_BATCH_SIZE
+from ordering import next_order_index, bulk_set_order, move_task, ORDER_GAP
+from retention import RetentionEngine, build_policies
 from crawler import TimeManagementCrawler
-from datetime import datetime, timedelta
+from ingest import ingest_crawled, backfill_content_hashes
+from crawl_stats import crawled_summary, crawled_breakdown, rebuild_crawled_stats
+from storage import init_storage, analytics_reads, DEFAULT_SQLITE_PRAGMAS
+from leader import LeaderElection, FileLock, DatabaseLease
+from events import bus, format_event
+from serialization import FastJSONProvider, compress_response, rows_to_dicts, loads
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.base import JobLookupError
+import atexit
+import click
+import numpy as np
+import hashlib
 import json
 import os
-import numpy as np
+import threading
 
 app = Flask(__name__)
 CORS(app)
 
 # 配置数据库
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 每个引擎的连接池大小（SQLite文件数据库和PostgreSQL）
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+app.config['DB_POOL_TIMEOUT'] = 30
+# 分析查询使用单独的只读引擎（DATABASE_READ_URL可指向PostgreSQL只读副本，默认与主库相同）
+app.config['DB_ANALYTICS_ENGINE'] = True
+app.config['DB_ANALYTICS_POOL_SIZE'] = 5
+app.config['DATABASE_READ_URL'] = os.environ.get('DATABASE_READ_URL')
+# SQLite连接参数（WAL、busy_timeout等，见storage.DEFAULT_SQLITE_PRAGMAS）
+app.config['SQLITE_PRAGMAS'] = dict(DEFAULT_SQLITE_PRAGMAS)
+
+# 数据保留策略（覆盖retention.DEFAULT_POLICIES中的配置）和每批删除的行数
+app.config['RETENTION_POLICIES'] = {}
+app.config['RETENTION_CHUNK_SIZE'] = 1000
+
+# 推荐结果缓存的容量和过期时间（秒）
+app.config['RECOMMENDATION_CACHE_SIZE'] = 128
+app.config['RECOMMENDATION_CACHE_TTL'] = 60
+
+# 模型后端：forest（随机森林，定期全量重训）或 online（递推最小二乘，每条专注记录增量更新）
+app.config['MODEL_BACKEND'] = os.environ.get('MODEL_BACKEND', 'forest')
+# 每多少条专注记录提交一次全量重训（0表示不定期重训，只适用于online后端）
+app.config['MODEL_REFIT_EVERY'] = 10
+# 在线模型的遗忘因子，以及每多少次增量更新保存一次模型
+app.config['ONLINE_FORGETTING'] = 0.99
+app.config['ONLINE_SAVE_EVERY'] = 10
+
+# 爬虫数据源（类型见 crawler.SOURCE_TYPES）和抓取参数
+app.config['CRAWL_SOURCES'] = [{'type': 'pomodoro'}, {'type': 'productivity'}]
+app.config['CRAWL_CACHE_DIR'] = 'crawl_cache'
+app.config['CRAWL_MAX_WORKERS'] = 4
+app.config['CRAWL_RATE_LIMIT'] = 1.0  # 每个主机每秒最多请求数
+app.config['CRAWL_RETRIES'] = 3
+app.config['CRAWL_TIMEOUT'] = 10
+# 爬虫数据最多保留的条数
+app.config['CRAWL_MAX_ROWS'] = 200
+# 预测特征中的爬虫数据平均值是否只取与用户主要标签相同分类的数据（该分类没有数据时使用全部数据）
+app.config['CRAWLED_FEATURES_BY_TAG'] = False
+
+# 一次增量同步最多返回的变更任务数，超过时客户端重新加载完整列表
+app.config['TASK_CHANGES_MAX'] = 1000
+
+# 事件流（/api/stream）：每个连接的事件队列长度、心跳间隔（秒）
+app.config['STREAM_QUEUE_SIZE'] = 100
+app.config['STREAM_KEEPALIVE'] = 15
+# 每个工作进程的WSGI线程数（serve.py按--threads设置，默认8）。每个事件流连接在连接期间占用一个线程，
+# 每个进程的连接数最多为线程数的四分之一（少于4个线程时不提供事件流），其余线程留给普通请求；
+# STREAM_MAX_CLIENTS可以进一步调低该上限。
+# 开发服务器（python app.py、flask run）每个请求新建线程，没有设置WEB_THREADS时不按线程数限制
+_dev_server = __name__ == '__main__' or os.environ.get('FLASK_RUN_FROM_CLI') == 'true'
+if os.environ.get('WEB_THREADS'):
+    app.config['WEB_THREADS'] = int(os.environ['WEB_THREADS'])
+else:
+    app.config['WEB_THREADS'] = None if _dev_server else 8
+app.config['STREAM_MAX_CLIENTS'] = int(os.environ['STREAM_MAX_CLIENTS']) if os.environ.get('STREAM_MAX_CLIENTS') else None
+
+# 响应压缩：大于COMPRESS_MIN_SIZE字节的JSON/文本响应按Accept-Encoding使用brotli（已安装时）或gzip压缩
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 6  # gzip压缩级别
+app.config['COMPRESS_BR_QUALITY'] = 4  # brotli压缩级别
 
-db.init_app(app)
+# 批量推荐一次最多预测的场景数
+app.config['RECOMMENDATION_BATCH_MAX'] = 500
+
+# 模型存储目录和保留的版本数
+app.config['MODEL_STORE_DIR'] = os.environ.get('MODEL_STORE_DIR', 'model_store')
+app.config['MODEL_STORE_KEEP'] = 5
+# 多进程部署时每隔多少秒检查并加载其他进程保存的新模型（0表示不检查）
+app.config['MODEL_SYNC_INTERVAL'] = 30
+
+# 定时任务的主进程选举：file（同一主机上的文件锁）、lease（数据库租约，可跨主机）或 off（不选举，只用于单进程）
+app.config['SCHEDULER_ELECTION'] = os.environ.get('SCHEDULER_ELECTION', 'file')
+app.config['SCHEDULER_LOCK_FILE'] = os.environ.get('SCHEDULER_LOCK_FILE')  # 默认为实例目录下的scheduler.lock
+app.config['SCHEDULER_LEASE_TTL'] = 60  # 租约有效期（秒），主进程每次选举检查时续约
+app.config['SCHEDULER_ELECTION_INTERVAL'] = 15  # 选举检查间隔（秒）
+
+init_storage(app, db)
+
+# jsonify使用orjson序列化（datetime输出ISO格式，支持NumPy类型）
+app.json = FastJSONProvider(app)
+
+@app.after_request
+def compress(response):
+    """按Accept-Encoding压缩较大的响应"""
+    return compress_response(
+        response, request.accept_encodings,
+        min_size=app.config['COMPRESS_MIN_SIZE'],
+        level=app.config['COMPRESS_LEVEL'],
+        br_quality=app.config['COMPRESS_BR_QUALITY']
+    )
 
 # 初始化模型和爬虫
-ml_predictor = FocusTimePredictor()
-crawler = TimeManagementCrawler()
+model_store = ModelStore(app.config['MODEL_STORE_DIR'], keep=app.config['MODEL_STORE_KEEP'])
+
+def new_predictor():
+    """按配置的模型后端创建预测器（有同一后端的调优结果时使用调优选出的参数）"""
+    params = {'backend': app.config['MODEL_BACKEND'], 'forgetting': app.config['ONLINE_FORGETTING']}
+    tuned = model_store.read_config()
+    if tuned and tuned.get('backend', 'forest') == params['backend']:
+        params.update(tuned)
+    return FocusTimePredictor(**params)
 
-# 定时任务：每天爬取数据
+ml_predictor = new_predictor()
+training_set_builder = TrainingSetBuilder(window_days=14)
+crawler = TimeManagementCrawler(
+    sources=app.config['CRAWL_SOURCES'],
+    cache_dir=app.config['CRAWL_CACHE_DIR'],
+    max_workers=app.config['CRAWL_MAX_WORKERS'],
+    rate_limit=app.config['CRAWL_RATE_LIMIT'],
+    retries=app.config['CRAWL_RETRIES'],
+    timeout=app.config['CRAWL_TIMEOUT']
+)
+
+# 后台调度器：每个进程都在create_app中启动（执行模型训练），定时任务只添加到选举出的主进程
 scheduler = BackgroundScheduler()
-scheduler.start()
+
+# 推荐结果缓存：以相关数据表的版本号和模型版本为键，写入后自动失效
+recommendation_cache = TTLCache(
+    maxsize=app.config['RECOMMENDATION_CACHE_SIZE'],
+    ttl=app.config['RECOMMENDATION_CACHE_TTL']
+)
+
+# 推荐结果依赖的数据表
+RECOMMENDATION_TABLES = ('tasks', 'focus_times', 'crawled_data', 'user_recommendations')
+
+def stream_client_limit():
+    """每个进程的事件流连接数上限（线程数的四分之一，不超过STREAM_MAX_CLIENTS）
+
+    线程数不限（开发服务器）时只受STREAM_MAX_CLIENTS限制，未设置时为100。
+    """
+    limit = app.config['WEB_THREADS'] // 4 if app.config['WEB_THREADS'] is not None else 100
+    if app.config['STREAM_MAX_CLIENTS'] is not None:
+        limit = min(limit, app.config['STREAM_MAX_CLIENTS'])
+    return max(limit, 0)
+
+# 事件流：写接口提交后发布到进程内的事件总线，每个连接一个有界队列
+bus.queue_size = app.config['STREAM_QUEUE_SIZE']
+bus.max_subscribers = stream_client_limit()
+
+# 事件流心跳时检查版本号的数据表（其他工作进程的写入不经过本进程的事件总线）
+STREAM_TABLES = ('tasks', 'focus_times')
+
+# 数据保留引擎：分批删除过期数据
+retention_engine = RetentionEngine(
+    build_policies(app.config['RETENTION_POLICIES']),
+    chunk_size=app.config['RETENTION_CHUNK_SIZE']
+)
 
 def cleanup_crawled_data(max_count=200):
     """清理爬虫数据，保留最新的max_count条"""
     try:
-        current_count = CrawledData.query.count()
-        if current_count > max_count:
-            delete_count = current_count - max_count
-            # 按爬取时间升序排列，获取最旧的数据
-            old_data = CrawledData.query.order_by(CrawledData.crawled_at.asc()).limit(delete_count).all()
-            for old_item in old_data:
-                db.session.delete(old_item)
-            db.session.commit()
-            print(f"清理爬虫数据：删除了 {delete_count} 条最旧的数据，保留最新的 {max_count} 条")
-            return delete_count
-        return 0
+        policy = retention_engine.policies['crawled_data']
+        report = retention_engine.run_policy(policy, max_rows=max_count)
+        if report['deleted']:
+            print(f"清理爬虫数据：删除了 {report['deleted']} 条最旧的数据，保留最新的 {max_count} 条")
+        return report['deleted']
     except Exception as e:
         db.session.rollback()
         print(f"清理爬虫数据错误: {e}")
         return 0
 
 def scheduled_crawl():
-    """定时爬取任务"""
+    """定时爬取任务（去重后批量入库并淘汰超出上限的旧数据，一个事务完成）"""
     with app.app_context():
         try:
+            started_at = datetime.utcnow()
             data = crawler.crawl_all()
-            
-            # 添加新数据
-            for item in data:
-                crawled = CrawledData(
-                    source=item['source'],
-                    duration=item['duration'],
-                    category=item['category'],
-                    efficiency=item['efficiency'],
-                    raw_data=item['raw_data']
-                )
-                db.session.add(crawled)
-            
-            db.session.commit()
-            
-            # 添加新数据后，清理多余的数据（保留最新的200条）
-            cleanup_crawled_data(max_count=200)
-            
-            final_count = CrawledData.query.count()
-            print(f"爬取完成，获得 {len(data)} 条数据，当前数据库中共有 {final_count} 条爬虫数据")
+            run = ingest_crawled(
+                data,
+                max_rows=app.config['CRAWL_MAX_ROWS'],
+                report=crawler.engine.last_report,
+                started_at=started_at
+            )
+            print(f"爬取完成，获得 {run.fetched_count} 条数据：新增 {run.new_count} 条，"
+                  f"重复 {run.duplicate_count} 条，淘汰 {run.evicted_count} 条旧数据")
         except Exception as e:
             db.session.rollback()
             print(f"定时爬取错误: {e}")
 
-# 每天凌晨2点执行爬取
-scheduler.add_job(scheduled_crawl, 'cron', hour=2, minute=0)
-
 def cleanup_old_data():
-    """清理14天前的数据"""
+    """按保留策略清理过期数据（默认14天）"""
     with app.app_context():
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=14)
-            
-            # 删除14天前的任务（已完成且超过14天）
-            old_tasks = Task.query.filter(
-                Task.status == 'completed',
-                Task.completed_at < cutoff_date
-            ).all()
-            for task in old_tasks:
-                db.session.delete(task)
-            
-            # 删除14天前的专注时间记录
-            old_focus_times = FocusTime.query.filter(
-                FocusTime.start_time < cutoff_date
-            ).all()
-            for ft in old_focus_times:
-                db.session.delete(ft)
-            
-            # 删除14天前的推荐记录（保留最新的）
-            old_recommendations = UserRecommendation.query.filter(
-                UserRecommendation.created_at < cutoff_date
-            ).all()
-            for rec in old_recommendations:
-                db.session.delete(rec)
-            
-            db.session.commit()
-            print(f"数据清理完成，删除了 {len(old_tasks)} 个任务和 {len(old_focus_times)} 条专注时间记录")
+            reports = retention_engine.run(['tasks', 'focus_times', 'user_recommendations', 'crawl_runs',
+                                            'task_changes'])
+            deleted = {report['table']: report['deleted'] for report in reports}
+            print(f"数据清理完成，删除了 {deleted['tasks']} 个任务和 {deleted['focus_times']} 条专注时间记录")
         except Exception as e:
             db.session.rollback()
             print(f"数据清理错误: {e}")
 
-# 每天凌晨3点执行数据清理
-scheduler.add_job(cleanup_old_data, 'cron', hour=3, minute=0)
+# 只在主进程中运行的定时任务：任务ID -> (函数, cron参数)
+SCHEDULED_JOBS = {
+    'scheduled_crawl': (scheduled_crawl, {'hour': 2, 'minute': 0}),  # 每天凌晨2点执行爬取
+    'cleanup_old_data': (cleanup_old_data, {'hour': 3, 'minute': 0}),  # 每天凌晨3点执行数据清理
+}
+
+def run_startup_jobs():
+    """成为主进程后执行一次数据清理和爬取"""
+    cleanup_old_data()
+    with app.app_context():
+        cleanup_crawled_data(max_count=app.config['CRAWL_MAX_ROWS'])
+    scheduled_crawl()
+
+def start_scheduled_jobs():
+    """被选为主进程：添加定时任务，并在后台执行一次启动任务"""
+    for job_id, (func, trigger) in SCHEDULED_JOBS.items():
+        scheduler.add_job(func, 'cron', id=job_id, replace_existing=True, **trigger)
+    scheduler.add_job(run_startup_jobs, id='startup_jobs', replace_existing=True)
+
+def stop_scheduled_jobs():
+    """失去主进程身份：移除定时任务"""
+    for job_id in SCHEDULED_JOBS:
+        try:
+            scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
 
 # ============ 任务管理API ============
 
@@ -120,14 +266,139 @@ def index():
     """主页"""
     return render_template('index.html')
 
+def parse_datetime(value):
+    """解析ISO格式的时间，带时区的时间转换为UTC后去掉时区（数据库中存储UTC时间），格式错误时抛出ValueError"""
+    if not isinstance(value, str):
+        raise ValueError('时间必须是ISO格式的字符串')
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_datetime_arg(name):
+    """解析ISO格式的时间查询参数"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return parse_datetime(value)
+
 @app.route('/api/tasks', methods=['GET'])
 def get_tasks():
-    """获取所有任务"""
+    """获取任务列表
+
+    过滤: status, priority, tag, created_after, created_before
+    分页: limit, cursor（按order_index的游标分页，不传limit时返回全部）
+    字段: fields=id,title,status
+    根据任务表版本号生成ETag，数据未变化时返回304。
+    返回的version用于之后通过 /api/tasks/changes 增量同步。
+    """
+    try:
+        # 数据未变化时直接返回304，不查询任务表
+        version = get_version('tasks')
+        args_key = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        etag = hashlib.md5(f"{version}?{args_key}".encode()).hexdigest()
+        # 压缩后的响应使用弱ETag，按弱比较匹配
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        fields = TASK_FIELDS
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            invalid = [f for f in fields if f not in TASK_FIELDS]
+            if invalid or not fields:
+                return jsonify({'success': False, 'error': f"无效的字段: {', '.join(invalid)}"}), 400
+        
+        query = db.session.query(*[getattr(Task, f) for f in fields], Task.order_index, Task.id)
+        
+        status = request.args.get('status')
+        if status:
+            if status not in ['pending', 'completed']:
+                return jsonify({'success': False, 'error': '状态必须是pending或completed'}), 400
+            query = query.filter(Task.status == status)
+        
+        priority = request.args.get('priority')
+        if priority:
+            if priority not in ['1', '2', '3']:
+                return jsonify({'success': False, 'error': '优先级必须是1、2或3'}), 400
+            query = query.filter(Task.priority == int(priority))
+        
+        tag = request.args.get('tag', '').strip()
+        if tag:
+            query = query.filter(tag_filter(tag))
+        
+        try:
+            created_after = parse_datetime_arg('created_after')
+            created_before = parse_datetime_arg('created_before')
+        except ValueError:
+            return jsonify({'success': False, 'error': '时间格式必须是ISO格式'}), 400
+        if created_after:
+            query = query.filter(Task.created_at >= created_after)
+        if created_before:
+            query = query.filter(Task.created_at < created_before)
+        
+        limit = request.args.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'limit必须是整数'}), 400
+            if limit < 1 or limit > 1000:
+                return jsonify({'success': False, 'error': 'limit必须在1-1000之间'}), 400
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_order, cursor_id = [int(part) for part in cursor.split(':')]
+            except ValueError:
+                return jsonify({'success': False, 'error': '无效的cursor'}), 400
+            query = query.filter(db.or_(
+                Task.order_index > cursor_order,
+                db.and_(Task.order_index == cursor_order, Task.id > cursor_id)
+            ))
+        
+        query = query.order_by(Task.order_index.asc(), Task.id.asc())
+        if limit is not None:
+            query = query.limit(limit + 1)
+        rows = query.all()
+        
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f'{rows[-1][-2]}:{rows[-1][-1]}'
+        
+        # datetime由orjson直接序列化为ISO格式
+        result = {'success': True, 'data': rows_to_dicts(fields, rows), 'version': version}
+        if limit is not None:
+            result['next_cursor'] = next_cursor
+        
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/tasks/changes', methods=['GET'])
+def get_task_changes():
+    """获取版本号since之后修改和删除的任务（增量同步）
+
+    返回 {"version": 当前版本号, "reset": 是否需要重新加载完整列表,
+          "upserts": [新增或修改的任务], "deletes": [删除的任务ID]}
+    """
     try:
-        tasks = Task.query.order_by(Task.order_index.asc()).all()
+        since = request.args.get('since')
+        try:
+            since = int(since)
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'error': 'since必须是整数'}), 400
+        if since < 0:
+            return jsonify({'success': False, 'error': 'since不能为负数'}), 400
+        
         return jsonify({
             'success': True,
-            'data': [task.to_dict() for task in tasks]
+            'data': task_changes(since, max_changes=app.config['TASK_CHANGES_MAX'])
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -142,36 +413,18 @@ def create_task():
         data = request.json
         
         # 数据验证
-        title = data.get('title', '').strip()
-        if not title:
-            return jsonify({'success': False, 'error': '任务标题不能为空'}), 400
-        if len(title) > 200:
-            return jsonify({'success': False, 'error': '任务标题不能超过200个字符'}), 400
-        
-        priority = data.get('priority', 1)
-        if priority not in [1, 2, 3]:
-            return jsonify({'success': False, 'error': '优先级必须是1、2或3'}), 400
-        
-        tags = data.get('tags', '').strip()
-        if len(tags) > 500:
-            return jsonify({'success': False, 'error': '标签总长度不能超过500个字符'}), 400
-        
-        description = data.get('description', '').strip()
-        if len(description) > 2000:
-            return jsonify({'success': False, 'error': '任务描述不能超过2000个字符'}), 400
-        
-        # 获取当前最大order_index
-        max_order = db.session.query(db.func.max(Task.order_index)).scalar() or 0
-        
-        task = Task(
-            title=title,
-            description=description,
-            priority=priority,
-            tags=tags,
-            order_index=max_order + 1
-        )
+        values, error = validate_task_data(data)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        # 排在最后，与其他任务保持ORDER_GAP的间隔
+        task = Task(order_index=next_order_index(), **values)
         
         db.session.add(task)
+        sync_task_tags(task)
+        db.session.flush()
+        record_task_change(None, task_snapshot(task))
+        record_task_changes(upserts=[task.id])
         db.session.commit()
         
         return jsonify({
@@ -187,49 +440,32 @@ def update_task(task_id):
     """更新任务"""
     try:
         task = Task.query.get_or_404(task_id)
+        old_snapshot = task_snapshot(task)
         
         if not request.json:
             return jsonify({'success': False, 'error': '请求数据不能为空'}), 400
         
         data = request.json
         
-        # 更新字段并验证
-        if 'title' in data:
-            title = data['title'].strip() if isinstance(data['title'], str) else ''
-            if not title:
-                return jsonify({'success': False, 'error': '任务标题不能为空'}), 400
-            if len(title) > 200:
-                return jsonify({'success': False, 'error': '任务标题不能超过200个字符'}), 400
-            task.title = title
-        
-        if 'description' in data:
-            description = data['description'].strip() if isinstance(data['description'], str) else ''
-            if len(description) > 2000:
-                return jsonify({'success': False, 'error': '任务描述不能超过2000个字符'}), 400
-            task.description = description
-        
-        if 'priority' in data:
-            priority = data['priority']
-            if priority not in [1, 2, 3]:
-                return jsonify({'success': False, 'error': '优先级必须是1、2或3'}), 400
-            task.priority = priority
+        # 验证并更新字段
+        values, error = validate_task_data(data, partial=True)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         
-        if 'tags' in data:
-            tags = data['tags'].strip() if isinstance(data['tags'], str) else ''
-            if len(tags) > 500:
-                return jsonify({'success': False, 'error': '标签总长度不能超过500个字符'}), 400
-            task.tags = tags
+        for field, value in values.items():
+            setattr(task, field, value)
         
-        if 'status' in data:
-            status = data['status']
-            if status not in ['pending', 'completed']:
-                return jsonify({'success': False, 'error': '状态必须是pending或completed'}), 400
-            task.status = status
-            if status == 'completed' and not task.completed_at:
+        if 'tags' in values:
+            sync_task_tags(task)
+        
+        if 'status' in values:
+            if values['status'] == 'completed' and not task.completed_at:
                 task.completed_at = datetime.utcnow()
-            elif status == 'pending':
+            elif values['status'] == 'pending':
                 task.completed_at = None
         
+        record_task_change(old_snapshot, task_snapshot(task))
+        record_task_changes(upserts=[task.id])
         db.session.commit()
         
         return jsonify({
@@ -245,7 +481,9 @@ def delete_task(task_id):
     """删除任务"""
     try:
         task = Task.query.get_or_404(task_id)
+        record_task_change(task_snapshot(task), None)
         db.session.delete(task)
+        record_task_changes(deletes=[task_id])
         db.session.commit()
         
         return jsonify({'success': True})
@@ -253,6 +491,48 @@ def delete_task(task_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/tasks/batch', methods=['POST'])
+def batch_tasks():
+    """批量创建/更新/删除任务（单个事务）
+
+    请求体: {"operations": [{"op": "create", "data": {...}},
+                            {"op": "update", "id": 1, "data": {...}},
+                            {"op": "delete", "id": 2}],
+             "atomic": false}
+    """
+    try:
+        if not request.json:
+            return jsonify({'success': False, 'error': '请求数据不能为空'}), 400
+        
+        data = request.json
+        operations = data.get('operations')
+        if not operations or not isinstance(operations, list):
+            return jsonify({'success': False, 'error': '操作列表不能为空且必须是数组'}), 400
+        if len(operations) > MAX_BATCH_SIZE:
+            return jsonify({'success': False, 'error': f'单次最多{MAX_BATCH_SIZE}个操作'}), 400
+        
+        atomic = data.get('atomic', False)
+        if not isinstance(atomic, bool):
+            return jsonify({'success': False, 'error': 'atomic必须是布尔值'}), 400
+        results, applied = apply_task_batch(operations, atomic=atomic)
+        failed = sum(1 for result in results if not result['success'])
+        
+        if atomic and failed:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': '存在无效的操作，未执行任何操作', 'data': results}), 400
+        
+        if applied:
+            db.session.commit()
+        
+        return jsonify({
+            'success': failed == 0,
+            'failed': failed,
+            'data': results
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/tasks/reorder', methods=['POST'])
 def reorder_tasks():
     """重新排序任务"""
@@ -272,20 +552,62 @@ def reorder_tasks():
         except (ValueError, TypeError):
             return jsonify({'success': False, 'error': '任务ID必须是整数'}), 400
         
-        # 更新每个任务的order_index
-        updated_count = 0
-        for index, task_id in enumerate(task_ids):
-            task = Task.query.get(task_id)
-            if task:
-                task.order_index = index
-                updated_count += 1
+        # 用一条CASE语句批量更新order_index（间隔ORDER_GAP，便于之后单个任务的移动）
+        updated_ids = bulk_set_order([
+            (task_id, (index + 1) * ORDER_GAP) for index, task_id in enumerate(task_ids)
+        ])
         
-        if updated_count == 0:
+        if not updated_ids:
             return jsonify({'success': False, 'error': '没有找到有效的任务'}), 404
         
+        # 只记录实际存在并被更新的任务（不存在的ID不写入变更日志）
+        record_task_changes(upserts=updated_ids)
         db.session.commit()
         
-        return jsonify({'success': True, 'updated': updated_count})
+        return jsonify({'success': True, 'updated': len(updated_ids)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/tasks/<int:task_id>/move', methods=['POST'])
+def move_task_api(task_id):
+    """移动单个任务（只更新被移动的任务）
+
+    请求体: {"after_id": 上方相邻任务ID, "before_id": 下方相邻任务ID}，至少提供一个
+    """
+    try:
+        task = Task.query.get_or_404(task_id)
+        
+        if not request.json:
+            return jsonify({'success': False, 'error': '请求数据不能为空'}), 400
+        
+        data = request.json
+        neighbours = {}
+        for key in ('before_id', 'after_id'):
+            value = data.get(key)
+            if value is not None:
+                try:
+                    neighbours[key] = int(value)
+                except (ValueError, TypeError):
+                    return jsonify({'success': False, 'error': '任务ID必须是整数'}), 400
+        
+        order_index, rebalanced, error = move_task(task, **neighbours)
+        if error:
+            status_code = 404 if error == '任务不存在' else 400
+            return jsonify({'success': False, 'error': error}), status_code
+        
+        # 重新编号时所有任务的order_index都已改变
+        if rebalanced:
+            record_task_changes(upserts=[row[0] for row in db.session.query(Task.id)])
+        else:
+            record_task_changes(upserts=[task.id])
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': task.to_dict(),
+            'rebalanced': rebalanced
+        })
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -319,19 +641,17 @@ def record_focus_time():
             efficiency_score = 0.5
         
         # 获取开始和结束时间
-        start_time = datetime.utcnow()
-        if data.get('start_time'):
-            try:
-                start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
-            except:
-                start_time = datetime.utcnow()
+        try:
+            start_time = parse_datetime(data['start_time']) if data.get('start_time') else datetime.utcnow()
+            end_time = parse_datetime(data['end_time']) if data.get('end_time') else datetime.utcnow()
+        except ValueError:
+            return jsonify({'success': False, 'error': '开始和结束时间必须是ISO格式'}), 400
         
-        end_time = datetime.utcnow()
-        if data.get('end_time'):
-            try:
-                end_time = datetime.fromisoformat(data['end_time'].replace('Z', '+00:00'))
-            except:
-                end_time = datetime.utcnow()
+        # 在线模型：新记录的样本特征取写入之前的用户数据（与训练集的构造方式一致）
+        online_features = None
+        if app.config['MODEL_BACKEND'] == 'online':
+            user_data = get_user_data()
+            online_features = training_worker.predictor.prepare_features(user_data, get_crawled_data_stats(user_data))
         
         focus_time = FocusTime(
             task_id=task_id,
@@ -342,9 +662,15 @@ def record_focus_time():
         )
         
         db.session.add(focus_time)
+        db.session.flush()
+        record_focus_session(focus_time)
+        version = bump_version('focus_times')
+        bus.publish_on_commit(db.session, 'focus', {'version': version, 'focus_time': focus_time.to_dict()})
         db.session.commit()
         
         # 记录后更新推荐模型
+        if online_features is not None:
+            training_worker.partial_fit(online_features, [duration])
         update_recommendation()
         
         return jsonify({
@@ -357,228 +683,150 @@ def record_focus_time():
 
 # ============ 数据分析API ============
 
+@app.route('/api/crawl/runs', methods=['GET'])
+def get_crawl_runs():
+    """获取最近的爬取入库统计"""
+    try:
+        with analytics_reads():
+            limit = request.args.get('limit', 20, type=int)
+            if limit < 1 or limit > 200:
+                return jsonify({'success': False, 'error': 'limit必须在1到200之间'}), 400
+            
+            runs = CrawlRun.query.order_by(CrawlRun.started_at.desc(), CrawlRun.id.desc()).limit(limit).all()
+            return jsonify({
+                'success': True,
+                'data': [run.to_dict() for run in runs]
+            })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/crawl/stats', methods=['GET'])
+def get_crawl_stats():
+    """获取爬虫数据的累计统计（总体、指定分类和按来源/分类的明细）"""
+    try:
+        with analytics_reads():
+            category = request.args.get('category')
+            return jsonify({
+                'success': True,
+                'data': {
+                    'summary': crawled_summary(category),
+                    'breakdown': crawled_breakdown()
+                }
+            })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/analytics/weekly', methods=['GET'])
 def get_weekly_analytics():
-    """获取每周数据分析（使用真实数据库数据）"""
+    """获取每周数据分析（使用真实数据库数据）
+
+    读取每日汇总表（DailyStats），查询量与天数相关而与记录数无关。
+    支持 ?days=N 指定统计窗口（默认7天）。
+    """
     try:
-        # 获取最近7天的数据
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        # 完成任务数（真实数据）
-        completed_tasks = Task.query.filter(
-            Task.status == 'completed',
-            Task.completed_at >= week_ago
-        ).count()
-        
-        # 按标签统计（从tags字段解析）
-        all_completed_tasks = Task.query.filter(
-            Task.status == 'completed',
-            Task.completed_at >= week_ago
-        ).all()
-        
-        tags_data = {}
-        for task in all_completed_tasks:
-            if task.tags:
-                tags = [tag.strip() for tag in task.tags.split(',') if tag.strip()]
-                for tag in tags:
-                    tags_data[tag] = tags_data.get(tag, 0) + 1
-        
-        # 专注时间统计（真实数据）
-        focus_times = FocusTime.query.filter(
-            FocusTime.start_time >= week_ago
-        ).all()
-        
-        total_focus_time = sum(ft.duration for ft in focus_times)
-        avg_focus_time = total_focus_time / len(focus_times) if focus_times else 0
-        
-        # 单次专注时间列表（用于计算）
-        focus_durations = [ft.duration for ft in focus_times]
-        
-        # 按日期统计（真实数据）
-        daily_stats = {}
-        for i in range(7):
-            date = (datetime.utcnow() - timedelta(days=i)).date()
-            day_tasks = Task.query.filter(
-                Task.status == 'completed',
-                db.func.date(Task.completed_at) == date
-            ).count()
-            day_focus = FocusTime.query.filter(
-                db.func.date(FocusTime.start_time) == date
-            ).all()
-            day_focus_time = sum(ft.duration for ft in day_focus)
+        with analytics_reads():
+            days = request.args.get('days', 7)
+            try:
+                days = int(days)
+            except (ValueError, TypeError):
+                return jsonify({'success': False, 'error': 'days必须是整数'}), 400
+            if days < 1 or days > 366:
+                return jsonify({'success': False, 'error': 'days必须在1-366之间'}), 400
             
-            daily_stats[date.isoformat()] = {
-                'tasks': day_tasks,
-                'focus_time': day_focus_time,
-                'focus_sessions': len(day_focus)
-            }
-        
-        # 单日完成任务量（今天）
-        today = datetime.utcnow().date()
-        today_completed = Task.query.filter(
-            Task.status == 'completed',
-            db.func.date(Task.completed_at) == today
-        ).count()
-        
-        return jsonify({
-            'success': True,
-            'data': {
+            now = datetime.utcnow()
+            window_start = now - timedelta(days=days)
+            today = now.date()
+            dates = [(today - timedelta(days=i)).isoformat() for i in range(days)]
+            
+            # 完整日期读取每日汇总表，窗口起点所在日期从原始数据补齐
+            summary = window_summary(window_start)
+            tags_data = window_tag_counts('completed', window_start)
+            
+            daily_stats = {}
+            for date in dates:
+                day = summary['days'].get(date)
+                daily_stats[date] = {
+                    'tasks': day['completed_count'] if day else 0,
+                    'focus_time': day['focus_minutes'] if day else 0,
+                    'focus_sessions': day['session_count'] if day else 0
+                }
+            
+            completed_tasks = summary['completed_count']
+            total_focus_time = summary['focus_minutes']
+            focus_sessions = summary['session_count']
+            focus_duration_bins = summary['duration_bins']
+            avg_focus_time = total_focus_time / focus_sessions if focus_sessions else 0
+            
+            result = {
+                'days': days,
                 'completed_tasks': completed_tasks,
-                'today_completed': today_completed,
+                'today_completed': daily_stats[today.isoformat()]['tasks'],
                 'tasks_by_tags': tags_data,
                 'total_focus_time': round(total_focus_time, 2),
                 'avg_focus_time': round(avg_focus_time, 2),
-                'focus_durations': focus_durations,
+                'focus_duration_bins': focus_duration_bins,
                 'daily_stats': daily_stats
             }
-        })
+            
+            # 单次专注时间列表只在默认的一周窗口内返回，长时间窗口使用focus_duration_bins
+            if days <= 7:
+                result['focus_durations'] = [
+                    row[0] for row in db.session.query(FocusTime.duration).filter(
+                        FocusTime.start_time >= window_start
+                    ).all()
+                ]
+            
+            return jsonify({
+                'success': True,
+                'data': result
+            })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 def get_user_data():
-    """获取用户数据用于模型训练和预测（使用真实数据库数据）"""
+    """获取用户数据用于模型训练和预测（在SQL中聚合）"""
     try:
-        # 获取最近14天的数据（只保留14天）
-        days_ago = datetime.utcnow() - timedelta(days=14)
-        
-        # 专注时间数据（真实数据）
-        focus_times = FocusTime.query.filter(
-            FocusTime.start_time >= days_ago
-        ).all()
-        
-        if not focus_times:
-            return None
-        
-        durations = [ft.duration for ft in focus_times]
-        efficiencies = [ft.efficiency_score for ft in focus_times]
-        
-        # 任务数据（真实数据）
-        tasks = Task.query.filter(
-            Task.created_at >= days_ago
-        ).all()
-        
-        completed_tasks = [t for t in tasks if t.status == 'completed']
-        high_priority_tasks = [t for t in tasks if t.priority == 3]
-        
-        # 计算特征（使用真实数据）
-        avg_duration = sum(durations) / len(durations) if durations else 25.0
-        avg_efficiency = sum(efficiencies) / len(efficiencies) if efficiencies else 0.5
-        completion_rate = len(completed_tasks) / len(tasks) if tasks else 0.5
-        high_priority_ratio = len(high_priority_tasks) / len(tasks) if tasks else 0.3
-        
-        # 每周完成任务数（真实计算）
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        weekly_completed = Task.query.filter(
-            Task.status == 'completed',
-            Task.completed_at >= week_ago
-        ).count()
-        
-        # 标签编码（基于tags字段）
-        tags_count = {}
-        for task in tasks:
-            if task.tags:
-                tags = [tag.strip() for tag in task.tags.split(',') if tag.strip()]
-                for tag in tags:
-                    tags_count[tag] = tags_count.get(tag, 0) + 1
-        main_tag = max(tags_count.items(), key=lambda x: x[1])[0] if tags_count else 'general'
-        tag_encoded = hash(main_tag) % 10  # 简单编码
-        
-        return {
-            'avg_duration': avg_duration,
-            'avg_efficiency': avg_efficiency,
-            'completion_rate': completion_rate,
-            'high_priority_ratio': high_priority_ratio,
-            'weekly_completed': weekly_completed,
-            'tag_encoded': tag_encoded
-        }
+        return user_feature_stats(window_days=14)
     except Exception as e:
         print(f"获取用户数据错误: {e}")
         return None
 
-def get_crawled_data_stats():
-    """获取爬虫数据统计"""
+def get_crawled_data_stats(user_data=None):
+    """获取爬虫数据统计（读取累计统计表）
+
+    开启CRAWLED_FEATURES_BY_TAG时使用与用户主要标签相同分类的爬虫数据。
+    """
     try:
-        crawled_data = CrawledData.query.all()
-        if not crawled_data:
-            return None
-        
-        durations = [cd.duration for cd in crawled_data]
-        efficiencies = [cd.efficiency for cd in crawled_data]
-        
-        return {
-            'avg_duration': sum(durations) / len(durations),
-            'avg_efficiency': sum(efficiencies) / len(efficiencies)
-        }
+        category = None
+        if app.config['CRAWLED_FEATURES_BY_TAG'] and user_data:
+            category = user_data.get('main_tag')
+        return crawled_feature_stats(category)
     except Exception as e:
         print(f"获取爬虫数据错误: {e}")
         return None
 
+def get_crawled_stats_for_tag(tag):
+    """训练集中主要标签为tag的样本使用的爬虫数据统计（与预测时get_crawled_data_stats(user_data)一致）"""
+    return get_crawled_data_stats({'main_tag': tag})
+
 def train_model():
     """训练模型（使用真实数据库数据）"""
     try:
-        # 获取最近14天的真实数据
-        days_ago = datetime.utcnow() - timedelta(days=14)
-        focus_times = FocusTime.query.filter(
-            FocusTime.start_time >= days_ago
-        ).order_by(FocusTime.start_time.asc()).all()
+        # 一次性加载数据并向量化构建特征，专注记录增量追加
+        X, y = training_set_builder.build(crawled_stats_for=get_crawled_stats_for_tag)
         
-        if len(focus_times) < 5:
+        if len(y) + 1 < 5:
             return False  # 数据不足
         
-        # 准备训练数据（使用真实数据）
-        X = []
-        y = []
-        
-        for i in range(len(focus_times) - 1):
-            # 使用历史数据作为特征
-            past_times = focus_times[:i+1]
-            durations = [ft.duration for ft in past_times]
-            efficiencies = [ft.efficiency_score for ft in past_times]
-            
-            # 获取任务数据（真实数据）
-            tasks = Task.query.filter(
-                Task.created_at <= focus_times[i+1].start_time
-            ).all()
-            
-            completed = [t for t in tasks if t.status == 'completed']
-            high_priority = [t for t in tasks if t.priority == 3]
-            
-            # 计算每周完成任务数（真实数据）
-            if tasks and len(tasks) > 0:
-                week_before = focus_times[i+1].start_time - timedelta(days=7)
-                weekly_completed = Task.query.filter(
-                    Task.status == 'completed',
-                    Task.completed_at >= week_before,
-                    Task.completed_at <= focus_times[i+1].start_time
-                ).count()
-            else:
-                weekly_completed = 5
-            
-            features = [
-                sum(durations) / len(durations) if durations else 25.0,
-                len(completed) / len(tasks) if tasks else 0.5,
-                sum(efficiencies) / len(efficiencies) if efficiencies else 0.5,
-                len(high_priority) / len(tasks) if tasks else 0.3,
-                weekly_completed,
-                0  # tag_encoded简化
-            ]
-            
-            # 添加爬虫数据特征（如果可用）
-            crawled_stats = get_crawled_data_stats()
-            if crawled_stats:
-                features.extend([crawled_stats['avg_duration'], crawled_stats['avg_efficiency']])
-            else:
-                features.extend([25.0, 0.5])
-            
-            X.append(features)
-            y.append(focus_times[i+1].duration)
-        
         if len(X) >= 2:
-            X = np.array(X)
-            y = np.array(y)
-            ml_predictor.train(X, y)
-            ml_predictor.save_model()
+            # 在快照上训练新的预测器，完成后原子替换，训练期间不影响预测
+            predictor = new_predictor()
+            if not predictor.train(X, y):
+                return False
+            version = model_store.save(predictor, meta={'samples': int(len(y))})
+            training_worker.swap(predictor, version)
+            publish_recommendation()
             return True
         
         return False
@@ -586,29 +834,75 @@ def train_model():
         print(f"训练模型错误: {e}")
         return False
 
+def background_train():
+    """后台训练任务"""
+    with app.app_context():
+        return train_model()
+
+def save_online_model(predictor):
+    """保存增量更新后的在线模型，返回版本号"""
+    return model_store.save(predictor, meta={'online_samples': predictor.estimator.samples})
+
+def can_save_online_model():
+    """只有主进程（或未启用选举时的唯一进程）保存在线模型，避免多个进程互相覆盖"""
+    return election is None or election.is_leader
+
+# 后台训练器：在调度器线程池中训练，合并重复的训练请求
+training_worker = TrainingWorker(
+    scheduler, background_train, ml_predictor,
+    save_func=save_online_model,
+    save_every=app.config['ONLINE_SAVE_EVERY'],
+    can_save=can_save_online_model
+)
+
+def load_saved_model():
+    """加载模型存储中的当前版本，兼容迁移旧的 ml_model.pkl"""
+    try:
+        meta = model_store.read_meta() or {}
+        if meta and meta.get('backend', 'forest') != app.config['MODEL_BACKEND']:
+            # 配置的模型后端已更换，按新后端重新训练
+            print(f"模型后端由 {meta.get('backend', 'forest')} 改为 {app.config['MODEL_BACKEND']}，重新训练模型")
+            training_worker.submit()
+            return None
+        
+        version = model_store.load(ml_predictor)
+        if version is None and os.path.exists('ml_model.pkl'):
+            if ml_predictor.load_model('ml_model.pkl', lazy=False):
+                version = model_store.save(ml_predictor, meta={'migrated_from': 'ml_model.pkl'})
+                print(f"旧模型文件已迁移到模型存储 v{version}")
+        if version is not None:
+            training_worker.swap(ml_predictor, version)
+        return version
+    except Exception as e:
+        print(f"加载模型错误: {e}")
+        return None
+
 def update_recommendation():
     """更新推荐"""
     try:
-        # 定期训练模型（每10条新记录）
+        # 定期全量训练模型（默认每10条新记录），提交到后台训练器，不阻塞请求
+        refit_every = app.config['MODEL_REFIT_EVERY']
         focus_count = FocusTime.query.count()
-        if focus_count > 0 and focus_count % 10 == 0:
-            train_model()
+        if refit_every and focus_count > 0 and focus_count % refit_every == 0:
+            training_worker.submit()
         
         # 获取用户数据
         user_data = get_user_data()
-        crawled_stats = get_crawled_data_stats()
+        crawled_stats = get_crawled_data_stats(user_data)
         
         # 预测
-        recommended_duration, confidence = ml_predictor.predict(user_data, crawled_stats)
+        recommended_duration, confidence = training_worker.predictor.predict(user_data, crawled_stats)
         
         # 保存推荐结果
         recommendation = UserRecommendation(
             recommended_duration=recommended_duration,
             confidence=confidence,
+            model_version=training_worker.model_version,
             user_data=json.dumps(user_data) if user_data else None
         )
         
         db.session.add(recommendation)
+        bump_version('user_recommendations')
         db.session.commit()
         
         return recommendation
@@ -616,28 +910,97 @@ def update_recommendation():
         print(f"更新推荐错误: {e}")
         return None
 
+def compute_recommendation():
+    """计算专注时间推荐"""
+    user_data = get_user_data()
+    crawled_stats = get_crawled_data_stats(user_data)
+    
+    # 预测
+    recommended_duration, confidence = training_worker.predictor.predict(user_data, crawled_stats)
+    
+    # 获取最新推荐记录（按列查询，字段与UserRecommendation.to_dict一致）
+    latest = db.session.query(
+        UserRecommendation.id, UserRecommendation.recommended_duration, UserRecommendation.confidence,
+        UserRecommendation.model_version, UserRecommendation.created_at, UserRecommendation.user_data
+    ).order_by(UserRecommendation.created_at.desc()).first()
+    if latest:
+        latest = latest._asdict()
+        latest['user_data'] = loads(latest['user_data']) if latest['user_data'] else None
+    
+    # 预测结果可能是NumPy数值，由orjson直接序列化
+    return {
+        'recommended_duration': round(recommended_duration, 1),
+        'confidence': round(confidence, 2),
+        'user_data': user_data,
+        'latest_recommendation': latest
+    }
+
+def publish_recommendation():
+    """模型更新后向事件流发布新的推荐结果（没有连接时跳过）"""
+    if bus.subscriber_count == 0:
+        return
+    try:
+        key = get_versions(RECOMMENDATION_TABLES) + (training_worker.model_version,)
+        data = recommendation_cache.get_or_compute(key, compute_recommendation)
+        bus.publish('recommendation', data)
+    except Exception as e:
+        print(f"发布推荐结果错误: {e}")
+
 @app.route('/api/recommendation', methods=['GET'])
 def get_recommendation():
-    """获取专注时间推荐"""
+    """获取专注时间推荐（数据和模型未变化时使用缓存）"""
+    try:
+        key = get_versions(RECOMMENDATION_TABLES) + (training_worker.model_version,)
+        data = recommendation_cache.get_or_compute(key, compute_recommendation)
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/recommendation/batch', methods=['POST'])
+def batch_recommendation():
+    """批量预测假设场景：在当前特征上覆盖部分特征，一次调用模型预测所有场景"""
     try:
+        scenarios, error = validate_scenarios(
+            request.get_json(silent=True),
+            FEATURE_NAMES,
+            max_count=app.config['RECOMMENDATION_BATCH_MAX']
+        )
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        predictor = training_worker.predictor
+        model_version = training_worker.model_version
         user_data = get_user_data()
-        crawled_stats = get_crawled_data_stats()
+        base = predictor.prepare_features(user_data, get_crawled_data_stats(user_data))[0]
         
-        # 预测
-        recommended_duration, confidence = ml_predictor.predict(user_data, crawled_stats)
+        features = np.tile(base, (len(scenarios), 1))
+        for row, scenario in enumerate(scenarios):
+            for name, value in scenario['overrides'].items():
+                if name == 'tag':
+                    features[row, FEATURE_NAMES.index('tag_encoded')] = encode_tag(value)
+                else:
+                    features[row, FEATURE_NAMES.index(name)] = value
         
-        # 获取最新推荐记录
-        latest = UserRecommendation.query.order_by(
-            UserRecommendation.created_at.desc()
-        ).first()
+        predictions, confidences = predictor.predict_batch(features)
         
         return jsonify({
             'success': True,
             'data': {
-                'recommended_duration': round(recommended_duration, 1),
-                'confidence': round(confidence, 2),
-                'user_data': user_data,
-                'latest_recommendation': latest.to_dict() if latest else None
+                'model_version': model_version,
+                'base_features': dict(zip(FEATURE_NAMES, base.tolist())),
+                'results': [
+                    {
+                        'label': scenario['label'],
+                        'overrides': scenario['overrides'],
+                        'recommended_duration': round(float(prediction), 1),
+                        'confidence': round(float(confidence), 2)
+                    }
+                    for scenario, prediction, confidence in zip(scenarios, predictions, confidences)
+                ]
             }
         })
     except Exception as e:
@@ -646,7 +1009,7 @@ def get_recommendation():
 @app.route('/api/recommendation/train', methods=['POST'])
 def train_recommendation_model():
     try:
-        success = train_model()
+        success = training_worker.train_now()
         return jsonify({
             'success': success,
             'message': '模型训练完成' if success else '数据不足，无法训练'
@@ -654,49 +1017,346 @@ def train_recommendation_model():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-# 启动入口 只有直接启动app.py时才会被执行 避免被import时意外启动服务
-if __name__ == '__main__':
-    with app.app_context():
-        # 创建所有表（不会覆盖已有表）
-        db.create_all()
-        
-        # 尝试迁移第一版数据库数据：将category字段迁移到tags字段
+@app.route('/api/recommendation/status', methods=['GET'])
+def get_training_status():
+    """获取后台训练状态（队列深度、上次训练耗时、模型版本）和当前进程的定时任务选举状态"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': dict(
+                training_worker.status(),
+                cache=recommendation_cache.stats(),
+                model_store={
+                    'current_version': model_store.current_version(),
+                    'versions': model_store.versions(),
+                    'meta': model_store.read_meta()
+                },
+                scheduler=election.status() if election else None,
+                stream=bus.stats()
+            )
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ============ 事件流API ============
+
+@app.route('/api/stream', methods=['GET'])
+def event_stream():
+    """服务器推送事件（Server-Sent Events）
+
+    事件：ready（连接建立，携带当前版本号）、tasks（任务变更，携带任务表版本号，
+    客户端通过 /api/tasks/changes 获取变更）、focus（新的专注记录）、
+    recommendation（模型重新训练后的推荐结果）、reset（客户端处理过慢丢失了事件，需重新加载数据）。
+    """
+    subscription = bus.subscribe()
+    if subscription is None:
+        # 连接数已达上限（每个连接占用一个工作线程），客户端稍后重试，期间在写操作后主动同步
+        response = jsonify({'success': False, 'error': '事件流连接数已达上限'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    keepalive = app.config['STREAM_KEEPALIVE']
+    
+    def generate():
         try:
-            from sqlalchemy import text
-            result = db.session.execute(text("PRAGMA table_info(tasks)"))
-            columns = [row[1] for row in result]
+            versions = dict(zip(STREAM_TABLES, get_versions(STREAM_TABLES)))
+            # 连接会长时间保持，及时归还数据库连接
+            db.session.close()
+            yield 'retry: 3000\n\n'
+            yield format_event(None, 'ready', {'versions': versions})
             
-            if 'category' in columns and 'tags' not in columns:
-                # 添加tags列
-                db.session.execute(text("ALTER TABLE tasks ADD COLUMN tags VARCHAR(500) DEFAULT ''"))
-                # 将category数据迁移到tags
-                db.session.execute(text("UPDATE tasks SET tags = category WHERE tags = '' OR tags IS NULL"))
-                db.session.commit()
-                print("数据库迁移完成：category字段已迁移到tags字段")
-        except Exception as e:
-            print(f"数据库迁移检查: {e}")
-            db.session.rollback()
-        
-        # 尝试加载已保存的模型
-        ml_predictor.load_model()
-        
-        # 初始化时执行一次数据清理
-        try:
-            cleanup_old_data()
-        except:
-            pass
-        
-        # 初始化时清理爬虫数据（确保不超过200条）
-        try:
-            cleanup_crawled_data(max_count=200)
-        except:
-            pass
-        
-        # 初始化时执行一次爬取
-        try:
-            scheduled_crawl()
-        except:
-            pass
+            while True:
+                item = subscription.get(timeout=keepalive)
+                if item is None:
+                    # 心跳：同时检查其他工作进程的写入
+                    latest = dict(zip(STREAM_TABLES, get_versions(STREAM_TABLES)))
+                    db.session.close()
+                    if latest['tasks'] > versions['tasks']:
+                        yield format_event(None, 'tasks', {'version': latest['tasks']})
+                    if latest['focus_times'] > versions['focus_times']:
+                        yield format_event(None, 'focus', {'version': latest['focus_times']})
+                    versions = {name: max(versions[name], latest[name]) for name in STREAM_TABLES}
+                    yield ': keepalive\n\n'
+                    continue
+                
+                event_id, name, data = item
+                if name == 'tasks':
+                    versions['tasks'] = max(versions['tasks'], data['version'])
+                elif name == 'focus':
+                    versions['focus_times'] = max(versions['focus_times'], data['version'])
+                yield format_event(event_id, name, data)
+        finally:
+            bus.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.cli.command('init-db')
+def init_db_command():
+    """创建数据表并迁移已有数据库"""
+    init_database()
+    print("数据库初始化完成")
+
+def rollup_rebuild_since():
+    """原始数据完整保留的第一天（任务和专注记录按天数清理，清理边界当天的数据不完整）
+
+    没有按天数清理的策略时返回None（原始数据完整，可以全量重建）。
+    """
+    days = [retention_engine.policies[name].max_age_days for name in ('tasks', 'focus_times')
+            if retention_engine.policies[name].max_age_days is not None]
+    if not days:
+        return None
+    return (datetime.utcnow() - timedelta(days=min(days))).date() + timedelta(days=1)
+
+@app.cli.command('rebuild-stats')
+@click.option('--days', type=int, default=None, help='只重建最近N天的汇总，默认只重建原始数据保留期内的汇总')
+@click.option('--all', 'rebuild_all', is_flag=True, default=False,
+              help='删除全部汇总后根据现存原始数据重建（已被清理的历史会丢失）')
+def rebuild_stats_command(days, rebuild_all):
+    """根据原始数据重建每日汇总表和爬虫数据累计统计
+
+    原始数据超过保留期后被清理，更早日期的汇总只存在于汇总表中，默认不删除。
+    """
+    if rebuild_all:
+        since = None
+        click.confirm('警告：--all 会删除全部每日汇总，保留期之前已被清理的历史无法恢复，是否继续？', abort=True)
+    elif days:
+        since = (datetime.utcnow() - timedelta(days=days)).date()
+    else:
+        since = rollup_rebuild_since()
+    count = rebuild_daily_stats(since=since)
+    print(f"每日汇总表重建完成（{since.isoformat() + ' 起' if since else '全部'}），共 {count} 天")
+    count = rebuild_crawled_stats()
+    print(f"爬虫数据累计统计重建完成，共 {count} 组")
+
+@app.cli.command('tune-model')
+@click.option('--days', type=int, default=14, help='使用最近N天的专注记录构建特征矩阵')
+@click.option('--input', 'input_path', type=click.Path(exists=True), default=None,
+              help='从导出的特征矩阵（.npz，包含X和y）读取数据，不查询数据库')
+@click.option('--export', 'export_path', default=None, help='把特征矩阵导出到.npz文件')
+@click.option('--backend', type=click.Choice(BACKENDS + ('all',)), default=None,
+              help='搜索的模型后端，默认为当前配置的后端')
+@click.option('--valid-ratio', type=float, default=0.2, help='按时间顺序划分的验证集比例')
+@click.option('--jobs', type=int, default=None, help='并行进程数，默认为CPU核数')
+@click.option('--samples', type=int, default=None, help='随机抽取的参数组数，默认评估所有组合')
+@click.option('--tolerance', type=float, default=0.02, help='MAE不超过最佳值(1+tolerance)倍时选择更快的参数')
+@click.option('--save/--no-save', default=True, help='保存选中的参数，并用其在全部数据上训练新模型')
+def tune_model_command(days, input_path, export_path, backend, valid_ratio, jobs, samples, tolerance, save):
+    """离线评估和调优模型参数"""
+    if input_path:
+        data = np.load(input_path)
+        X, y = data['X'], data['y']
+    else:
+        X, y = TrainingSetBuilder(window_days=days).build(crawled_stats_for=get_crawled_stats_for_tag)
+    print(f"特征矩阵: {len(y)} 条样本")
+    
+    if export_path:
+        np.savez(export_path, X=X, y=y)
+        print(f"特征矩阵已导出到 {export_path}")
+    
+    backend = backend or app.config['MODEL_BACKEND']
+    grid = [space for space in DEFAULT_GRID if backend == 'all' or backend in space['backend']]
+    try:
+        chosen, results = tune(X, y, grid=grid, valid_ratio=valid_ratio, jobs=jobs,
+                               samples=samples, tolerance=tolerance)
+    except ValueError as e:
+        print(f"调优失败: {e}")
+        return
+    
+    print(f"{'参数':<60} {'MAE':>8} {'训练(ms)':>10} {'延迟(us)':>10}")
+    for result in results:
+        params = ', '.join(f'{k}={v}' for k, v in result['params'].items())
+        mark = ' *' if result is chosen else ''
+        print(f"{params:<60} {result['mae']:>8.3f} {result['train_time'] * 1000:>10.1f} "
+              f"{result['latency_us']:>10.1f}{mark}")
+    print(f"选中参数: {chosen['params']}")
+    
+    if not save:
+        return
+    
+    model_store.save_config(chosen['params'], report={
+        'mae': chosen['mae'],
+        'train_time': chosen['train_time'],
+        'latency_us': chosen['latency_us'],
+        'samples': int(len(y)),
+        'valid_ratio': valid_ratio
+    })
+    if chosen['params']['backend'] != app.config['MODEL_BACKEND']:
+        print(f"选中的后端与当前配置（{app.config['MODEL_BACKEND']}）不同，设置MODEL_BACKEND后生效")
+        return
+    
+    predictor = new_predictor()
+    if predictor.train(X, y):
+        version = model_store.save(predictor, meta={'samples': int(len(y)), 'tuned': True})
+        print(f"已用选中参数训练模型并保存为 v{version}")
+
+def init_database():
+    """创建数据表并迁移已有数据库（每一步都先检查，可以重复执行）"""
+    # 创建所有表（不会覆盖已有表）
+    db.create_all()
+    
+    # 尝试迁移第一版数据库数据：将category字段迁移到tags字段
+    try:
+        from sqlalchemy import text, inspect
+        columns = [column['name'] for column in inspect(db.engine).get_columns('tasks')]
+        
+        if 'category' in columns and 'tags' not in columns:
+            # 添加tags列
+            db.session.execute(text("ALTER TABLE tasks ADD COLUMN tags VARCHAR(500) DEFAULT ''"))
+            # 将category数据迁移到tags
+            db.session.execute(text("UPDATE tasks SET tags = category WHERE tags = '' OR tags IS NULL"))
+            db.session.commit()
+            print("数据库迁移完成：category字段已迁移到tags字段")
+    except Exception as e:
+        print(f"数据库迁移检查: {e}")
+        db.session.rollback()
+    
+    # 爬虫数据增加内容哈希列，为已有数据补充哈希（需在建唯一索引之前）
+    try:
+        from sqlalchemy import text, inspect
+        columns = [column['name'] for column in inspect(db.engine).get_columns('crawled_data')]
+        if 'content_hash' not in columns:
+            db.session.execute(text("ALTER TABLE crawled_data ADD COLUMN content_hash VARCHAR(64)"))
+            db.session.commit()
+        if CrawledData.query.filter(CrawledData.content_hash.is_(None)).first():
+            count = backfill_content_hashes()
+            print(f"数据库迁移完成：{count} 条爬虫数据补充了内容哈希")
+    except Exception as e:
+        print(f"爬虫数据迁移检查: {e}")
+        db.session.rollback()
+    
+    # 为已有数据库补建索引（create_all不会修改已存在的表）
+    try:
+        from sqlalchemy import inspect
+        inspector = inspect(db.engine)
+        created = []
+        for table in db.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=db.session.connection())
+                    created.append(index.name)
+        db.session.commit()
+        if created:
+            print(f"数据库迁移完成：新建索引 {', '.join(created)}")
+    except Exception as e:
+        print(f"索引迁移检查: {e}")
+        db.session.rollback()
+    
+    # 把tags字段迁移到标签关联表
+    try:
+        has_links = db.session.query(task_tags.c.task_id).first() is not None
+        if not has_links and Task.query.filter(Task.tags.isnot(None), Task.tags != '').first():
+            count = migrate_task_tags()
+            print(f"数据库迁移完成：{count} 个任务的标签已迁移到标签表")
+    except Exception as e:
+        print(f"标签迁移检查: {e}")
+        db.session.rollback()
+    
+    # 首次升级到每日汇总表时，根据已有原始数据生成汇总
+    try:
+        if DailyStats.query.first() is None and (Task.query.first() or FocusTime.query.first()):
+            rebuild_daily_stats()
+            print("每日汇总表已根据原始数据生成")
+    except Exception as e:
+        print(f"生成每日汇总表错误: {e}")
+        db.session.rollback()
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # 首次升级到爬虫数据累计统计时，根据已有爬虫数据生成
+    try:
+        if CrawledStats.query.first() is None and CrawledData.query.first():
+            count = rebuild_crawled_stats()
+            print(f"爬虫数据累计统计已根据原始数据生成，共 {count} 组")
+    except Exception as e:
+        print(f"生成爬虫数据累计统计错误: {e}")
+        db.session.rollback()
+
+def sync_saved_model():
+    """其他进程训练并保存了新版本时加载该版本（多进程部署时保持各进程的模型一致）"""
+    try:
+        version = model_store.current_version()
+        if version is None or version <= training_worker.version:
+            return False
+        meta = model_store.read_meta(version) or {}
+        if meta.get('backend', 'forest') != app.config['MODEL_BACKEND']:
+            return False
+        predictor = new_predictor()
+        if model_store.load(predictor, version=version) is None:
+            return False
+        training_worker.swap(predictor, version)
+        print(f"已加载其他进程保存的模型 v{version}")
+        with app.app_context():
+            publish_recommendation()
+        return True
+    except Exception as e:
+        print(f"同步模型错误: {e}")
+        return False
 
+# 定时任务选举（create_app中创建，SCHEDULER_ELECTION为off时为None）
+election = None
+_app_lock = threading.Lock()
+_app_ready = False
+
+def create_app():
+    """应用工厂：初始化数据库、加载模型、启动后台调度器并参加定时任务选举，返回Flask应用
+
+    每个工作进程调用一次（重复调用直接返回），WSGI服务器通过 wsgi.py 或 serve.py 启动；
+    开发服务器在 python app.py 启动时或 flask run 处理第一个请求前调用。
+    所有进程都处理请求和执行模型训练，定时任务只在选举出的主进程中运行。
+    """
+    global election, _app_ready
+    with _app_lock:
+        if _app_ready:
+            return app
+        
+        with app.app_context():
+            # 多个工作进程同时启动时依次建表和迁移
+            with FileLock(os.path.join(app.instance_path, 'migrate.lock')):
+                init_database()
+            # 尝试加载已保存的模型（首次预测时才真正读取）
+            load_saved_model()
+        
+        bus.max_subscribers = stream_client_limit()
+        scheduler.start()
+        if app.config['MODEL_SYNC_INTERVAL']:
+            scheduler.add_job(sync_saved_model, 'interval', seconds=app.config['MODEL_SYNC_INTERVAL'],
+                              id='sync_model', replace_existing=True)
+        
+        method = app.config['SCHEDULER_ELECTION']
+        if method == 'off':
+            start_scheduled_jobs()
+        else:
+            if method == 'lease':
+                with app.app_context():
+                    lock = DatabaseLease(db.engine, SchedulerLease.__table__,
+                                         ttl=app.config['SCHEDULER_LEASE_TTL'])
+            else:
+                lock = FileLock(app.config['SCHEDULER_LOCK_FILE'] or
+                                os.path.join(app.instance_path, 'scheduler.lock'))
+            election = LeaderElection(scheduler, lock, start_scheduled_jobs, stop_scheduled_jobs,
+                                      interval=app.config['SCHEDULER_ELECTION_INTERVAL'])
+            election.start()
+            atexit.register(election.stop)
+        
+        _app_ready = True
+        return app
+
+def _init_before_first_request():
+    """flask run：在处理第一个请求前初始化（重载器的监视进程不处理请求，不会初始化）"""
+    if not _app_ready:
+        create_app()
+
+if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+    app.before_request(_init_before_first_request)
+
+# 启动入口 只有直接启动app.py时才会被执行 避免被import时意外启动服务
+# 开发服务器：debug模式的重载器在子进程中运行应用，只在该进程中初始化（FLASK_DEBUG=0时不使用重载器）；
+# 生产环境使用 serve.py
+if __name__ == '__main__':
+    debug = os.environ.get('FLASK_DEBUG', '1') != '0'
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        create_app()
+    app.run(debug=debug, host='0.0.0.0', port=5000)
@@ -0,0 +1,182 @@
+from models import db, Task, task_tags
+from rollup import RollupDelta, TaskSnapshot
+from tagging import split_tags, get_or_create_tags
+from validators import validate_task_data
+from changelog import record_task_changes
+from ordering import next_order_index, ORDER_GAP
+from datetime import datetime
+
+# 单次批量请求的最大操作数
+MAX_BATCH_SIZE = 1000
+
+TASK_COLUMNS = ['id', 'title', 'description', 'priority', 'tags', 'status', 'order_index', 'created_at', 'completed_at']
+UPDATE_COLUMNS = ['title', 'description', 'priority', 'tags', 'status', 'completed_at']
+
+
+def _snapshot(state):
+    return TaskSnapshot(state['created_at'], state['status'], state['priority'], state['tags'], state['completed_at'])
+
+
+def _task_dict(state):
+    return {
+        field: state[field].isoformat() if isinstance(state[field], datetime) else state[field]
+        for field in TASK_COLUMNS
+    }
+
+
+def _is_task_id(value):
+    """任务ID必须是整数（JSON的true/false在Python中是int的子类，不接受）"""
+    return type(value) is int
+
+
+def _error(index, message):
+    return {'index': index, 'success': False, 'error': message}
+
+
+def apply_task_batch(operations, atomic=False):
+    """批量执行任务的创建、更新和删除
+
+    每个操作使用与单个接口相同的规则校验，校验通过的操作通过批量INSERT/UPDATE/DELETE
+    语句执行，并在同一个事务中维护标签关联表、每日汇总表和任务表版本号（由调用方提交）。
+    atomic为True时，只要有一个操作校验失败就不执行任何操作。
+    返回 (逐项结果列表, 是否已执行)。
+    """
+    now = datetime.utcnow()
+    results = [None] * len(operations)
+    
+    # 一次性加载所有被更新或删除的任务
+    ids = set()
+    for op in operations:
+        if isinstance(op, dict) and op.get('op') in ('update', 'delete') and _is_task_id(op.get('id')):
+            ids.add(op['id'])
+    states = {}
+    if ids:
+        rows = db.session.query(*[getattr(Task, c) for c in TASK_COLUMNS]).filter(Task.id.in_(ids)).all()
+        states = {row[0]: dict(zip(TASK_COLUMNS, row)) for row in rows}
+    originals = {task_id: _snapshot(state) for task_id, state in states.items()}
+    
+    creates = []
+    updated = []
+    deleted = []
+    tags_changed = set()
+    
+    for index, op in enumerate(operations):
+        if not isinstance(op, dict):
+            results[index] = _error(index, '操作必须是对象')
+            continue
+        
+        kind = op.get('op')
+        if kind == 'create':
+            values, error = validate_task_data(op.get('data'))
+            if error:
+                results[index] = _error(index, error)
+                continue
+            creates.append((index, values))
+        elif kind in ('update', 'delete'):
+            task_id = op.get('id')
+            if not _is_task_id(task_id):
+                results[index] = _error(index, '任务ID必须是整数')
+                continue
+            if task_id not in states or task_id in deleted:
+                results[index] = _error(index, '任务不存在')
+                continue
+            
+            if kind == 'delete':
+                deleted.append(task_id)
+                results[index] = {'index': index, 'success': True, 'op': 'delete', 'id': task_id}
+                continue
+            
+            values, error = validate_task_data(op.get('data'), partial=True)
+            if error:
+                results[index] = _error(index, error)
+                continue
+            
+            state = states[task_id]
+            state.update(values)
+            if 'status' in values:
+                if values['status'] == 'completed' and not state['completed_at']:
+                    state['completed_at'] = now
+                elif values['status'] == 'pending':
+                    state['completed_at'] = None
+            if 'tags' in values:
+                tags_changed.add(task_id)
+            if task_id not in updated:
+                updated.append(task_id)
+            results[index] = {'index': index, 'success': True, 'op': 'update', 'id': task_id}
+        else:
+            results[index] = _error(index, '操作类型必须是create、update或delete')
+    
+    has_errors = any(result is not None and not result['success'] for result in results)
+    if atomic and has_errors:
+        for index, result in enumerate(results):
+            if result is None or result['success']:
+                results[index] = _error(index, '其他操作无效，未执行')
+        return results, False
+    
+    deleted_set = set(deleted)
+    updated = [task_id for task_id in updated if task_id not in deleted_set]
+    tags_changed -= deleted_set
+    
+    if not creates and not updated and not deleted:
+        return results, False
+    
+    delta = RollupDelta()
+    
+    # 批量插入
+    created_states = []
+    if creates:
+        first_order = next_order_index()
+        rows = []
+        for offset, (index, values) in enumerate(creates):
+            rows.append(dict(values, status='pending', order_index=first_order + offset * ORDER_GAP,
+                             created_at=now, completed_at=None))
+        new_ids = db.session.scalars(
+            db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+        ).all()
+        for (index, _), row, task_id in zip(creates, rows, new_ids):
+            state = dict(row, id=task_id)
+            created_states.append(state)
+            delta.add_task(_snapshot(state), 1)
+            results[index] = {'index': index, 'success': True, 'op': 'create', 'data': _task_dict(state)}
+    
+    # 批量更新（按主键）
+    if updated:
+        db.session.execute(db.update(Task), [
+            dict({column: states[task_id][column] for column in UPDATE_COLUMNS}, id=task_id)
+            for task_id in updated
+        ])
+        for task_id in updated:
+            delta.add_task(originals[task_id], -1)
+            delta.add_task(_snapshot(states[task_id]), 1)
+    
+    # 批量删除
+    if deleted:
+        db.session.execute(task_tags.delete().where(task_tags.c.task_id.in_(deleted)))
+        db.session.execute(
+            db.delete(Task).where(Task.id.in_(deleted)),
+            execution_options={'synchronize_session': False}
+        )
+        for task_id in deleted:
+            delta.add_task(originals[task_id], -1)
+    
+    # 同步标签关联表
+    tagged = [(state['id'], split_tags(state['tags'])) for state in created_states]
+    tagged += [(task_id, split_tags(states[task_id]['tags'])) for task_id in tags_changed]
+    if tags_changed:
+        db.session.execute(task_tags.delete().where(task_tags.c.task_id.in_(tags_changed)))
+    names = sorted({name for _, task_names in tagged for name in task_names})
+    if names:
+        tags = get_or_create_tags(names)
+        db.session.execute(task_tags.insert(), [
+            {'task_id': task_id, 'tag_id': tags[name].id}
+            for task_id, task_names in tagged for name in task_names
+        ])
+    
+    delta.flush()
+    record_task_changes(upserts=[state['id'] for state in created_states] + updated, deletes=deleted)
+    
+    for index, result in enumerate(results):
+        if result and result['success'] and result['op'] == 'update':
+            result['data'] = _task_dict(states[result['id']])
+    
+    return results, True
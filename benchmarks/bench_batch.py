@@ -0,0 +1,97 @@
+"""批量接口吞吐量基准测试
+
+在临时SQLite数据库上对比逐个调用任务接口与调用 POST /api/tasks/batch
+完成相同数量的创建、更新（标记完成）和删除操作的耗时。
+
+用法: python benchmarks/bench_batch.py [--count 200]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(label, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f'{label}: {elapsed * 1000:.1f} ms, {count / elapsed:.0f} 操作/秒')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量接口吞吐量基准测试')
+    parser.add_argument('--count', type=int, default=200, help='每种操作的数量')
+    args = parser.parse_args()
+    count = args.count
+    
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmpdir, "bench.db")}'
+    
+    from app import app, db
+    
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    
+    def task_data(i):
+        return {'title': f'task {i}', 'priority': i % 3 + 1, 'tags': 'work,bench'}
+    
+    results = {}
+    
+    print(f'===== 逐个调用（{count} 个操作） =====')
+    ids = []
+    
+    def single_create():
+        for i in range(count):
+            ids.append(client.post('/api/tasks', json=task_data(i)).json['data']['id'])
+    
+    def single_update():
+        for task_id in ids:
+            client.put(f'/api/tasks/{task_id}', json={'status': 'completed'})
+    
+    def single_delete():
+        for task_id in ids:
+            client.delete(f'/api/tasks/{task_id}')
+    
+    results['create'] = [timed('创建', count, single_create)]
+    results['update'] = [timed('更新', count, single_update)]
+    results['delete'] = [timed('删除', count, single_delete)]
+    
+    print(f'\n===== 批量接口（{count} 个操作） =====')
+    ids = []
+    
+    def batch_create():
+        response = client.post('/api/tasks/batch', json={
+            'operations': [{'op': 'create', 'data': task_data(i)} for i in range(count)]
+        })
+        ids.extend(item['data']['id'] for item in response.json['data'])
+    
+    def batch_update():
+        client.post('/api/tasks/batch', json={
+            'operations': [{'op': 'update', 'id': task_id, 'data': {'status': 'completed'}} for task_id in ids]
+        })
+    
+    def batch_delete():
+        client.post('/api/tasks/batch', json={
+            'operations': [{'op': 'delete', 'id': task_id} for task_id in ids]
+        })
+    
+    results['create'].append(timed('创建', count, batch_create))
+    results['update'].append(timed('更新', count, batch_update))
+    results['delete'].append(timed('删除', count, batch_delete))
+    
+    print('\n===== 对比 =====')
+    for name, (single, batch) in results.items():
+        print(f'{name}: {single * 1000:.1f} ms -> {batch * 1000:.1f} ms ({single / batch:.1f}x)')
+    
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""爬虫引擎基准测试（本地HTTP桩服务器）
+
+在本机启动一个模拟数据源的HTTP服务器（每个请求有固定延迟，支持ETag条件请求，
+/flaky/ 路径的第一次请求返回503），分别测量:
+- 串行抓取（1个线程）与并发抓取的耗时
+- 第二次抓取时条件请求命中304、从磁盘缓存解析的耗时
+- 失败请求的重试
+
+用法: python benchmarks/bench_crawler.py [--urls 16] [--lines 2000] [--delay 0.2] [--workers 8]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_handler(lines, delay):
+    failed = set()
+    lock = threading.Lock()
+
+    def body_for(path):
+        rows = [json.dumps({'duration': 20 + (i + len(path)) % 30, 'category': 'work',
+                            'efficiency': 0.5 + (i % 5) / 10, 'path': path})
+                for i in range(lines)]
+        return ('\n'.join(rows) + '\n').encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(delay)
+            if self.path.startswith('/flaky/'):
+                with lock:
+                    first = self.path not in failed
+                    failed.add(self.path)
+                if first:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+            body = body_for(self.path)
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫引擎基准测试')
+    parser.add_argument('--urls', type=int, default=16, help='URL数量')
+    parser.add_argument('--lines', type=int, default=2000, help='每个URL返回的数据行数')
+    parser.add_argument('--delay', type=float, default=0.2, help='桩服务器每个请求的延迟（秒）')
+    parser.add_argument('--workers', type=int, default=8, help='并发抓取的线程数')
+    args = parser.parse_args()
+
+    from crawler import CrawlEngine, build_sources
+
+    server = ThreadingHTTPServer(('0.0.0.0', 0), make_handler(args.lines, args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # 两个主机名分别限速
+    hosts = [f'http://127.0.0.1:{port}', f'http://127.0.0.2:{port}']
+    urls = [f'{hosts[i % 2]}/feed/{i}.jsonl' for i in range(args.urls)]
+    sources = build_sources([
+        {'type': 'jsonl', 'name': 'stub_feed', 'urls': urls},
+        {'type': 'jsonl', 'name': 'stub_flaky', 'urls': [f'{hosts[0]}/flaky/1.jsonl']}
+    ])
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        def run(label, workers, cache_dir):
+            engine = CrawlEngine(sources, cache_dir=cache_dir, max_workers=workers,
+                                 rate_limit=50, retries=3, backoff=0.05)
+            items, report = engine.run()
+            print(f'{label}: {report["elapsed"] * 1000:.0f} ms, {report["items"]} 条数据, '
+                  f'{report["requests"]} 个URL, {report["cached"]} 个304, '
+                  f'{report["retries"]} 次重试, {report["errors"]} 个失败')
+            return report
+
+        print(f'URL: {args.urls + 1}, 每个 {args.lines} 行, 服务器延迟 {args.delay * 1000:.0f} ms')
+        run('串行抓取（1线程）', 1, os.path.join(tmpdir, 'serial'))
+        run(f'并发抓取（{args.workers}线程）', args.workers, os.path.join(tmpdir, 'concurrent'))
+        run('再次并发抓取（条件请求）', args.workers, os.path.join(tmpdir, 'concurrent'))
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
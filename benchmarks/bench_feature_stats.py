@@ -0,0 +1,160 @@
+"""特征统计基准测试
+
+对比原来逐条加载ORM对象计算的 get_user_data() / get_crawled_data_stats()
+与 feature_stats 模块（SQL聚合 + 每日汇总表）的耗时和内存峰值，并检查两者结果一致。
+
+用法: python benchmarks/bench_feature_stats.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def legacy_user_data(Task, FocusTime):
+    """原来的实现：加载全部ORM对象后在Python中计算（标签编码使用相同的encode_tag）"""
+    from feature_stats import encode_tag
+    days_ago = datetime.utcnow() - timedelta(days=14)
+    focus_times = FocusTime.query.filter(FocusTime.start_time >= days_ago).all()
+    if not focus_times:
+        return None
+    
+    durations = [ft.duration for ft in focus_times]
+    efficiencies = [ft.efficiency_score for ft in focus_times]
+    tasks = Task.query.filter(Task.created_at >= days_ago).all()
+    completed_tasks = [t for t in tasks if t.status == 'completed']
+    high_priority_tasks = [t for t in tasks if t.priority == 3]
+    
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    weekly_completed = Task.query.filter(Task.status == 'completed', Task.completed_at >= week_ago).count()
+    
+    tags_count = {}
+    for task in tasks:
+        if task.tags:
+            for tag in [tag.strip() for tag in task.tags.split(',') if tag.strip()]:
+                tags_count[tag] = tags_count.get(tag, 0) + 1
+    main_tag = max(tags_count.items(), key=lambda x: x[1])[0] if tags_count else 'general'
+    
+    return {
+        'avg_duration': sum(durations) / len(durations),
+        'avg_efficiency': sum(efficiencies) / len(efficiencies),
+        'completion_rate': len(completed_tasks) / len(tasks) if tasks else 0.5,
+        'high_priority_ratio': len(high_priority_tasks) / len(tasks) if tasks else 0.3,
+        'weekly_completed': weekly_completed,
+        'tag_encoded': encode_tag(main_tag)
+    }
+
+
+def legacy_crawled_stats(CrawledData):
+    crawled_data = CrawledData.query.all()
+    if not crawled_data:
+        return None
+    durations = [cd.duration for cd in crawled_data]
+    efficiencies = [cd.efficiency for cd in crawled_data]
+    return {
+        'avg_duration': sum(durations) / len(durations),
+        'avg_efficiency': sum(efficiencies) / len(efficiencies)
+    }
+
+
+def seed(db, rows):
+    """写入rows条任务、专注记录和爬虫数据（时间分布在最近20天内）"""
+    random.seed(rows)
+    now = datetime.utcnow()
+    tags = ['work', 'study', 'general', 'creative', 'work,study', '']
+    
+    def ts():
+        # 避开7天和14天窗口边界前后1小时，使两次调用之间时间推移不影响结果比较
+        while True:
+            seconds = random.uniform(0, 20 * 86400)
+            if all(abs(seconds - days * 86400) > 3600 for days in (7, 14)):
+                return (now - timedelta(seconds=seconds)).isoformat(' ')
+    
+    conn = db.session.connection()
+    task_rows = []
+    for i in range(rows):
+        created = ts()
+        completed = random.random() < 0.5
+        task_rows.append((f'task {i}', random.choice([1, 2, 3]), random.choice(tags),
+                          'completed' if completed else 'pending', i, created, created if completed else None))
+    conn.exec_driver_sql(
+        'INSERT INTO tasks (title, priority, tags, status, order_index, created_at, completed_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)', task_rows)
+    conn.exec_driver_sql(
+        'INSERT INTO focus_times (duration, start_time, efficiency_score) VALUES (?, ?, ?)',
+        [(random.uniform(5, 90), ts(), random.random()) for _ in range(rows)])
+    conn.exec_driver_sql(
+        'INSERT INTO crawled_data (source, duration, category, efficiency, crawled_at, raw_data) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [('bench', random.uniform(20, 45), 'work', random.random(), ts(), '{}') for _ in range(rows)])
+    db.session.commit()
+
+
+def measure(func):
+    """返回 (结果, 耗时ms, 内存峰值MB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def same(a, b):
+    if a is None or b is None:
+        return a is b
+    return all(math.isclose(a[key], b[key], rel_tol=1e-9) for key in a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='特征统计基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmpdir, "bench.db")}'
+    
+    from app import app, db, get_user_data, get_crawled_data_stats
+    from models import Task, FocusTime, CrawledData
+    from rollup import rebuild_daily_stats
+    from tagging import migrate_task_tags
+    from crawl_stats import rebuild_crawled_stats
+    
+    print(f'{"行数":>10} {"函数":<24} {"原实现ms":>10} {"新实现ms":>10} {"原内存MB":>10} {"新内存MB":>10} 一致')
+    with app.app_context():
+        for size in args.sizes:
+            db.drop_all()
+            db.create_all()
+            seed(db, size)
+            # 种子数据直接用SQL写入，需要重新生成增量维护的汇总表
+            migrate_task_tags()
+            rebuild_daily_stats()
+            rebuild_crawled_stats()
+            db.session.expunge_all()
+            
+            cases = [
+                ('get_user_data', lambda: legacy_user_data(Task, FocusTime), get_user_data),
+                ('get_crawled_data_stats', lambda: legacy_crawled_stats(CrawledData), get_crawled_data_stats),
+            ]
+            for name, legacy, current in cases:
+                old, old_ms, old_mb = measure(legacy)
+                db.session.expunge_all()
+                new, new_ms, new_mb = measure(current)
+                print(f'{size:>10} {name:<24} {old_ms:>10.1f} {new_ms:>10.1f} {old_mb:>10.1f} {new_mb:>10.2f} '
+                      f'{"是" if same(old, new) else "否"}')
+    
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""索引效果基准测试
+
+在临时SQLite数据库中写入大量数据，分别在无索引和有索引（models.py中声明的索引）
+两种情况下输出热点查询的查询计划（EXPLAIN QUERY PLAN）和耗时。
+
+用法: python benchmarks/bench_indexes.py [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, func, text
+from models import db, Task, FocusTime, UserRecommendation, CrawledData
+
+
+def seed(engine, rows):
+    """写入测试数据：任务和专注记录各rows条，爬虫数据和推荐记录各rows/10条"""
+    random.seed(42)
+    now = datetime.utcnow()
+    tags = ['work', 'study', 'general', 'creative', 'work,study', '']
+    
+    def ts(days):
+        return (now - timedelta(seconds=random.uniform(0, days * 86400))).isoformat(' ')
+    
+    with engine.begin() as conn:
+        task_rows = []
+        for i in range(rows):
+            created = ts(60)
+            completed = random.random() < 0.5
+            task_rows.append((
+                f'task {i}', random.choice([1, 2, 3]), random.choice(tags),
+                'completed' if completed else 'pending', i, created,
+                created if completed else None
+            ))
+        conn.exec_driver_sql(
+            'INSERT INTO tasks (title, priority, tags, status, order_index, created_at, completed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', task_rows)
+        
+        conn.exec_driver_sql(
+            'INSERT INTO focus_times (task_id, duration, start_time, efficiency_score) VALUES (?, ?, ?, ?)',
+            [(random.randint(1, rows), random.uniform(5, 90), ts(60), random.random()) for _ in range(rows)])
+        
+        conn.exec_driver_sql(
+            'INSERT INTO crawled_data (source, duration, category, efficiency, crawled_at, raw_data) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [('bench', random.uniform(20, 45), 'work', random.random(), ts(60), '{}') for _ in range(rows // 10)])
+        
+        conn.exec_driver_sql(
+            'INSERT INTO user_recommendations (recommended_duration, confidence, created_at) VALUES (?, ?, ?)',
+            [(random.uniform(15, 60), random.random(), ts(60)) for _ in range(rows // 10)])
+
+
+def hot_queries():
+    """应用中的热点查询"""
+    now = datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    days_ago = now - timedelta(days=14)
+    # 汇总表之外只需扫描窗口起点所在的那一天（见rollup.window_summary）
+    boundary_end = datetime.combine(days_ago.date() + timedelta(days=1), datetime.min.time())
+    return [
+        ('每周完成任务数', select(func.count(Task.id)).where(
+            Task.status == 'completed', Task.completed_at >= week_ago)),
+        ('窗口起点当天创建的任务', select(func.count(Task.id), func.sum(Task.priority)).where(
+            Task.created_at >= days_ago, Task.created_at < boundary_end)),
+        ('任务列表排序', select(Task.id, Task.title).order_by(Task.order_index.asc()).limit(50)),
+        ('最大排序值', select(func.max(Task.order_index))),
+        ('窗口起点当天的专注记录', select(func.count(FocusTime.id), func.sum(FocusTime.duration)).where(
+            FocusTime.start_time >= days_ago, FocusTime.start_time < boundary_end)),
+        ('任务的专注记录', select(func.sum(FocusTime.duration)).where(FocusTime.task_id == 12345)),
+        ('最旧的爬虫数据', select(CrawledData.id).order_by(CrawledData.crawled_at.asc()).limit(100)),
+        ('最新推荐记录', select(UserRecommendation.id).order_by(UserRecommendation.created_at.desc()).limit(1)),
+    ]
+
+
+def run_queries(engine, label, repeat):
+    print(f'\n===== {label} =====')
+    results = {}
+    with engine.connect() as conn:
+        for name, query in hot_queries():
+            sql = str(query.compile(engine, compile_kwargs={'literal_binds': True}))
+            plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(query).fetchall()
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            results[name] = elapsed
+            print(f'{name}: {elapsed:.3f} ms')
+            for row in plan:
+                print(f'    {row[-1]}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='索引效果基准测试')
+    parser.add_argument('--rows', type=int, default=1000000, help='任务和专注记录的数量')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询重复执行次数')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f'sqlite:///{os.path.join(tmpdir, "bench.db")}')
+        tables = [Task.__table__, FocusTime.__table__, CrawledData.__table__, UserRecommendation.__table__]
+        db.metadata.create_all(engine, tables=tables)
+        
+        # 先删除索引，得到无索引的基线
+        indexes = [index for table in tables for index in table.indexes]
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(bind=conn)
+        
+        print(f'写入测试数据（{args.rows} 行）...')
+        started = time.perf_counter()
+        seed(engine, args.rows)
+        print(f'写入耗时 {time.perf_counter() - started:.1f} s')
+        
+        before = run_queries(engine, '无索引', args.repeat)
+        
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(bind=conn)
+            conn.execute(text('ANALYZE'))
+        print(f'\n创建索引耗时 {time.perf_counter() - started:.1f} s')
+        
+        after = run_queries(engine, '有索引', args.repeat)
+        
+        print('\n===== 对比 =====')
+        for name in before:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f'{name}: {before[name]:.3f} ms -> {after[name]:.3f} ms ({speedup:.1f}x)')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
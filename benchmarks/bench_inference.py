@@ -0,0 +1,68 @@
+"""模型推理基准测试
+
+对比 sklearn 路径（StandardScaler.transform + RandomForestRegressor.predict）
+与导出的扁平节点数组（forest.CompiledForest）在单条样本和批量样本上的预测耗时，
+并检查两者预测结果的最大差异。
+
+用法: python benchmarks/bench_inference.py [--samples 3000] [--batch 10000] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def best_of(func, repeat):
+    """执行repeat次，返回最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型推理基准测试')
+    parser.add_argument('--samples', type=int, default=3000, help='训练样本数量')
+    parser.add_argument('--batch', type=int, default=10000, help='批量预测的样本数量')
+    parser.add_argument('--repeat', type=int, default=200, help='单条预测的重复次数')
+    args = parser.parse_args()
+
+    from ml_model import FocusTimePredictor
+
+    rng = np.random.default_rng(0)
+    scale = [60, 1, 1, 1, 20, 10, 60, 1]
+    X = rng.random((args.samples, 8)) * scale
+    y = X[:, 0] * 0.8 + rng.normal(0, 3, args.samples)
+    predictor = FocusTimePredictor()
+    predictor.train(X, y)
+    model, scaler, compiled = predictor.model, predictor.scaler, predictor.estimator
+
+    single = rng.random((1, 8)) * scale
+    batch = rng.random((args.batch, 8)) * scale
+
+    diff = np.abs(model.predict(scaler.transform(batch)) - compiled.predict(batch)).max()
+    print(f'训练样本: {args.samples}, 树: {len(model.estimators_)}, 节点: {len(compiled.value)}, '
+          f'最大深度: {compiled.depth}')
+    print(f'与sklearn预测的最大差异: {diff:.2e}')
+
+    sklearn_single = best_of(lambda: model.predict(scaler.transform(single)), args.repeat)
+    compiled_single = best_of(lambda: compiled.predict(single), args.repeat)
+    print(f'单条: sklearn {sklearn_single * 1e6:.0f} us, 扁平数组 {compiled_single * 1e6:.0f} us, '
+          f'加速 {sklearn_single / compiled_single:.1f}x')
+
+    batch_repeat = max(3, args.repeat // 50)
+    sklearn_batch = best_of(lambda: model.predict(scaler.transform(batch)), batch_repeat)
+    compiled_batch = best_of(lambda: compiled.predict(batch), batch_repeat)
+    print(f'批量{args.batch}条: sklearn {sklearn_batch * 1000:.1f} ms, 扁平数组 {compiled_batch * 1000:.1f} ms, '
+          f'加速 {sklearn_batch / compiled_batch:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
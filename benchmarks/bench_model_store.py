@@ -0,0 +1,107 @@
+"""模型加载冷启动与内存基准测试
+
+训练一个随机森林，分别保存为旧的 ml_model.pkl 和模型存储中的版本，
+在独立子进程中测量: 创建预测器并加载模型的耗时（旧方式立即读取，模型存储延迟到首次预测）、
+首次预测的耗时，以及进程最大常驻内存。
+
+用法: python benchmarks/bench_model_store.py [--samples 5000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 子进程脚本: 输出 加载耗时、首次预测耗时、最大常驻内存（KB）
+CHILD = r'''
+import json, pickle, resource, sys, time
+sys.path.insert(0, {root!r})
+mode, path = sys.argv[1], sys.argv[2]
+from ml_model import FocusTimePredictor
+from model_store import ModelStore
+base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+started = time.perf_counter()
+if mode == 'legacy':
+    predictor = FocusTimePredictor()
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    model, scaler = data['model'], data['scaler']
+else:
+    predictor = FocusTimePredictor()
+    ModelStore(path).load(predictor)
+load_time = time.perf_counter() - started
+
+user_data = {{'avg_duration': 30, 'completion_rate': 0.6, 'avg_efficiency': 0.7,
+             'high_priority_ratio': 0.3, 'weekly_completed': 5, 'tag_encoded': 1}}
+started = time.perf_counter()
+if mode == 'legacy':
+    model.predict(scaler.transform(predictor.prepare_features(user_data)))
+else:
+    predictor.predict(user_data, {{'avg_duration': 25, 'avg_efficiency': 0.5}})
+predict_time = time.perf_counter() - started
+
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'load': load_time, 'predict': predict_time, 'rss': rss, 'base_rss': base_rss}}))
+'''
+
+
+def run_child(mode, path, repeat):
+    script = CHILD.format(root=ROOT)
+    results = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', script, mode, path],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        results.append(json.loads(output))
+    return {key: min(r[key] for r in results) for key in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型加载冷启动与内存基准测试')
+    parser.add_argument('--samples', type=int, default=5000, help='训练样本数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每种方式的重复次数（取最小值）')
+    args = parser.parse_args()
+
+    from ml_model import FocusTimePredictor
+    from model_store import ModelStore
+
+    rng = np.random.default_rng(0)
+    X = rng.random((args.samples, 8)) * [60, 1, 1, 1, 20, 10, 60, 1]
+    y = X[:, 0] * 0.8 + rng.normal(0, 3, args.samples)
+    predictor = FocusTimePredictor()
+    predictor.train(X, y)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        legacy_path = os.path.join(tmpdir, 'ml_model.pkl')
+        with open(legacy_path, 'wb') as f:
+            pickle.dump({'model': predictor.model, 'scaler': predictor.scaler, 'is_trained': True}, f)
+        store_dir = os.path.join(tmpdir, 'store')
+        ModelStore(store_dir).save(predictor)
+
+        print(f'样本数: {args.samples}')
+        print(f'旧模型文件: {os.path.getsize(legacy_path) / 1024:.0f} KB, '
+              f'模型存储文件: {os.path.getsize(ModelStore(store_dir).model_path()) / 1024:.0f} KB')
+
+        for label, mode, path in (('旧方式 立即加载', 'legacy', legacy_path),
+                                  ('模型存储 延迟加载', 'store', store_dir)):
+            r = run_child(mode, path, args.repeat)
+            print(f'{label}: 加载 {r["load"] * 1000:.1f} ms, 首次预测 {r["predict"] * 1000:.1f} ms, '
+                  f'合计 {(r["load"] + r["predict"]) * 1000:.1f} ms, '
+                  f'最大常驻内存 {r["rss"] / 1024:.1f} MB (导入后 {r["base_rss"] / 1024:.1f} MB)')
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""模型后端对比基准测试（准确率 vs 训练代价）
+
+在模拟的专注记录流上按时间顺序逐条评估（先预测下一条记录，再把它加入训练数据）:
+- forest: 每refit条记录用最近window条样本全量重训随机森林（当前默认行为）
+- online: 递推最小二乘，每条记录增量更新（可选遗忘因子）
+输出各后端的平均绝对误差（MAE）、累计训练耗时和单次更新耗时。
+
+用法: python benchmarks/bench_online.py [--sessions 2000] [--refit 10] [--window 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def simulate(sessions, seed=0):
+    """生成特征随时间缓慢变化、目标带非线性和漂移的专注记录流"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 1, (sessions, 8)) * [0.5, 0.02, 0.02, 0.02, 0.3, 0, 0, 0]
+    base = np.array([25.0, 0.5, 0.5, 0.3, 5.0, 3.0, 25.0, 0.5])
+    X = base + np.cumsum(steps, axis=0)
+    X[:, 1:4] = np.clip(X[:, 1:4], 0, 1)
+    X[:, 4] = np.clip(X[:, 4], 0, None)
+    drift = np.linspace(0, 5, sessions)
+    y = (5 + 0.6 * X[:, 0] + 10 * X[:, 1] + 8 * X[:, 2] + 2 * np.sin(X[:, 4])
+         + drift + rng.normal(0, 3, sessions))
+    return X, np.clip(y, 5, 120)
+
+
+def evaluate(name, X, y, warmup, fit, update):
+    """按时间顺序评估，返回 (MAE, 累计训练耗时, 训练/更新次数)
+
+    fit(predictor, i) 需要全量训练时返回新的预测器，否则返回None；
+    update(predictor, X, y) 增量更新，返回是否更新了模型。
+    """
+    errors = []
+    train_time = 0.0
+    runs = 0
+    predictor = None
+    for i in range(len(y)):
+        if predictor is not None and i >= warmup:
+            prediction = predictor.predict_batch(X[i:i + 1])[0][0]
+            errors.append(abs(prediction - np.clip(y[i], 15, 60)))
+
+        started = time.perf_counter()
+        result = fit(predictor, i)
+        if result is not None:
+            predictor = result
+            runs += 1
+        elif predictor is not None and update(predictor, X[i:i + 1], y[i:i + 1]):
+            runs += 1
+        train_time += time.perf_counter() - started
+
+    mae = float(np.mean(errors))
+    print(f'{name}: MAE {mae:.2f} 分钟, 累计训练 {train_time:.2f} s, '
+          f'{runs} 次训练/更新, 平均 {train_time / max(runs, 1) * 1000:.2f} ms/次')
+    return mae, train_time, runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模型后端准确率与训练代价对比')
+    parser.add_argument('--sessions', type=int, default=2000, help='模拟的专注记录数量')
+    parser.add_argument('--refit', type=int, default=10, help='随机森林每多少条记录重训一次')
+    parser.add_argument('--window', type=int, default=300, help='随机森林重训使用的最近样本数')
+    parser.add_argument('--warmup', type=int, default=50, help='开始统计误差前的记录数')
+    args = parser.parse_args()
+
+    from ml_model import FocusTimePredictor
+
+    X, y = simulate(args.sessions)
+    print(f'模拟记录: {args.sessions}, 随机森林每 {args.refit} 条重训（最近 {args.window} 条）')
+
+    def forest_fit(predictor, i):
+        if i + 1 < 4 or (predictor is not None and (i + 1) % args.refit != 0):
+            return None
+        start = max(0, i + 1 - args.window)
+        new = FocusTimePredictor(backend='forest')
+        return new if new.train(X[start:i + 1], y[start:i + 1]) else None
+
+    evaluate('forest', X, y, args.warmup, forest_fit, lambda p, xs, ys: False)
+
+    for forgetting in (1.0, 0.99):
+        def online_fit(predictor, i, forgetting=forgetting):
+            if predictor is not None or i + 1 < 4:
+                return None
+            new = FocusTimePredictor(backend='online', forgetting=forgetting)
+            new.train(X[:i + 1], y[:i + 1])
+            return new
+
+        evaluate(f'online (forgetting={forgetting})', X, y, args.warmup,
+                 online_fit, lambda p, xs, ys: p.partial_fit(xs, ys))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""任务列表序列化基准测试
+
+在临时SQLite数据库中插入若干任务（默认10000个），对比:
+- 序列化: 加载ORM对象 + to_dict + Flask默认的标准库json，与按列查询元组 + orjson（serialization.py）
+  的查询耗时、编码耗时和输出字节数
+- 压缩: 不压缩、gzip、brotli（已安装时）的字节数和压缩耗时
+- 端到端: GET /api/tasks 在不同Accept-Encoding下的响应字节数和耗时
+
+用法: python benchmarks/bench_serialization.py [--count 10000] [--repeat 5]
+"""
+import argparse
+import gzip
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def measure(func, repeat):
+    """执行repeat次，返回 (中位数耗时秒, 最后一次的结果)"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def seed(db, Task, count):
+    random.seed(42)
+    now = datetime.utcnow()
+    tags = ['工作', '学习', '生活', 'work', 'study', '阅读,学习', '工作,会议']
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=random.randint(0, 60 * 24 * 30))
+        completed = random.random() < 0.4
+        rows.append({
+            'title': f'任务 {i}: 完成第{i % 37}章的阅读笔记',
+            'description': '需要整理要点并写出总结' if i % 3 else None,
+            'priority': random.randint(1, 3),
+            'tags': random.choice(tags),
+            'status': 'completed' if completed else 'pending',
+            'order_index': (i + 1) * 1024,
+            'created_at': created,
+            'completed_at': created + timedelta(hours=2) if completed else None
+        })
+    db.session.execute(db.insert(Task), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='任务列表序列化基准测试')
+    parser.add_argument('--count', type=int, default=10000, help='任务数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测量的重复次数（取中位数）')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmpdir, "bench.db")}'
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import app, db
+    from models import Task, TASK_FIELDS
+    import serialization
+
+    with app.app_context():
+        db.create_all()
+        seed(db, Task, args.count)
+
+        default_json = DefaultJSONProvider(app)
+        columns = [getattr(Task, f) for f in TASK_FIELDS]
+
+        def orm_query():
+            db.session.expunge_all()
+            return {'success': True, 'data': [task.to_dict() for task in Task.query.order_by(Task.order_index).all()]}
+
+        def tuple_query():
+            rows = db.session.query(*columns).order_by(Task.order_index).all()
+            return {'success': True, 'data': serialization.rows_to_dicts(TASK_FIELDS, rows)}
+
+        orm_time, orm_obj = measure(orm_query, args.repeat)
+        tuple_time, tuple_obj = measure(tuple_query, args.repeat)
+        stdlib_time, stdlib_body = measure(
+            lambda: default_json.dumps(orm_obj, separators=(',', ':')).encode('utf-8'), args.repeat)
+        fast_time, fast_body = measure(lambda: serialization.dumps(tuple_obj), args.repeat)
+
+        print(f'===== 序列化（{args.count} 个任务，{"orjson" if serialization.orjson else "标准库json"}） =====')
+        print(f'{"方式":<28}{"查询ms":>10}{"编码ms":>10}{"字节数":>12}')
+        print(f'{"ORM + to_dict + 标准库json":<24}{orm_time * 1000:>10.1f}{stdlib_time * 1000:>10.1f}{len(stdlib_body):>12}')
+        print(f'{"按列元组 + orjson":<26}{tuple_time * 1000:>10.1f}{fast_time * 1000:>10.1f}{len(fast_body):>12}')
+        total_before = orm_time + stdlib_time
+        total_after = tuple_time + fast_time
+        print(f'合计: {total_before * 1000:.1f} ms -> {total_after * 1000:.1f} ms ({total_before / total_after:.1f}x)')
+
+        print('\n===== 压缩（orjson输出） =====')
+        print(f'{"编码":<14}{"字节数":>12}{"压缩ms":>10}{"比例":>8}')
+        print(f'{"identity":<14}{len(fast_body):>12}{0:>10.1f}{1:>8.2f}')
+        methods = [
+            (f'gzip-{level}', lambda level=level: gzip.compress(fast_body, compresslevel=level, mtime=0))
+            for level in (1, 6, 9)
+        ]
+        if serialization.brotli is not None:
+            methods += [
+                (f'br-{quality}', lambda quality=quality: serialization.brotli.compress(fast_body, quality=quality))
+                for quality in (4, 11)
+            ]
+        else:
+            print('（未安装brotli，跳过br）')
+        for label, func in methods:
+            elapsed, body = measure(func, args.repeat)
+            print(f'{label:<14}{len(body):>12}{elapsed * 1000:>10.1f}{len(body) / len(fast_body):>8.2f}')
+
+    print('\n===== 端到端 GET /api/tasks =====')
+    client = app.test_client()
+    encodings = ['identity', 'gzip'] + (['br'] if serialization.brotli is not None else [])
+    for encoding in encodings:
+        elapsed, response = measure(
+            lambda: client.get('/api/tasks', headers={'Accept-Encoding': encoding}), args.repeat)
+        print(f'{encoding:<10}{len(response.data):>12} 字节{elapsed * 1000:>10.1f} ms'
+              f'  Content-Encoding: {response.headers.get("Content-Encoding", "-")}')
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""数据库并发读写基准测试
+
+在临时SQLite数据库中用多个线程同时执行:
+- 写线程: 每个事务插入一条专注记录（模拟记录专注时间和定时爬取/清理任务的写入）
+- 读线程: 统计最近7天的专注时长（模拟分析接口）
+分别测量默认配置（回滚日志模式、默认连接参数）和 storage.py 中的配置
+（WAL、synchronous=NORMAL、busy_timeout、mmap、连接池）下的读写吞吐量和失败次数。
+
+用法: python benchmarks/bench_storage.py [--rows 50000] [--readers 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from models import db, FocusTime
+from storage import DEFAULT_SQLITE_PRAGMAS, engine_options, install_pragmas
+
+
+def seed(engine, rows):
+    random.seed(42)
+    now = datetime.utcnow()
+    db.metadata.create_all(engine)
+    values = []
+    for _ in range(rows):
+        start = now - timedelta(seconds=random.uniform(0, 30 * 86400))
+        duration = random.uniform(5, 90)
+        values.append({'duration': duration, 'start_time': start,
+                       'end_time': start + timedelta(minutes=duration),
+                       'efficiency_score': random.random()})
+    with engine.begin() as conn:
+        conn.execute(insert(FocusTime.__table__), values)
+
+
+def run(label, write_engine, read_engine, readers, writers, seconds):
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    latencies = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    table = FocusTime.__table__
+    query = select(func.count(), func.sum(table.c.duration)).where(
+        table.c.start_time >= datetime.utcnow() - timedelta(days=7)
+    )
+
+    def count(name, started=None):
+        with lock:
+            counts[name] += 1
+            if started is not None:
+                latencies.append(time.perf_counter() - started)
+
+    def reader():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(query).one()
+                count('reads', started)
+            except OperationalError:
+                count('errors')
+
+    def writer():
+        while not stop.is_set():
+            now = datetime.utcnow()
+            try:
+                with write_engine.begin() as conn:
+                    conn.execute(insert(table).values(duration=25, start_time=now, end_time=now,
+                                                      efficiency_score=0.8))
+                count('writes')
+            except OperationalError:
+                count('errors')
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    print(f'{label}: 读 {counts["reads"] / seconds:.0f} 次/秒（p95 {p95:.1f} ms），'
+          f'写 {counts["writes"] / seconds:.0f} 次/秒，失败 {counts["errors"]} 次')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库并发读写基准测试')
+    parser.add_argument('--rows', type=int, default=50000, help='预先写入的专注记录数')
+    parser.add_argument('--readers', type=int, default=8, help='读线程数')
+    parser.add_argument('--writers', type=int, default=2, help='写线程数')
+    parser.add_argument('--seconds', type=float, default=5, help='每种配置的运行时间（秒）')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        pool = {'pool_size': args.readers + args.writers, 'max_overflow': 0}
+        print(f'专注记录: {args.rows}, 读线程: {args.readers}, 写线程: {args.writers}')
+
+        url = f'sqlite:///{os.path.join(tmpdir, "default.db")}'
+        engine = create_engine(url, **pool)
+        seed(engine, args.rows)
+        run('默认配置（回滚日志）', engine, engine, args.readers, args.writers, args.seconds)
+        engine.dispose()
+
+        url = f'sqlite:///{os.path.join(tmpdir, "tuned.db")}'
+        write_engine = create_engine(url, **engine_options(url, **pool))
+        read_engine = create_engine(url, **engine_options(url, read_only=True, **pool))
+        install_pragmas(write_engine, DEFAULT_SQLITE_PRAGMAS)
+        install_pragmas(read_engine, DEFAULT_SQLITE_PRAGMAS, read_only=True)
+        seed(write_engine, args.rows)
+        run('WAL + 调优参数 + 只读引擎', write_engine, read_engine, args.readers, args.writers, args.seconds)
+        write_engine.dispose()
+        read_engine.dispose()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
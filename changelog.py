@@ -0,0 +1,75 @@
+from models import db, Task, TaskChange, TASK_FIELDS
+from versioning import bump_version, get_version
+from events import bus
+from serialization import rows_to_dicts
+from datetime import datetime
+
+# 一次增量同步最多返回的变更任务数，超过时客户端重新加载完整列表
+MAX_CHANGES = 1000
+
+
+def record_task_changes(upserts=(), deletes=()):
+    """记录任务变更（不提交事务，与任务数据在同一事务中提交）
+
+    递增任务表版本号，并以新版本号为每个新增/修改（upserts）和删除（deletes）的任务写入一条变更记录，
+    事务提交后向事件流发布tasks事件（只携带版本号，客户端通过task_changes获取变更）。返回新版本号。
+    """
+    version = bump_version('tasks')
+    now = datetime.utcnow()
+    rows = [{'version': version, 'task_id': task_id, 'deleted': False, 'changed_at': now}
+            for task_id in dict.fromkeys(upserts)]
+    rows += [{'version': version, 'task_id': task_id, 'deleted': True, 'changed_at': now}
+             for task_id in dict.fromkeys(deletes)]
+    if rows:
+        db.session.execute(db.insert(TaskChange), rows)
+    bus.publish_on_commit(db.session, 'tasks', {'version': version})
+    return version
+
+
+def record_task_deletions(ids):
+    """数据清理删除任务前调用：记录删除"""
+    record_task_changes(deletes=ids)
+
+
+def task_changes(since, max_changes=MAX_CHANGES):
+    """获取版本号since之后的任务变更
+
+    返回 {'version', 'reset', 'upserts', 'deletes'}：upserts为变更任务的当前数据，deletes为删除的任务ID。
+    变更日志已被清理（since早于最早的记录）或变更任务数超过max_changes时reset为True，
+    客户端需要重新加载完整列表。
+    """
+    # 先读取版本号：之后提交的变更可能也会返回，客户端下次同步时会再收到一次，不会遗漏
+    version = get_version('tasks')
+    result = {'version': version, 'reset': False, 'upserts': [], 'deletes': []}
+    if since == version:
+        return result
+
+    oldest = db.session.query(db.func.min(TaskChange.version)).scalar()
+    if since > version or oldest is None or since < oldest - 1:
+        result['reset'] = True
+        return result
+
+    # 同一任务以最后一次变更为准
+    latest = {}
+    rows = db.session.query(TaskChange.task_id, TaskChange.deleted).filter(
+        TaskChange.version > since
+    ).order_by(TaskChange.version.asc(), TaskChange.id.asc())
+    for task_id, deleted in rows:
+        latest.pop(task_id, None)
+        latest[task_id] = deleted
+    if len(latest) > max_changes:
+        result['reset'] = True
+        return result
+
+    # 按列查询，不加载ORM对象
+    upsert_ids = [task_id for task_id, deleted in latest.items() if not deleted]
+    rows = []
+    if upsert_ids:
+        rows = db.session.query(*[getattr(Task, f) for f in TASK_FIELDS]).filter(
+            Task.id.in_(upsert_ids)
+        ).order_by(Task.order_index.asc(), Task.id.asc()).all()
+    result['upserts'] = rows_to_dicts(TASK_FIELDS, rows)
+    found = {task['id'] for task in result['upserts']}
+    # 修改后又被其他途径删除的任务同样作为删除返回
+    result['deletes'] = [task_id for task_id, deleted in latest.items() if deleted or task_id not in found]
+    return result
@@ -0,0 +1,101 @@
+from models import db, CrawledData, CrawledStats
+from rollup import upsert
+from collections import defaultdict
+import math
+
+STAT_FIELDS = ['count', 'duration_sum', 'duration_sumsq', 'efficiency_count', 'efficiency_sum', 'efficiency_sumsq']
+
+
+def _key(source, category):
+    # 唯一约束列不能为空，空值统一记为空字符串
+    return source or '', category or ''
+
+
+def apply_crawled_rows(rows, sign=1):
+    """把一批爬虫数据 (source, category, duration, efficiency) 计入（sign=1）或移出（sign=-1）累计统计"""
+    deltas = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+    for source, category, duration, efficiency in rows:
+        delta = deltas[_key(source, category)]
+        duration = duration or 0.0
+        delta['count'] += sign
+        delta['duration_sum'] += sign * duration
+        delta['duration_sumsq'] += sign * duration * duration
+        if efficiency is not None:
+            delta['efficiency_count'] += sign
+            delta['efficiency_sum'] += sign * efficiency
+            delta['efficiency_sumsq'] += sign * efficiency * efficiency
+    
+    for (source, category), delta in deltas.items():
+        upsert(CrawledStats, ['source', 'category'], dict(delta, source=source, category=category), STAT_FIELDS)
+    
+    if sign < 0 and deltas:
+        db.session.execute(db.delete(CrawledStats).where(CrawledStats.count <= 0))
+
+
+def subtract_crawled_ids(ids):
+    """删除爬虫数据前调用：把这些数据移出累计统计"""
+    rows = db.session.query(
+        CrawledData.source, CrawledData.category, CrawledData.duration, CrawledData.efficiency
+    ).filter(CrawledData.id.in_(ids)).all()
+    apply_crawled_rows(rows, sign=-1)
+
+
+def rebuild_crawled_stats():
+    """根据爬虫数据全量重建累计统计（一条 INSERT ... SELECT ... GROUP BY），返回分组数"""
+    source = db.func.coalesce(CrawledData.source, '')
+    category = db.func.coalesce(CrawledData.category, '')
+    duration = db.func.coalesce(CrawledData.duration, 0.0)
+    select = db.select(
+        source,
+        category,
+        db.func.count(CrawledData.id),
+        db.func.sum(duration),
+        db.func.sum(duration * duration),
+        db.func.count(CrawledData.efficiency),
+        db.func.coalesce(db.func.sum(CrawledData.efficiency), 0.0),
+        db.func.coalesce(db.func.sum(CrawledData.efficiency * CrawledData.efficiency), 0.0)
+    ).group_by(source, category)
+    
+    db.session.execute(db.delete(CrawledStats))
+    db.session.execute(db.insert(CrawledStats).from_select(
+        ['source', 'category'] + STAT_FIELDS, select
+    ))
+    db.session.commit()
+    return db.session.query(db.func.count(CrawledStats.id)).scalar()
+
+
+def _summarize(count, duration_sum, duration_sumsq, efficiency_count, efficiency_sum, efficiency_sumsq):
+    if not count:
+        return None
+    avg_duration = duration_sum / count
+    avg_efficiency = efficiency_sum / efficiency_count if efficiency_count else None
+    return {
+        'count': count,
+        'avg_duration': avg_duration,
+        'std_duration': math.sqrt(max(0.0, duration_sumsq / count - avg_duration ** 2)),
+        'avg_efficiency': avg_efficiency,
+        'std_efficiency': (math.sqrt(max(0.0, efficiency_sumsq / efficiency_count - avg_efficiency ** 2))
+                           if efficiency_count else None)
+    }
+
+
+def crawled_summary(category=None):
+    """爬虫数据的平均时长和效率（读取累计统计，与数据量无关）
+
+    category不为空时只统计该分类，该分类没有数据时返回None。
+    """
+    query = db.session.query(*[db.func.sum(getattr(CrawledStats, field)) for field in STAT_FIELDS])
+    if category is not None:
+        query = query.filter(CrawledStats.category == category)
+    return _summarize(*[value or 0 for value in query.one()])
+
+
+def crawled_breakdown():
+    """按来源和分类列出累计统计"""
+    rows = CrawledStats.query.order_by(CrawledStats.source, CrawledStats.category).all()
+    result = []
+    for row in rows:
+        summary = _summarize(*[getattr(row, field) for field in STAT_FIELDS])
+        if summary:
+            result.append(dict(summary, source=row.source, category=row.category))
+    return result
@@ -1,27 +1,97 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+import codecs
+import hashlib
+import os
+import threading
 import time
 import random
 from datetime import datetime
 import json
 
-class TimeManagementCrawler:
-    """时间管理数据爬虫"""
-    
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-    
-    def crawl_pomodoro_data(self):
-        """爬取番茄工作法相关数据"""
-        
+# 数据源类型注册表：类型名 -> 数据源类
+SOURCE_TYPES = {}
+
+
+def register_source(type_name):
+    """注册数据源类型（类装饰器）"""
+    def decorator(cls):
+        cls.type_name = type_name
+        SOURCE_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+
+def build_sources(configs):
+    """根据配置创建数据源，配置为 {'type': 类型名, ...其他参数} 的列表"""
+    sources = []
+    for config in configs:
+        config = dict(config)
+        type_name = config.pop('type')
+        if type_name not in SOURCE_TYPES:
+            raise ValueError(f'未知的数据源类型: {type_name}')
+        sources.append(SOURCE_TYPES[type_name](**config))
+    return sources
+
+
+def make_item(source, duration, category, efficiency, raw_data):
+    """构造一条爬虫数据，时长无效时返回None"""
+    try:
+        duration = float(duration)
+        efficiency = float(efficiency) if efficiency not in (None, '') else 0.5
+    except (TypeError, ValueError):
+        return None
+    if duration <= 0:
+        return None
+    return {
+        'source': source,
+        'duration': duration,
+        'category': str(category or 'general'),
+        'efficiency': min(1.0, max(0.0, efficiency)),
+        'raw_data': raw_data
+    }
+
+
+class CrawlSource:
+    """数据源基类
+
+    HTTP数据源实现 urls() 和 parse(url, chunks)，parse以字节块迭代器为输入
+    逐条产出数据（不把整个页面读入内存）；本地生成的数据源只实现 generate()。
+    """
+
+    type_name = None
+
+    def __init__(self, name=None):
+        self.name = name or self.type_name
+
+    def urls(self):
+        return []
+
+    def parse(self, url, chunks):
+        return iter(())
+
+    def generate(self):
+        return []
+
+
+@register_source('pomodoro')
+class PomodoroSource(CrawlSource):
+    """番茄工作法数据（模拟）"""
+
+    def __init__(self, name='pomodoro_technique', count=5):
+        super().__init__(name)
+        self.count = count
+
+    def generate(self):
         data = []
         categories = ['work', 'study', 'general', 'creative']
-        
-        for i in range(5):
+
+        for i in range(self.count):
             data.append({
-                'source': 'pomodoro_technique',
+                'source': self.name,
                 'duration': random.uniform(30, 40),
                 'category': random.choice(categories),
                 'efficiency': random.uniform(0.6, 0.9),
@@ -30,17 +100,25 @@ class TimeManagementCrawler:
                     'session_length': random.randint(20, 30)
                 })
             })
-        
+
         return data
-    
-    def crawl_productivity_data(self):
-        """爬取生产力数据"""
+
+
+@register_source('productivity')
+class ProductivitySource(CrawlSource):
+    """生产力研究数据（模拟）"""
+
+    def __init__(self, name='productivity_research', count=3):
+        super().__init__(name)
+        self.count = count
+
+    def generate(self):
         data = []
         categories = ['work', 'study', 'general']
-        
-        for i in range(3):
+
+        for i in range(self.count):
             data.append({
-                'source': 'productivity_research',
+                'source': self.name,
                 'duration': random.uniform(25, 45),
                 'category': random.choice(categories),
                 'efficiency': random.uniform(0.5, 0.85),
@@ -49,27 +127,335 @@ class TimeManagementCrawler:
                     'optimal_duration': random.randint(25, 45)
                 })
             })
-        
+
         return data
-    
+
+
+@register_source('jsonl')
+class JsonLinesSource(CrawlSource):
+    """每行一个JSON对象的数据源（含duration、category、efficiency字段）"""
+
+    def __init__(self, name, urls):
+        super().__init__(name)
+        self._urls = [urls] if isinstance(urls, str) else list(urls)
+
+    def urls(self):
+        return self._urls
+
+    def parse(self, url, chunks):
+        buffer = b''
+        for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                item = self._parse_line(line)
+                if item:
+                    yield item
+        item = self._parse_line(buffer)
+        if item:
+            yield item
+
+    def _parse_line(self, line):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(record, dict):
+            return None
+        return make_item(self.name, record.get('duration'), record.get('category'),
+                         record.get('efficiency'), line.decode('utf-8', 'replace'))
+
+
+class _TableRowParser(HTMLParser):
+    """增量解析HTML表格，每遇到一个完整的 <tr> 就记录其中单元格的文本"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(''.join(self._cell).strip())
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+@register_source('html_table')
+class HtmlTableSource(CrawlSource):
+    """HTML表格数据源，columns指定各列对应的字段（duration、category、efficiency）"""
+
+    def __init__(self, name, urls, columns=('duration', 'category', 'efficiency')):
+        super().__init__(name)
+        self._urls = [urls] if isinstance(urls, str) else list(urls)
+        self.columns = list(columns)
+
+    def urls(self):
+        return self._urls
+
+    def parse(self, url, chunks):
+        parser = _TableRowParser()
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        for chunk in chunks:
+            parser.feed(decoder.decode(chunk))
+            yield from self._drain(parser)
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        yield from self._drain(parser)
+
+    def _drain(self, parser):
+        rows, parser.rows = parser.rows, []
+        for cells in rows:
+            record = dict(zip(self.columns, cells))
+            item = make_item(self.name, record.get('duration'), record.get('category'),
+                             record.get('efficiency'), json.dumps(record, ensure_ascii=False))
+            if item:
+                yield item
+
+
+class HostRateLimiter:
+    """按主机限制请求速率（每个主机两次请求之间至少间隔 1/rate 秒）"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ResponseCache:
+    """磁盘响应缓存：保存响应体和ETag/Last-Modified，用于条件请求"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{key}.json'), os.path.join(self.directory, f'{key}.body')
+
+    def validators(self, url):
+        """缓存的条件请求头"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not os.path.exists(body_path):
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def read(self, url, chunk_size):
+        """逐块读取缓存的响应体"""
+        with open(self._paths(url)[1], 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def write_through(self, url, response, chunk_size):
+        """边读取响应边写入缓存，逐块产出响应体；读取完整后才替换旧缓存"""
+        meta_path, body_path = self._paths(url)
+        tmp_path = f'{body_path}.tmp-{threading.get_ident()}'
+        os.makedirs(self.directory, exist_ok=True)
+        completed = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            if not completed:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            os.replace(tmp_path, body_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'etag': etag, 'last_modified': last_modified,
+                           'fetched_at': datetime.utcnow().isoformat()}, f)
+        else:
+            # 没有校验信息的响应无法做条件请求，不缓存
+            os.remove(tmp_path)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+
+
+class CrawlEngine:
+    """爬虫引擎
+
+    多个URL通过共享连接池的 requests.Session 并发抓取，按主机限速；
+    带ETag/Last-Modified的响应缓存到磁盘，再次抓取时发送条件请求，304时解析缓存内容；
+    连接错误、超时、429和5xx按指数退避重试；响应按块流式解析。
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, sources, cache_dir='crawl_cache', max_workers=4, rate_limit=1.0,
+                 retries=3, backoff=0.5, timeout=10, headers=None):
+        self.sources = sources
+        self.cache = ResponseCache(cache_dir)
+        self.max_workers = max_workers
+        self.limiter = HostRateLimiter(rate_limit)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.last_report = None
+
+    def _request(self, url, stats):
+        """发送（条件）请求，必要时退避重试，返回响应"""
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.limiter.wait(host)
+            try:
+                response = self.session.get(url, headers=self.cache.validators(url),
+                                            timeout=self.timeout, stream=True)
+                if response.status_code not in self.RETRY_STATUS or attempt >= self.retries:
+                    return response
+                delay = self._retry_after(response)
+                response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                delay = None
+
+            attempt += 1
+            stats['retries'] += 1
+            time.sleep(delay if delay is not None else self.backoff * (2 ** (attempt - 1)))
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get('Retry-After')
+        try:
+            return min(float(value), 60.0) if value is not None else None
+        except ValueError:
+            return None
+
+    def _fetch(self, source, url):
+        """抓取并解析一个URL，返回 (数据列表, 统计)"""
+        stats = {'url': url, 'status': None, 'cached': False, 'items': 0, 'retries': 0, 'error': None}
+        started = time.perf_counter()
+        items = []
+        try:
+            response = self._request(url, stats)
+            with response:
+                stats['status'] = response.status_code
+                if response.status_code == 304:
+                    stats['cached'] = True
+                    chunks = self.cache.read(url, self.CHUNK_SIZE)
+                else:
+                    response.raise_for_status()
+                    chunks = self.cache.write_through(url, response, self.CHUNK_SIZE)
+                items = list(source.parse(url, chunks))
+        except Exception as e:
+            stats['error'] = str(e)
+            items = []
+        stats['items'] = len(items)
+        stats['elapsed'] = round(time.perf_counter() - started, 4)
+        return items, stats
+
+    def run(self):
+        """抓取所有数据源，返回 (数据列表, 报告)"""
+        started = time.perf_counter()
+        items = []
+        fetches = []
+
+        for source in self.sources:
+            try:
+                items.extend(source.generate())
+            except Exception as e:
+                print(f"数据源 {source.name} 生成数据错误: {e}")
+
+        jobs = [(source, url) for source in self.sources for url in source.urls()]
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+                for fetched, stats in executor.map(lambda job: self._fetch(*job), jobs):
+                    items.extend(fetched)
+                    fetches.append(stats)
+
+        report = {
+            'items': len(items),
+            'requests': len(fetches),
+            'cached': sum(1 for s in fetches if s['cached']),
+            'retries': sum(s['retries'] for s in fetches),
+            'errors': sum(1 for s in fetches if s['error']),
+            'elapsed': round(time.perf_counter() - started, 4),
+            'fetches': fetches
+        }
+        self.last_report = report
+        return items, report
+
+
+class TimeManagementCrawler:
+    """时间管理数据爬虫"""
+
+    def __init__(self, sources=None, **engine_options):
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        sources = build_sources(sources or [{'type': 'pomodoro'}, {'type': 'productivity'}])
+        self.engine = CrawlEngine(sources, headers=self.headers, **engine_options)
+
+    def crawl_pomodoro_data(self):
+        """爬取番茄工作法相关数据"""
+        return PomodoroSource().generate()
+
+    def crawl_productivity_data(self):
+        """爬取生产力数据"""
+        return ProductivitySource().generate()
+
     def crawl_all(self):
         """爬取所有数据源"""
-        all_data = []
-        
         try:
-            # 爬取番茄工作法数据
-            pomodoro_data = self.crawl_pomodoro_data()
-            all_data.extend(pomodoro_data)
-            
-            # 爬取生产力数据
-            productivity_data = self.crawl_productivity_data()
-            all_data.extend(productivity_data)
-            
-            # 添加延迟避免请求过快
-            time.sleep(1)
-            
+            all_data, report = self.engine.run()
+            if report['requests']:
+                print(f"爬取了 {report['requests']} 个URL（{report['cached']} 个未修改，"
+                      f"{report['retries']} 次重试，{report['errors']} 个失败），耗时 {report['elapsed']} 秒")
+            return all_data
         except Exception as e:
             print(f"爬虫错误: {e}")
-        
-        return all_data
-
+            return []
@@ -0,0 +1,124 @@
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from serialization import dumps
+import itertools
+import threading
+
+# 订阅者的队列溢出（丢弃了最旧的事件）时先发送的事件，客户端收到后重新加载数据
+RESET_EVENT = 'reset'
+
+
+class Subscription:
+    """单个客户端的事件队列（有界，满时丢弃最旧的事件并标记溢出）"""
+
+    def __init__(self, maxsize):
+        self.events = deque()
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.overflowed = False
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self.events) >= self.maxsize:
+                self.events.popleft()
+                self.dropped += 1
+                self.overflowed = True
+            self.events.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取出下一个事件 (id, 名称, 数据)，超时返回None；溢出后先返回一个reset事件"""
+        with self._cond:
+            if not self.events:
+                self._cond.wait(timeout)
+            if self.overflowed:
+                self.overflowed = False
+                self.events.clear()
+                return None, RESET_EVENT, {'dropped': self.dropped}
+            if not self.events:
+                return None
+            return self.events.popleft()
+
+
+class EventBus:
+    """进程内的发布/订阅总线
+
+    写接口在事务提交后发布事件，每个订阅者（/api/stream的连接）有独立的有界队列，
+    发布不会阻塞，处理慢的客户端只会丢失自己的旧事件。
+    """
+
+    def __init__(self, queue_size=100, max_subscribers=100):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """新建订阅，订阅者已达上限时返回None"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(self.queue_size)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, name, data):
+        """立即向所有订阅者发布事件"""
+        with self._lock:
+            event_id = next(self._ids)
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put((event_id, name, data))
+
+    def publish_on_commit(self, session, name, data):
+        """在数据库事务提交后发布事件（回滚时丢弃）"""
+        session.info.setdefault('pending_events', []).append((self, name, data))
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            'subscribers': len(subscribers),
+            'published': self.published,
+            'dropped': sum(subscription.dropped for subscription in subscribers)
+        }
+
+
+def format_event(event_id, name, data):
+    """格式化为Server-Sent Events消息"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {name}')
+    lines.append(f'data: {dumps(data).decode("utf-8")}')
+    return '\n'.join(lines) + '\n\n'
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    for target, name, data in session.info.pop('pending_events', []):
+        target.publish(name, data)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_pending(session, transaction):
+    # 最外层事务结束（回滚或关闭会话）时丢弃未发布的事件，保存点回滚不影响
+    if transaction.parent is None and not transaction.nested:
+        session.info.pop('pending_events', None)
+
+
+# 应用使用的事件总线（队列大小等在app.py中按配置设置）
+bus = EventBus()
@@ -0,0 +1,127 @@
+from models import db, Task, FocusTime, DailyStats, DailyTagStats, Tag, task_tags
+from crawl_stats import crawled_summary
+from datetime import datetime, timedelta, time
+import zlib
+
+
+def _boundary_end(start):
+    """start所在日期的下一天零点"""
+    return datetime.combine(start.date() + timedelta(days=1), time.min)
+
+
+def crawled_feature_stats(category=None):
+    """爬虫数据特征（读取按来源和分类累计的统计，不扫描爬虫数据表）
+
+    category不为空且该分类有数据时使用该分类的平均值，否则使用全部数据的平均值。
+    """
+    summary = (crawled_summary(category) if category else None) or crawled_summary()
+    if not summary:
+        return None
+    
+    return {
+        'avg_duration': summary['avg_duration'],
+        'avg_efficiency': summary['avg_efficiency']
+    }
+
+
+def user_feature_stats(now=None, window_days=14):
+    """用户特征统计
+
+    与逐条加载任务和专注记录计算的结果一致：完整日期的合计来自每日汇总表（一条带条件聚合的语句），
+    窗口起点所在日期的部分数据来自原始表（一条由标量子查询组成的语句），标签众数再用一条语句计算。
+    没有专注记录时返回None。
+    """
+    now = now or datetime.utcnow()
+    days_ago = now - timedelta(days=window_days)
+    week_ago = now - timedelta(days=7)
+    days_end = _boundary_end(days_ago)
+    week_end = _boundary_end(week_ago)
+    
+    # 完整日期：读取汇总表
+    (focus_minutes, session_count, efficiency_sum, created_count, created_completed,
+     created_high, weekly_completed) = db.session.query(
+        db.func.coalesce(db.func.sum(DailyStats.focus_minutes), 0),
+        db.func.coalesce(db.func.sum(DailyStats.session_count), 0),
+        db.func.coalesce(db.func.sum(DailyStats.efficiency_sum), 0),
+        db.func.coalesce(db.func.sum(DailyStats.created_count), 0),
+        db.func.coalesce(db.func.sum(DailyStats.created_completed_count), 0),
+        db.func.coalesce(db.func.sum(DailyStats.created_high_priority_count), 0),
+        db.func.coalesce(db.func.sum(db.case(
+            (DailyStats.date > week_ago.date(), DailyStats.completed_count), else_=0
+        )), 0)
+    ).filter(DailyStats.date > days_ago.date()).one()
+    
+    # 窗口起点所在日期：读取原始数据
+    in_focus_boundary = db.and_(FocusTime.start_time >= days_ago, FocusTime.start_time < days_end)
+    in_created_boundary = db.and_(Task.created_at >= days_ago, Task.created_at < days_end)
+    boundary = db.session.execute(db.select(
+        db.select(db.func.count(FocusTime.id)).where(in_focus_boundary).scalar_subquery(),
+        db.select(db.func.coalesce(db.func.sum(FocusTime.duration), 0)).where(in_focus_boundary).scalar_subquery(),
+        db.select(db.func.coalesce(db.func.sum(db.func.coalesce(FocusTime.efficiency_score, 0)), 0)).where(
+            in_focus_boundary).scalar_subquery(),
+        db.select(db.func.count(Task.id)).where(in_created_boundary).scalar_subquery(),
+        db.select(db.func.count(Task.id)).where(in_created_boundary, Task.status == 'completed').scalar_subquery(),
+        db.select(db.func.count(Task.id)).where(in_created_boundary, Task.priority == 3).scalar_subquery(),
+        db.select(db.func.count(Task.id)).where(
+            Task.status == 'completed', Task.completed_at >= week_ago, Task.completed_at < week_end
+        ).scalar_subquery()
+    )).one()
+    
+    session_count += boundary[0]
+    if not session_count:
+        return None
+    
+    focus_minutes += boundary[1]
+    efficiency_sum += boundary[2]
+    created_count += boundary[3]
+    created_completed += boundary[4]
+    created_high += boundary[5]
+    weekly_completed += boundary[6]
+    
+    tag = main_tag(days_ago, days_end)
+    
+    return {
+        'avg_duration': focus_minutes / session_count,
+        'avg_efficiency': efficiency_sum / session_count,
+        'completion_rate': created_completed / created_count if created_count else 0.5,
+        'high_priority_ratio': created_high / created_count if created_count else 0.3,
+        'weekly_completed': weekly_completed,
+        'main_tag': tag,
+        'tag_encoded': encode_tag(tag)
+    }
+
+
+def encode_tag(tag):
+    """标签编码（CRC32取模，不同进程和重启之后结果一致，与训练集中的编码相同）"""
+    return zlib.crc32(tag.encode('utf-8')) % 10
+
+
+def main_tag(start, boundary_end):
+    """窗口内创建的任务中出现次数最多的标签（次数相同时取名称最小的），没有标签时返回general"""
+    rollup_part = db.select(
+        DailyTagStats.tag.label('tag'),
+        DailyTagStats.count.label('count')
+    ).where(
+        DailyTagStats.kind == 'created',
+        DailyTagStats.date > start.date()
+    )
+    boundary_part = db.select(
+        Tag.name.label('tag'),
+        db.literal(1).label('count')
+    ).select_from(Task).join(
+        task_tags, task_tags.c.task_id == Task.id
+    ).join(
+        Tag, Tag.id == task_tags.c.tag_id
+    ).where(
+        Task.created_at >= start,
+        Task.created_at < boundary_end
+    )
+    combined = db.union_all(rollup_part, boundary_part).subquery()
+    total = db.func.sum(combined.c.count)
+    
+    tag = db.session.execute(
+        db.select(combined.c.tag).group_by(combined.c.tag).having(total > 0).order_by(
+            total.desc(), combined.c.tag.asc()
+        ).limit(1)
+    ).scalar()
+    return tag or 'general'
@@ -0,0 +1,186 @@
+from models import db, Task, FocusTime, Tag, task_tags
+from feature_stats import encode_tag
+from datetime import datetime, timedelta
+import threading
+import numpy as np
+
+
+def _to_datetime64(values):
+    """把datetime列表转换为datetime64[us]数组"""
+    return np.array(values, dtype='datetime64[us]')
+
+
+class TrainingSetBuilder:
+    """训练集构建器
+
+    一次性加载任务、专注记录和爬虫统计，使用排序数组和前缀和向量化计算
+    每条样本的特征；专注记录按id增量追加，再次构建时只查询新增的记录。
+    """
+
+    def __init__(self, window_days=14):
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空缓存，下次构建时全量加载"""
+        self._last_id = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._starts = _to_datetime64([])
+        self._durations = np.empty(0, dtype=np.float64)
+        self._efficiencies = np.empty(0, dtype=np.float64)
+
+    def _append_sessions(self, cutoff):
+        """增量加载新的专注记录，并丢弃窗口外的旧记录"""
+        rows = db.session.query(
+            FocusTime.id,
+            FocusTime.start_time,
+            FocusTime.duration,
+            FocusTime.efficiency_score
+        ).filter(
+            FocusTime.id > self._last_id,
+            FocusTime.start_time >= cutoff
+        ).all()
+
+        if rows:
+            ids, starts, durations, efficiencies = zip(*rows)
+            self._ids = np.concatenate([self._ids, np.array(ids, dtype=np.int64)])
+            self._starts = np.concatenate([self._starts, _to_datetime64(starts)])
+            self._durations = np.concatenate([self._durations, np.array(durations, dtype=np.float64)])
+            self._efficiencies = np.concatenate([
+                self._efficiencies,
+                np.array([e if e is not None else 0.0 for e in efficiencies], dtype=np.float64)
+            ])
+            self._last_id = max(self._last_id, max(ids))
+
+            # 开始时间可由客户端指定，新记录不一定排在最后，按(开始时间, id)重新排序
+            order = np.lexsort((self._ids, self._starts))
+            self._ids = self._ids[order]
+            self._starts = self._starts[order]
+            self._durations = self._durations[order]
+            self._efficiencies = self._efficiencies[order]
+
+        keep = self._starts >= np.datetime64(cutoff, 'us')
+        if not keep.all():
+            self._ids = self._ids[keep]
+            self._starts = self._starts[keep]
+            self._durations = self._durations[keep]
+            self._efficiencies = self._efficiencies[keep]
+
+    @staticmethod
+    def _load_tasks():
+        """加载任务列（只查询需要的字段）"""
+        rows = db.session.query(
+            Task.created_at,
+            Task.status,
+            Task.priority,
+            Task.completed_at
+        ).filter(Task.created_at.isnot(None)).order_by(Task.created_at.asc()).all()
+
+        created = _to_datetime64([r[0] for r in rows])
+        completed_flags = np.array([r[1] == 'completed' for r in rows], dtype=np.int64)
+        high_flags = np.array([r[2] == 3 for r in rows], dtype=np.int64)
+        completed_times = np.sort(_to_datetime64([
+            r[3] for r in rows if r[1] == 'completed' and r[3] is not None
+        ]))
+        return created, completed_flags, high_flags, completed_times
+
+    @staticmethod
+    def _load_task_tags(since):
+        """加载since之后创建的任务的标签，返回 (按名称排序的标签, 每个标签的任务创建时间排序数组)"""
+        rows = db.session.query(Task.created_at, Tag.name).join(
+            task_tags, task_tags.c.task_id == Task.id
+        ).join(
+            Tag, Tag.id == task_tags.c.tag_id
+        ).filter(Task.created_at >= since).all()
+
+        by_tag = {}
+        for created_at, name in rows:
+            by_tag.setdefault(name, []).append(created_at)
+        names = sorted(by_tag)
+        return names, [np.sort(_to_datetime64(by_tag[name])) for name in names]
+
+    def _main_tags(self, names, tag_times, targets):
+        """每条样本的主要标签：目标记录开始前window_days天内创建的任务中出现最多的标签
+        （次数相同时取名称最小的，没有标签时为general），与 feature_stats.main_tag 一致"""
+        tags = np.full(len(targets), 'general', dtype=object)
+        if not names:
+            return tags
+
+        window_start = targets - np.timedelta64(self.window_days, 'D')
+        counts = np.stack([
+            np.searchsorted(times, targets, side='right') - np.searchsorted(times, window_start, side='left')
+            for times in tag_times
+        ])
+        # names已按名称排序，argmax在次数相同时取第一个
+        best = counts.argmax(axis=0)
+        return np.where(counts.max(axis=0) > 0, np.array(names, dtype=object)[best], tags)
+
+    def build(self, crawled_stats=None, now=None, crawled_stats_for=None):
+        """构建训练集，返回 (X, y)
+
+        样本i使用前i+1条专注记录作为历史，预测第i+2条记录的时长，
+        特征含义与 FocusTimePredictor.prepare_features 一致。
+        爬虫数据特征：提供crawled_stats_for(标签)时按每条样本的主要标签取统计（与预测时一致），
+        否则所有样本使用crawled_stats。
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.window_days)
+
+        with self._lock:
+            self._append_sessions(cutoff)
+            starts = self._starts
+            durations = self._durations
+            efficiencies = self._efficiencies
+
+            n = len(durations) - 1
+            if n < 1:
+                return np.empty((0, 8)), np.empty(0)
+
+            created, completed_flags, high_flags, completed_times = self._load_tasks()
+            tag_since = cutoff - timedelta(days=self.window_days)
+            tag_names, tag_times = self._load_task_tags(tag_since)
+
+        counts = np.arange(1, n + 1, dtype=np.float64)
+        avg_duration = np.cumsum(durations[:-1]) / counts
+        avg_efficiency = np.cumsum(efficiencies[:-1]) / counts
+
+        # 目标记录开始时间之前创建的任务数量及其中已完成、高优先级的数量
+        targets = starts[1:]
+        task_counts = np.searchsorted(created, targets, side='right')
+        completed_cum = np.concatenate([[0], np.cumsum(completed_flags)])
+        high_cum = np.concatenate([[0], np.cumsum(high_flags)])
+        has_tasks = task_counts > 0
+        safe_counts = np.maximum(task_counts, 1)
+
+        completion_rate = np.where(has_tasks, completed_cum[task_counts] / safe_counts, 0.5)
+        high_priority_ratio = np.where(has_tasks, high_cum[task_counts] / safe_counts, 0.3)
+
+        # 目标记录开始前7天内完成的任务数
+        week_before = targets - np.timedelta64(7, 'D')
+        weekly_completed = (
+            np.searchsorted(completed_times, targets, side='right')
+            - np.searchsorted(completed_times, week_before, side='left')
+        )
+        weekly_completed = np.where(has_tasks, weekly_completed, 5)
+
+        # 按不同的主要标签（通常只有几个）计算编码和爬虫数据统计
+        unique_tags, inverse = np.unique(self._main_tags(tag_names, tag_times, targets), return_inverse=True)
+        tag_encoded = np.array([encode_tag(tag) for tag in unique_tags], dtype=np.float64)[inverse]
+
+        stats = [crawled_stats_for(tag) if crawled_stats_for else crawled_stats for tag in unique_tags]
+        crawled_duration = np.array([s['avg_duration'] if s else 25.0 for s in stats], dtype=np.float64)[inverse]
+        crawled_efficiency = np.array([s['avg_efficiency'] if s else 0.5 for s in stats], dtype=np.float64)[inverse]
+
+        X = np.column_stack([
+            avg_duration,
+            completion_rate,
+            avg_efficiency,
+            high_priority_ratio,
+            weekly_completed.astype(np.float64),
+            tag_encoded,
+            crawled_duration,
+            crawled_efficiency
+        ])
+        y = durations[1:].copy()
+        return X, y
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class CompiledForest:
+    """编译后的随机森林
+
+    把训练好的 StandardScaler 和 RandomForestRegressor 导出为扁平的NumPy节点数组
+    （feature、threshold、left、right、value），所有树的节点拼接在一起，
+    预测时对一批样本的所有树同时逐层向下遍历，不经过sklearn的逐次参数校验。
+    """
+
+    # 每批遍历的最大样本数，限制 样本数×树数 的中间数组大小
+    CHUNK_SIZE = 1024
+
+    FIELDS = ('mean', 'scale', 'feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+    def __init__(self, mean, scale, feature, threshold, left, right, value, roots, depth):
+        self.mean = mean
+        self.scale = scale
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        # 左右子节点交错存放，children[2 * node + 是否走右侧] 即下一个节点
+        self._children = np.stack([left, right], axis=1).ravel().astype(np.intp)
+        self._feature = feature.astype(np.intp)
+        self._roots = roots.astype(np.intp)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        """从训练好的随机森林和标准化器导出"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            count = tree.node_count
+            nodes = np.arange(offset, offset + count, dtype=np.int64)
+            is_leaf = tree.children_left < 0
+
+            # 叶子节点的左右子节点指向自身，遍历到叶子后停留不动
+            lefts.append(np.where(is_leaf, nodes, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, nodes, tree.children_right + offset).astype(np.int32))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += count
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            mean=np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None,
+            scale=np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None,
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int64),
+            depth=depth
+        )
+
+    def to_dict(self):
+        """导出为数组字典（用于保存）"""
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data['depth'] = self.depth
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.FIELDS}, depth=data['depth'])
+
+    def transform(self, X):
+        """标准化特征（与 StandardScaler.transform 的计算顺序一致）"""
+        X = np.array(X, dtype=np.float64)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+    def predict(self, X):
+        """批量预测，X为 (样本数, 特征数) 的数组，返回每个样本的预测值"""
+        X = np.atleast_2d(X)
+        # sklearn的决策树使用float32比较特征值
+        X_scaled = self.transform(X).astype(np.float32)
+        if len(X_scaled) <= self.CHUNK_SIZE:
+            return self._predict_chunk(X_scaled)
+        return np.concatenate([
+            self._predict_chunk(X_scaled[start:start + self.CHUNK_SIZE])
+            for start in range(0, len(X_scaled), self.CHUNK_SIZE)
+        ])
+
+    def _predict_chunk(self, X):
+        X = np.ascontiguousarray(X)
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        nodes = np.repeat(self._roots[None, :], len(X), axis=0)
+        for _ in range(self.depth):
+            go_right = flat[row_offsets + self._feature[nodes]] > self.threshold[nodes]
+            nodes = self._children[2 * nodes + go_right]
+        return self.value[nodes].mean(axis=1)
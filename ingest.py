@@ -0,0 +1,131 @@
+from models import db, CrawledData, CrawlRun
+from crawl_stats import apply_crawled_rows, rebuild_crawled_stats
+from versioning import bump_version
+from datetime import datetime
+import hashlib
+import json
+
+# 每条INSERT语句的最大行数（SQLite单条语句的参数数量有限制）
+INSERT_CHUNK_SIZE = 500
+
+
+def content_hash(item):
+    """爬虫数据的内容哈希（来源、字段值和原始数据相同的数据视为重复）"""
+    content = json.dumps([
+        item['source'],
+        item['category'],
+        round(float(item['duration']), 6),
+        round(float(item['efficiency']), 6),
+        item['raw_data']
+    ], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _insert_ignore(rows):
+    """批量插入，内容哈希已存在的行跳过，返回新插入的行 (source, category, duration, efficiency)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    inserted = []
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        stmt = insert(CrawledData.__table__).values(rows[start:start + INSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_nothing(index_elements=['content_hash']).returning(
+            CrawledData.source, CrawledData.category, CrawledData.duration, CrawledData.efficiency
+        )
+        inserted.extend(db.session.execute(stmt).all())
+    return inserted
+
+
+def _evict(max_rows):
+    """只保留最新的max_rows条爬虫数据（一条DELETE语句），返回删除的行 (source, category, duration, efficiency)"""
+    keep = db.select(CrawledData.id).order_by(
+        CrawledData.crawled_at.desc(),
+        CrawledData.id.desc()
+    ).limit(max_rows).scalar_subquery()
+    return db.session.execute(db.delete(CrawledData).where(CrawledData.id.not_in(keep)).returning(
+        CrawledData.source, CrawledData.category, CrawledData.duration, CrawledData.efficiency
+    )).all()
+
+
+def ingest_crawled(items, max_rows=200, report=None, started_at=None):
+    """把一次爬取的数据入库（一个事务）
+
+    按内容哈希去重后批量插入，超出max_rows的最旧数据用一条语句删除，同步维护累计统计，
+    并记录本次的入库统计（report为爬虫引擎的抓取报告）。返回CrawlRun。
+    """
+    now = datetime.utcnow()
+    report = report or {}
+    try:
+        rows = [
+            {
+                'source': item['source'],
+                'duration': item['duration'],
+                'category': item['category'],
+                'efficiency': item['efficiency'],
+                'raw_data': item['raw_data'],
+                'content_hash': content_hash(item),
+                'crawled_at': now
+            }
+            for item in items
+        ]
+        inserted = _insert_ignore(rows) if rows else []
+        evicted = _evict(max_rows) if max_rows is not None else []
+        apply_crawled_rows(inserted, sign=1)
+        apply_crawled_rows(evicted, sign=-1)
+        new_count, evicted_count = len(inserted), len(evicted)
+        
+        run = CrawlRun(
+            started_at=started_at or now,
+            finished_at=datetime.utcnow(),
+            fetched_count=len(rows),
+            new_count=new_count,
+            duplicate_count=len(rows) - new_count,
+            evicted_count=evicted_count,
+            request_count=report.get('requests', 0),
+            cached_count=report.get('cached', 0),
+            error_count=report.get('errors', 0)
+        )
+        db.session.add(run)
+        if new_count or evicted_count:
+            bump_version('crawled_data')
+        db.session.commit()
+        return run
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def backfill_content_hashes():
+    """为没有内容哈希的已有数据补充哈希，内容重复的只保留最新的一条，返回补充的行数"""
+    rows = db.session.query(
+        CrawledData.id, CrawledData.source, CrawledData.category,
+        CrawledData.duration, CrawledData.efficiency, CrawledData.raw_data
+    ).filter(CrawledData.content_hash.is_(None)).order_by(CrawledData.id.desc()).all()
+    
+    seen = set(h for (h,) in db.session.query(CrawledData.content_hash).filter(
+        CrawledData.content_hash.isnot(None)))
+    updates, duplicates = [], []
+    for row in rows:
+        digest = content_hash({
+            'source': row.source, 'category': row.category, 'duration': row.duration or 0.0,
+            'efficiency': row.efficiency or 0.0, 'raw_data': row.raw_data
+        })
+        if digest in seen:
+            duplicates.append(row.id)
+        else:
+            seen.add(digest)
+            updates.append({'id': row.id, 'content_hash': digest})
+    
+    if duplicates:
+        db.session.execute(db.delete(CrawledData).where(CrawledData.id.in_(duplicates)))
+    if updates:
+        db.session.execute(db.update(CrawledData), updates)
+    if duplicates or updates:
+        bump_version('crawled_data')
+    db.session.commit()
+    if duplicates:
+        rebuild_crawled_stats()
+    return len(updates)
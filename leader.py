@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+import os
+import socket
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def holder_id():
+    """当前进程的标识（主机名:进程号:随机后缀）"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class FileLock:
+    """基于文件锁的选举（同一主机上的多个进程），进程退出时操作系统自动释放锁"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self, blocking=False):
+        """获取锁（已持有时直接返回True），blocking为False时获取不到立即返回False"""
+        if self._file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class DatabaseLease:
+    """基于数据库租约的选举（可跨主机），持有者需在ttl秒内续约，否则其他进程可以接管"""
+
+    def __init__(self, engine, table, name='scheduler', ttl=60, holder=None):
+        self.engine = engine
+        self.table = table
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or holder_id()
+        self.held = False
+
+    def acquire(self, blocking=False):
+        """获取或续约租约，返回是否持有"""
+        now = datetime.utcnow()
+        values = {'holder': self.holder, 'expires_at': now + timedelta(seconds=self.ttl)}
+        table = self.table
+        with self.engine.begin() as conn:
+            result = conn.execute(update(table).where(
+                table.c.name == self.name,
+                or_(table.c.holder == self.holder, table.c.expires_at < now)
+            ).values(**values))
+            if result.rowcount:
+                self.held = True
+                return True
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(table).values(name=self.name, **values))
+                self.held = True
+            except IntegrityError:
+                # 租约由其他进程持有且未过期
+                self.held = False
+        return self.held
+
+    def release(self):
+        if not self.held:
+            return
+        table = self.table
+        with self.engine.begin() as conn:
+            conn.execute(update(table).where(
+                table.c.name == self.name, table.c.holder == self.holder
+            ).values(expires_at=datetime.utcnow()))
+        self.held = False
+
+
+class LeaderElection:
+    """在多个工作进程中选出一个运行定时任务
+
+    每interval秒尝试获取（或续约）锁：成为主进程时调用on_elected，失去锁时调用on_lost。
+    主进程退出后，其他进程在下一次检查时接管。
+    """
+
+    JOB_ID = 'leader_election'
+
+    def __init__(self, scheduler, lock, on_elected, on_lost=None, interval=15):
+        self.scheduler = scheduler
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.interval = interval
+        self.is_leader = False
+        self.elected_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """立即参加一次选举，并定期重试（或续约）"""
+        self.check()
+        self.scheduler.add_job(self.check, 'interval', seconds=self.interval,
+                               id=self.JOB_ID, replace_existing=True)
+
+    def check(self):
+        with self._lock:
+            try:
+                acquired = self.lock.acquire()
+                self.last_error = None
+            except Exception as e:
+                acquired = False
+                self.last_error = str(e)
+                print(f"定时任务选举错误: {e}")
+
+            if acquired and not self.is_leader:
+                self.is_leader = True
+                self.elected_at = datetime.utcnow()
+                print(f"进程 {os.getpid()} 被选为定时任务主进程")
+                self.on_elected()
+            elif not acquired and self.is_leader:
+                self.is_leader = False
+                self.elected_at = None
+                print(f"进程 {os.getpid()} 失去定时任务主进程身份")
+                if self.on_lost:
+                    self.on_lost()
+            return self.is_leader
+
+    def stop(self):
+        """退出选举并释放锁"""
+        with self._lock:
+            try:
+                self.scheduler.remove_job(self.JOB_ID)
+            except Exception:
+                pass
+            try:
+                self.lock.release()
+            except Exception as e:
+                print(f"释放定时任务锁错误: {e}")
+            if self.is_leader and self.on_lost:
+                self.on_lost()
+            self.is_leader = False
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'method': type(self.lock).__name__,
+            'is_leader': self.is_leader,
+            'elected_at': self.elected_at.isoformat() if self.elected_at else None,
+            'last_error': self.last_error
+        }
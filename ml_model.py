@@ -1,19 +1,118 @@
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
+from forest import CompiledForest
 import pickle
 import os
+import threading
 from datetime import datetime, timedelta
 
+# 特征名称（与 prepare_features 生成的列顺序一致）
+FEATURE_NAMES = (
+    'avg_duration',
+    'completion_rate',
+    'avg_efficiency',
+    'high_priority_ratio',
+    'weekly_completed',
+    'tag_encoded',
+    'crawled_avg_duration',
+    'crawled_avg_efficiency'
+)
+
+# 可选的模型后端
+BACKENDS = ('forest', 'online')
+
+# 在线模型至少吸收这么多条样本后才用于预测（与全量训练的最少数据量一致）
+MIN_ONLINE_SAMPLES = 4
+
+class RecursiveLeastSquares:
+    """递推最小二乘线性回归
+
+    每条新样本以 O(特征数²) 的代价更新参数，与历史数据量无关；
+    forgetting小于1时按指数衰减旧样本的权重，适应用户习惯的变化。
+    """
+    
+    kind = 'rls'
+    
+    def __init__(self, n_features=len(FEATURE_NAMES), forgetting=1.0, delta=1000.0):
+        self.forgetting = forgetting
+        # 参数最后一维为截距
+        self.theta = np.zeros(n_features + 1)
+        self.P = np.eye(n_features + 1) * delta
+        self.samples = 0
+    
+    def update(self, X, y):
+        """逐条吸收样本"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        theta, P = self.theta.copy(), self.P.copy()
+        for row, target in zip(X, y):
+            x = np.append(row, 1.0)
+            Px = P @ x
+            gain = Px / (self.forgetting + x @ Px)
+            theta += gain * (target - x @ theta)
+            P = (P - np.outer(gain, Px)) / self.forgetting
+        # 整体替换参数，并发预测不会读到更新了一半的参数
+        self.theta, self.P = theta, P
+        self.samples += len(y)
+    
+    def predict(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        theta = self.theta
+        return X @ theta[:-1] + theta[-1]
+    
+    def to_dict(self):
+        return {'kind': self.kind, 'theta': self.theta, 'P': self.P,
+                'forgetting': self.forgetting, 'samples': self.samples}
+    
+    @classmethod
+    def from_dict(cls, data):
+        estimator = cls(n_features=len(data['theta']) - 1, forgetting=data['forgetting'])
+        estimator.theta = data['theta']
+        estimator.P = data['P']
+        estimator.samples = data['samples']
+        return estimator
+
+def _estimator_from_dict(data):
+    """根据保存的数组字典恢复预测器（没有kind的是随机森林）"""
+    if data.get('kind') == RecursiveLeastSquares.kind:
+        return RecursiveLeastSquares.from_dict(data)
+    return CompiledForest.from_dict(data)
+
 class FocusTimePredictor:
-    """专注时间预测模型"""
+    """专注时间预测模型
+
+    backend为'forest'时使用随机森林（每次训练全量重建），
+    为'online'时使用递推最小二乘，可以通过 partial_fit 逐条吸收新样本。
+    """
     
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42, max_depth=10)
-        self.scaler = StandardScaler()
+    def __init__(self, n_estimators=100, max_depth=10, backend='forest', forgetting=1.0):
+        if backend not in BACKENDS:
+            raise ValueError(f'未知的模型后端: {backend}')
+        self.backend = backend
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.forgetting = forgetting
+        # 模型在训练或首次预测时才创建/加载，避免启动时构建用不到的森林
+        self.model = None
+        self.scaler = None
+        # 预测使用的数组形式模型（随机森林的扁平节点数组或在线模型的参数）
+        self.estimator = None
         self.is_trained = True
+        self._pending_path = None
+        self._load_lock = threading.Lock()
+    
+    def _build_model(self):
+        """创建新的随机森林"""
+        return RandomForestRegressor(n_estimators=self.n_estimators, random_state=42, max_depth=self.max_depth)
+    
+    @property
+    def params(self):
+        """模型参数（保存到模型存储的元数据中）"""
+        if self.backend == 'online':
+            return {'backend': self.backend, 'forgetting': self.forgetting}
+        return {'backend': self.backend, 'n_estimators': self.n_estimators, 'max_depth': self.max_depth}
         
     def prepare_features(self, user_data, crawled_data=None):
         """准备特征数据"""
@@ -63,8 +162,19 @@ class FocusTimePredictor:
             return False
         
         try:
+            self._pending_path = None
+            if self.backend == 'online':
+                estimator = RecursiveLeastSquares(n_features=X.shape[1], forgetting=self.forgetting)
+                estimator.update(X, y)
+                self.estimator = estimator
+                self.is_trained = True
+                return True
+            
+            self.model = self._build_model()
+            self.scaler = StandardScaler()
             X_scaled = self.scaler.fit_transform(X)
             self.model.fit(X_scaled, y)
+            self.estimator = CompiledForest.from_sklearn(self.model, self.scaler)
             self.is_trained = True
             return True
         except Exception as e:
@@ -72,57 +182,122 @@ class FocusTimePredictor:
             self.is_trained = False
             return False
     
+    def partial_fit(self, X, y):
+        """增量吸收新样本（仅在线模型支持），返回是否更新了模型"""
+        if self.backend != 'online':
+            return False
+        
+        self._ensure_loaded()
+        try:
+            X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+            if self.estimator is None:
+                self.estimator = RecursiveLeastSquares(n_features=X.shape[1], forgetting=self.forgetting)
+            self.estimator.update(X, y)
+            self.is_trained = True
+            return True
+        except Exception as e:
+            print(f"更新模型时出错: {e}")
+            return False
+    
     def predict(self, user_data, crawled_data=None):
         """预测专注时长"""
         features = self.prepare_features(user_data, crawled_data)
         
-        if not self.is_trained:
-            # 使用简单规则作为后备
-            avg_duration = user_data.get('avg_duration', 25.0) if user_data else 25.0
-            confidence = 0.3
-            return max(15.0, min(60.0, avg_duration * 1.1)), confidence
-        
         try:
-            features_scaled = self.scaler.transform(features)
-            prediction = self.model.predict(features_scaled)[0]
-            
-            # 计算置信度（基于训练数据量）
-            confidence = min(0.9, 0.3 + len(features) * 0.1)
-            
-            # 限制预测范围在15-60分钟
-            prediction = max(15.0, min(60.0, prediction))
-            
-            return prediction, confidence
+            predictions, confidences = self.predict_batch(features)
+            return float(predictions[0]), float(confidences[0])
         except Exception as e:
             print(f"预测时出错: {e}")
             avg_duration = user_data.get('avg_duration', 25.0) if user_data else 25.0
             return max(15.0, min(60.0, avg_duration)), 0.3
     
+    def predict_batch(self, features):
+        """批量预测，features为 (样本数, 8) 的特征矩阵，返回 (预测时长数组, 置信度数组)
+
+        预测值限制在15-60分钟；没有可用模型时按平均专注时长估算。
+        """
+        self._ensure_loaded()
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        
+        if not self.is_trained:
+            # 使用简单规则作为后备
+            return np.clip(features[:, 0] * 1.1, 15.0, 60.0), np.full(len(features), 0.3)
+        
+        estimator = self.estimator
+        if estimator is None or (self.backend == 'online' and estimator.samples < MIN_ONLINE_SAMPLES):
+            # 尚未训练或加载模型
+            return np.clip(features[:, 0], 15.0, 60.0), np.full(len(features), 0.3)
+        
+        predictions = np.clip(estimator.predict(features), 15.0, 60.0)
+        
+        # 计算置信度（基于训练数据量，每个样本按单条特征计算）
+        confidences = np.full(len(features), min(0.9, 0.3 + 1 * 0.1))
+        return predictions, confidences
+    
     def save_model(self, filepath='ml_model.pkl'):
-        """保存模型"""
+        """保存模型
+
+        只保存导出的扁平节点数组（预测不需要sklearn对象，文件更小、加载更快），
+        先写入临时文件再重命名，读取方不会看到写了一半的文件。
+        """
+        tmp_path = f'{filepath}.tmp-{os.getpid()}'
         try:
-            with open(filepath, 'wb') as f:
+            self._ensure_loaded()
+            with open(tmp_path, 'wb') as f:
                 pickle.dump({
-                    'model': self.model,
-                    'scaler': self.scaler,
-                    'is_trained': self.is_trained
-                }, f)
+                    'is_trained': self.is_trained,
+                    'compiled': self.estimator.to_dict() if self.estimator is not None else None,
+                    'params': self.params
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, filepath)
+            return True
         except Exception as e:
             print(f"保存模型时出错: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
     
-    def load_model(self, filepath='ml_model.pkl'):
-        """加载模型"""
+    def load_model(self, filepath='ml_model.pkl', lazy=True):
+        """加载模型（默认延迟到首次预测时才读取文件）"""
         if not os.path.exists(filepath):
             return False
         
+        self._pending_path = filepath
+        if lazy:
+            return True
+        return self._ensure_loaded()
+    
+    def _ensure_loaded(self):
+        """如果有待加载的模型文件，立即加载"""
+        if self._pending_path is None:
+            return True
+        
+        with self._load_lock:
+            if self._pending_path is None:
+                return True
+            return self._load_now()
+    
+    def _load_now(self):
+        filepath = self._pending_path
+        self._pending_path = None
         try:
             with open(filepath, 'rb') as f:
                 data = pickle.load(f)
+            self.is_trained = data['is_trained']
+            if data.get('compiled') is not None:
+                self.estimator = _estimator_from_dict(data['compiled'])
+            elif hasattr(data.get('model'), 'estimators_'):
+                # 旧版本的模型文件保存的是sklearn对象，加载时导出
                 self.model = data['model']
                 self.scaler = data['scaler']
-                self.is_trained = data['is_trained']
+                self.estimator = CompiledForest.from_sklearn(self.model, self.scaler)
+            params = data.get('params')
+            if params:
+                self.backend = params.get('backend', 'forest')
+                self.n_estimators = params.get('n_estimators', self.n_estimators)
+                self.max_depth = params.get('max_depth', self.max_depth)
+                self.forgetting = params.get('forgetting', self.forgetting)
             return True
         except Exception as e:
             print(f"加载模型时出错: {e}")
             return False
-
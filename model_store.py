@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+MODEL_FILE = 'model.pkl'
+META_FILE = 'meta.json'
+CURRENT_FILE = 'CURRENT'
+CONFIG_FILE = 'config.json'
+
+
+def _write_atomic(path, content):
+    """先写临时文件再重命名，保证读取方看到的是完整文件"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ModelStore:
+    """版本化的模型存储
+
+    目录结构: <root>/v<版本号>/model.pkl + meta.json，<root>/CURRENT 记录当前版本，
+    <root>/config.json 记录调优选出的模型参数。
+    每个版本先写入临时目录再整体重命名，CURRENT 也通过重命名原子替换。
+    """
+
+    def __init__(self, root='model_store', keep=5):
+        self.root = root
+        self.keep = keep
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, f'v{version}')
+
+    def versions(self):
+        """所有已保存的版本号（升序）"""
+        if not os.path.isdir(self.root):
+            return []
+        versions = []
+        for name in os.listdir(self.root):
+            if name.startswith('v') and name[1:].isdigit():
+                versions.append(int(name[1:]))
+        return sorted(versions)
+
+    def current_version(self):
+        """当前版本号，没有保存过模型时返回None"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def model_path(self, version=None):
+        version = version if version is not None else self.current_version()
+        if version is None:
+            return None
+        return os.path.join(self._version_dir(version), MODEL_FILE)
+
+    def read_meta(self, version=None):
+        version = version if version is not None else self.current_version()
+        if version is None:
+            return None
+        try:
+            with open(os.path.join(self._version_dir(version), META_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def save(self, predictor, meta=None):
+        """保存为新版本并设为当前版本，返回版本号"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            if not predictor.save_model(os.path.join(tmp_dir, MODEL_FILE)):
+                raise RuntimeError('保存模型失败')
+            
+            version = (self.versions() or [0])[-1] + 1
+            meta = dict(meta or {}, version=version, saved_at=datetime.utcnow().isoformat(), **predictor.params)
+            with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            
+            # 多个进程同时保存时版本号可能冲突，重命名失败则顺延
+            while True:
+                try:
+                    os.rename(tmp_dir, self._version_dir(version))
+                    break
+                except OSError:
+                    if not os.path.exists(self._version_dir(version)):
+                        raise
+                    version += 1
+                    meta['version'] = version
+                    with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+                        json.dump(meta, f, ensure_ascii=False)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        
+        _write_atomic(os.path.join(self.root, CURRENT_FILE), str(version))
+        self.prune()
+        return version
+
+    def load(self, predictor, version=None, lazy=True):
+        """把指定版本（默认当前版本）加载到predictor，返回加载的版本号，没有模型时返回None"""
+        version = version if version is not None else self.current_version()
+        if version is None:
+            return None
+        if not predictor.load_model(self.model_path(version), lazy=lazy):
+            return None
+        return version
+
+    def save_config(self, params, report=None):
+        """保存调优选出的模型参数（report为调优结果摘要）"""
+        os.makedirs(self.root, exist_ok=True)
+        config = {'params': params, 'report': report, 'saved_at': datetime.utcnow().isoformat()}
+        _write_atomic(os.path.join(self.root, CONFIG_FILE), json.dumps(config, ensure_ascii=False, indent=2))
+        return config
+
+    def read_config(self):
+        """调优选出的模型参数，没有调优过时返回None"""
+        try:
+            with open(os.path.join(self.root, CONFIG_FILE), encoding='utf-8') as f:
+                return json.load(f).get('params')
+        except (OSError, ValueError):
+            return None
+
+    def prune(self):
+        """只保留最近的keep个版本（当前版本始终保留）"""
+        current = self.current_version()
+        for version in self.versions()[:-self.keep]:
+            if version != current:
+                shutil.rmtree(self._version_dir(version), ignore_errors=True)
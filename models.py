@@ -1,12 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
+from storage import RoutingSession
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# 任务与标签的关联表（按tag_id建索引，用于按标签过滤任务）
+task_tags = db.Table(
+    'task_tags',
+    db.Column('task_id', db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_task_tags_tag_id', 'tag_id', 'task_id')
+)
+
+class Tag(db.Model):
+    """标签"""
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(500), nullable=False, unique=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name
+        }
 
 class Task(db.Model):
     """任务模型"""
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_status_completed_at', 'status', 'completed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -14,10 +39,13 @@ class Task(db.Model):
     priority = db.Column(db.Integer, default=1)  # 1-低, 2-中, 3-高
     tags = db.Column(db.String(500), default='')  # 自定义标签，多个标签用逗号分隔
     status = db.Column(db.String(20), default='pending')  # pending, completed
-    order_index = db.Column(db.Integer, default=0)  # 用于排序
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    order_index = db.Column(db.Integer, default=0, index=True)  # 用于排序
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     completed_at = db.Column(db.DateTime, nullable=True)
     
+    # 规范化的标签（与tags字段保持同步，tags字段用于接口返回）
+    tag_objects = db.relationship('Tag', secondary=task_tags, lazy='select')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -31,14 +59,17 @@ class Task(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
+# 任务的接口字段（与Task.to_dict一致），按列查询任务时使用
+TASK_FIELDS = ['id', 'title', 'description', 'priority', 'tags', 'status', 'order_index', 'created_at', 'completed_at']
+
 class FocusTime(db.Model):
     """专注时间记录"""
     __tablename__ = 'focus_times'
     
     id = db.Column(db.Integer, primary_key=True)
-    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True, index=True)
     duration = db.Column(db.Float, nullable=False)  # 分钟
-    start_time = db.Column(db.DateTime, default=datetime.utcnow)
+    start_time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     end_time = db.Column(db.DateTime, nullable=True)
     efficiency_score = db.Column(db.Float, default=0.0)  # 效率评分 0-1
     
@@ -60,7 +91,7 @@ class UserRecommendation(db.Model):
     recommended_duration = db.Column(db.Float, nullable=False)  # 推荐专注时长（分钟）
     confidence = db.Column(db.Float, default=0.0)  # 置信度 0-1
     model_version = db.Column(db.String(50), default='v1.0')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     user_data = db.Column(db.Text)  # JSON格式存储用户数据快照
     
     def to_dict(self):
@@ -82,8 +113,9 @@ class CrawledData(db.Model):
     duration = db.Column(db.Float)
     category = db.Column(db.String(50))
     efficiency = db.Column(db.Float)
-    crawled_at = db.Column(db.DateTime, default=datetime.utcnow)
+    crawled_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     raw_data = db.Column(db.Text)  # JSON格式原始数据
+    content_hash = db.Column(db.String(64), unique=True, index=True)  # 内容哈希，用于去重
     
     def to_dict(self):
         return {
@@ -95,3 +127,141 @@ class CrawledData(db.Model):
             'crawled_at': self.crawled_at.isoformat() if self.crawled_at else None
         }
 
+
+class CrawlRun(db.Model):
+    """每次爬取的入库统计"""
+    __tablename__ = 'crawl_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime)
+    fetched_count = db.Column(db.Integer, default=0)  # 抓取到的数据条数
+    new_count = db.Column(db.Integer, default=0)  # 新入库的条数
+    duplicate_count = db.Column(db.Integer, default=0)  # 已存在而跳过的条数
+    evicted_count = db.Column(db.Integer, default=0)  # 超出保留上限被删除的条数
+    request_count = db.Column(db.Integer, default=0)  # HTTP请求数
+    cached_count = db.Column(db.Integer, default=0)  # 未修改（304）的请求数
+    error_count = db.Column(db.Integer, default=0)  # 失败的请求数
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'fetched': self.fetched_count,
+            'new': self.new_count,
+            'duplicate': self.duplicate_count,
+            'evicted': self.evicted_count,
+            'requests': self.request_count,
+            'cached': self.cached_count,
+            'errors': self.error_count
+        }
+
+
+class DailyStats(db.Model):
+    """每日统计汇总（写入时增量维护）"""
+    __tablename__ = 'daily_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, unique=True)
+    completed_count = db.Column(db.Integer, default=0)  # 当天完成的任务数
+    created_count = db.Column(db.Integer, default=0)  # 当天创建的任务数
+    created_completed_count = db.Column(db.Integer, default=0)  # 当天创建且已完成的任务数
+    created_high_priority_count = db.Column(db.Integer, default=0)  # 当天创建的高优先级任务数
+    focus_minutes = db.Column(db.Float, default=0.0)  # 专注总时长（分钟）
+    session_count = db.Column(db.Integer, default=0)  # 专注次数
+    efficiency_sum = db.Column(db.Float, default=0.0)  # 效率评分总和
+    sessions_lt15 = db.Column(db.Integer, default=0)  # 0-15分钟的专注次数
+    sessions_15_30 = db.Column(db.Integer, default=0)
+    sessions_30_45 = db.Column(db.Integer, default=0)
+    sessions_45_60 = db.Column(db.Integer, default=0)
+    sessions_ge60 = db.Column(db.Integer, default=0)  # 60分钟以上的专注次数
+    
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat() if self.date else None,
+            'completed_count': self.completed_count,
+            'created_count': self.created_count,
+            'created_completed_count': self.created_completed_count,
+            'created_high_priority_count': self.created_high_priority_count,
+            'focus_minutes': self.focus_minutes,
+            'session_count': self.session_count,
+            'efficiency_sum': self.efficiency_sum,
+            'duration_bins': [
+                self.sessions_lt15,
+                self.sessions_15_30,
+                self.sessions_30_45,
+                self.sessions_45_60,
+                self.sessions_ge60
+            ]
+        }
+
+class DailyTagStats(db.Model):
+    """每日标签统计（kind: completed-按完成日期, created-按创建日期）"""
+    __tablename__ = 'daily_tag_stats'
+    __table_args__ = (
+        db.UniqueConstraint('date', 'kind', 'tag', name='uq_daily_tag_stats'),
+        db.Index('ix_daily_tag_stats_kind_date', 'kind', 'date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    tag = db.Column(db.String(500), nullable=False)
+    count = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat() if self.date else None,
+            'kind': self.kind,
+            'tag': self.tag,
+            'count': self.count
+        }
+
+class CrawledStats(db.Model):
+    """爬虫数据按来源和分类的累计统计（入库和淘汰时增量维护）"""
+    __tablename__ = 'crawled_stats'
+    __table_args__ = (
+        db.UniqueConstraint('source', 'category', name='uq_crawled_stats'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(200), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, default=0)
+    duration_sum = db.Column(db.Float, default=0.0)
+    duration_sumsq = db.Column(db.Float, default=0.0)
+    efficiency_count = db.Column(db.Integer, default=0)  # 效率不为空的条数
+    efficiency_sum = db.Column(db.Float, default=0.0)
+    efficiency_sumsq = db.Column(db.Float, default=0.0)
+
+class TableVersion(db.Model):
+    """数据表版本号（每次写入时递增，用于ETag和缓存失效）"""
+    __tablename__ = 'table_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version
+        }
+
+class TaskChange(db.Model):
+    """任务变更日志（每次修改任务时写入，版本号与任务表版本号一致，用于客户端增量同步）"""
+    __tablename__ = 'task_changes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, index=True)  # 写入时的任务表版本号
+    task_id = db.Column(db.Integer, nullable=False)  # 不设外键，任务删除后保留删除记录
+    deleted = db.Column(db.Boolean, nullable=False, default=False)  # True-删除，False-新增或修改
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class SchedulerLease(db.Model):
+    """定时任务主进程的数据库租约（多进程/多主机部署时选举一个进程运行定时任务）"""
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
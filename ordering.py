@@ -0,0 +1,100 @@
+from models import db, Task
+
+# 相邻任务的order_index间隔，拖动时在两个任务之间取中间值，无需重新编号整个列表
+ORDER_GAP = 1024
+
+# 单条CASE语句更新的最大任务数（避免超过SQLite参数数量限制）
+CASE_CHUNK_SIZE = 500
+
+
+def next_order_index():
+    """新任务的order_index（排在最后，走order_index索引）"""
+    max_order = db.session.query(db.func.max(Task.order_index)).scalar() or 0
+    return max_order + ORDER_GAP
+
+
+def bulk_set_order(orders):
+    """用CASE语句批量设置order_index，orders为 [(task_id, order_index), ...]，返回实际更新的任务ID列表"""
+    updated = []
+    for start in range(0, len(orders), CASE_CHUNK_SIZE):
+        chunk = dict(orders[start:start + CASE_CHUNK_SIZE])
+        ids = [row[0] for row in db.session.query(Task.id).filter(Task.id.in_(list(chunk)))]
+        if not ids:
+            continue
+        db.session.execute(
+            db.update(Task).where(Task.id.in_(ids)).values(
+                order_index=db.case(chunk, value=Task.id)
+            ),
+            execution_options={'synchronize_session': False}
+        )
+        updated.extend(ids)
+    return updated
+
+
+def rebalance():
+    """按当前顺序重新编号所有任务（间隔ORDER_GAP），只在相邻任务之间没有空位时执行"""
+    ids = [row[0] for row in db.session.query(Task.id).order_by(Task.order_index.asc(), Task.id.asc())]
+    return len(bulk_set_order([(task_id, (index + 1) * ORDER_GAP) for index, task_id in enumerate(ids)]))
+
+
+def _neighbour_orders(task, before_id, after_id):
+    """获取目标位置上方(after)和下方(before)任务的order_index"""
+    lo = hi = None
+    if after_id is not None:
+        lo = db.session.query(Task.order_index).filter(Task.id == after_id).scalar()
+        if lo is None:
+            return None, None, '任务不存在'
+    if before_id is not None:
+        hi = db.session.query(Task.order_index).filter(Task.id == before_id).scalar()
+        if hi is None:
+            return None, None, '任务不存在'
+    
+    # 只给出一侧相邻任务时，另一侧取实际相邻的任务（走order_index索引）
+    if after_id is not None and before_id is None:
+        hi = db.session.query(db.func.min(Task.order_index)).filter(
+            Task.order_index > lo, Task.id != task.id
+        ).scalar()
+    elif before_id is not None and after_id is None:
+        lo = db.session.query(db.func.max(Task.order_index)).filter(
+            Task.order_index < hi, Task.id != task.id
+        ).scalar()
+    return lo, hi, None
+
+
+def move_task(task, before_id=None, after_id=None):
+    """把任务移动到after_id之后、before_id之前
+
+    通常只更新被移动的这一行；相邻任务之间没有空位时先重新编号整个列表。
+    返回 (新的order_index, 是否重新编号了整个列表, 错误信息)。
+    """
+    if before_id is None and after_id is None:
+        return None, False, 'before_id和after_id至少需要一个'
+    if task.id in (before_id, after_id):
+        return None, False, '相邻任务不能是任务本身'
+    
+    lo, hi, error = _neighbour_orders(task, before_id, after_id)
+    if error:
+        return None, False, error
+    
+    rebalanced = False
+    if lo is not None and hi is not None and hi - lo < 2:
+        if before_id is not None and after_id is not None and hi < lo:
+            return None, False, 'after_id对应的任务必须排在before_id之前'
+        rebalance()
+        rebalanced = True
+        db.session.refresh(task)
+        lo, hi, error = _neighbour_orders(task, before_id, after_id)
+        if error:
+            return None, rebalanced, error
+    
+    if lo is None and hi is None:
+        new_order = ORDER_GAP
+    elif lo is None:
+        new_order = hi - ORDER_GAP
+    elif hi is None:
+        new_order = lo + ORDER_GAP
+    else:
+        new_order = (lo + hi) // 2
+    
+    task.order_index = new_order
+    return new_order, rebalanced, None
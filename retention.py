@@ -0,0 +1,172 @@
+from models import db, Task, FocusTime, UserRecommendation, CrawledData, CrawlRun, TaskChange, task_tags
+from changelog import record_task_deletions
+from crawl_stats import subtract_crawled_ids
+from versioning import bump_version
+from datetime import datetime, timedelta
+import time
+
+# 默认保留策略：max_age_days-超过天数的数据被删除，max_rows-只保留最新的N条
+DEFAULT_POLICIES = {
+    'tasks': {'max_age_days': 14},
+    'focus_times': {'max_age_days': 14},
+    'user_recommendations': {'max_age_days': 14},
+    'crawled_data': {'max_rows': 200},
+    'crawl_runs': {'max_age_days': 30},
+    'task_changes': {'max_age_days': 14},
+}
+
+
+class RetentionPolicy:
+    """单个数据表的保留策略"""
+
+    def __init__(self, name, model, time_column, max_age_days=None, max_rows=None,
+                 condition=None, related=None, before_delete=None, records_changes=False):
+        self.name = name
+        self.model = model
+        self.time_column = time_column
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+        self.condition = condition  # 额外的删除条件
+        self.related = related or []  # 需要一起删除的关联表 [(table, 外键列)]
+        self.before_delete = before_delete  # 删除每批数据前调用 before_delete(ids)，用于同步维护汇总数据
+        self.records_changes = records_changes  # before_delete已递增版本号并记录变更，删除后不再递增
+
+
+def build_policies(overrides=None):
+    """根据配置生成保留策略，overrides格式与DEFAULT_POLICIES相同"""
+    config = {name: dict(options) for name, options in DEFAULT_POLICIES.items()}
+    for name, options in (overrides or {}).items():
+        config.setdefault(name, {}).update(options)
+    
+    return {
+        # 只删除已完成的任务
+        'tasks': RetentionPolicy('tasks', Task, Task.completed_at,
+                                 condition=Task.status == 'completed',
+                                 related=[(task_tags, task_tags.c.task_id)],
+                                 before_delete=record_task_deletions,
+                                 records_changes=True,
+                                 **config['tasks']),
+        'focus_times': RetentionPolicy('focus_times', FocusTime, FocusTime.start_time,
+                                       **config['focus_times']),
+        'user_recommendations': RetentionPolicy('user_recommendations', UserRecommendation,
+                                                UserRecommendation.created_at,
+                                                **config['user_recommendations']),
+        'crawled_data': RetentionPolicy('crawled_data', CrawledData, CrawledData.crawled_at,
+                                        before_delete=subtract_crawled_ids,
+                                        **config['crawled_data']),
+        'crawl_runs': RetentionPolicy('crawl_runs', CrawlRun, CrawlRun.started_at,
+                                      **config['crawl_runs']),
+        'task_changes': RetentionPolicy('task_changes', TaskChange, TaskChange.changed_at,
+                                        **config['task_changes']),
+    }
+
+
+class RetentionEngine:
+    """数据保留引擎
+
+    按策略分批执行 DELETE ... WHERE id IN (...)，每批单独提交，批次之间短暂休眠，
+    让出数据库写锁，避免长时间阻塞在线请求。每次运行记录删除速度和持锁时间。
+    """
+
+    def __init__(self, policies, chunk_size=1000, pause=0.05):
+        self.policies = policies
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.last_report = []
+
+    def _expired_ids(self, policy, cutoff, limit):
+        model = policy.model
+        query = db.session.query(model.id).filter(policy.time_column < cutoff)
+        if policy.condition is not None:
+            query = query.filter(policy.condition)
+        return [row[0] for row in query.limit(limit)]
+
+    def _oldest_ids(self, policy, limit):
+        model = policy.model
+        query = db.session.query(model.id).order_by(policy.time_column.asc(), model.id.asc())
+        return [row[0] for row in query.limit(limit)]
+
+    def _delete_chunk(self, policy, ids):
+        """删除一批数据并提交，返回持锁时间（从第一条写语句到提交完成）"""
+        started = time.perf_counter()
+        if policy.before_delete:
+            policy.before_delete(ids)
+        for table, column in policy.related:
+            db.session.execute(table.delete().where(column.in_(ids)))
+        db.session.execute(
+            db.delete(policy.model).where(policy.model.id.in_(ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        return time.perf_counter() - started
+
+    def run_policy(self, policy, now=None, max_rows=None):
+        """执行单个策略，返回统计报告"""
+        now = now or datetime.utcnow()
+        max_rows = max_rows if max_rows is not None else policy.max_rows
+        report = {
+            'table': policy.name,
+            'deleted': 0,
+            'chunks': 0,
+            'elapsed': 0.0,
+            'rows_per_sec': 0.0,
+            'lock_hold_total': 0.0,
+            'lock_hold_max': 0.0
+        }
+        started = time.perf_counter()
+        
+        def delete(ids):
+            hold = self._delete_chunk(policy, ids)
+            report['deleted'] += len(ids)
+            report['chunks'] += 1
+            report['lock_hold_total'] += hold
+            report['lock_hold_max'] = max(report['lock_hold_max'], hold)
+            if self.pause:
+                time.sleep(self.pause)
+        
+        try:
+            if policy.max_age_days is not None:
+                cutoff = now - timedelta(days=policy.max_age_days)
+                while True:
+                    ids = self._expired_ids(policy, cutoff, self.chunk_size)
+                    if not ids:
+                        break
+                    delete(ids)
+            
+            if max_rows is not None:
+                excess = db.session.query(db.func.count(policy.model.id)).scalar() - max_rows
+                while excess > 0:
+                    ids = self._oldest_ids(policy, min(excess, self.chunk_size))
+                    if not ids:
+                        break
+                    delete(ids)
+                    excess -= len(ids)
+            
+            # 递增版本号，使依赖该表的缓存和ETag失效（before_delete已按变更日志递增过的除外，
+            # 否则版本号没有对应的变更记录，客户端的ETag和增量同步游标会无故失效）
+            if report['deleted'] and not policy.records_changes:
+                bump_version(policy.name)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            report['elapsed'] = time.perf_counter() - started
+            if report['elapsed'] > 0:
+                report['rows_per_sec'] = report['deleted'] / report['elapsed']
+        
+        return report
+
+    def run(self, names=None, now=None):
+        """执行多个策略（默认全部），返回每个表的统计报告"""
+        reports = []
+        for name in names or list(self.policies):
+            report = self.run_policy(self.policies[name], now=now)
+            reports.append(report)
+            print(
+                f"数据清理 {report['table']}: 删除 {report['deleted']} 条，"
+                f"{report['chunks']} 批，{report['rows_per_sec']:.0f} 条/秒，"
+                f"持锁 {report['lock_hold_total'] * 1000:.1f} ms（单批最长 {report['lock_hold_max'] * 1000:.1f} ms）"
+            )
+        self.last_report = reports
+        return reports
@@ -0,0 +1,320 @@
+from models import db, Task, FocusTime, DailyStats, DailyTagStats, Tag
+from tagging import split_tags, tag_count_query
+from datetime import datetime, timedelta, time
+from collections import Counter, namedtuple
+
+# 任务中影响汇总统计的字段快照
+TaskSnapshot = namedtuple('TaskSnapshot', ['created_at', 'status', 'priority', 'tags', 'completed_at'])
+
+DAILY_FIELDS = [
+    'completed_count',
+    'created_count',
+    'created_completed_count',
+    'created_high_priority_count',
+    'focus_minutes',
+    'session_count',
+    'efficiency_sum',
+    'sessions_lt15',
+    'sessions_15_30',
+    'sessions_30_45',
+    'sessions_45_60',
+    'sessions_ge60'
+]
+
+BIN_FIELDS = ['sessions_lt15', 'sessions_15_30', 'sessions_30_45', 'sessions_45_60', 'sessions_ge60']
+
+
+def duration_bin(duration):
+    """专注时长所在区间（0-15, 15-30, 30-45, 45-60, 60+）"""
+    if duration < 15:
+        return 0
+    if duration < 30:
+        return 1
+    if duration < 45:
+        return 2
+    if duration < 60:
+        return 3
+    return 4
+
+
+def duration_bin_expr(column):
+    """专注时长区间的SQL表达式"""
+    return db.case(
+        (column < 15, 0),
+        (column < 30, 1),
+        (column < 45, 2),
+        (column < 60, 3),
+        else_=4
+    )
+
+
+def task_snapshot(task):
+    """获取任务快照，任务不存在时返回None"""
+    if task is None:
+        return None
+    return TaskSnapshot(task.created_at, task.status, task.priority, task.tags, task.completed_at)
+
+
+def upsert(model, index_elements, values, increments):
+    """插入或累加一行统计数据"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    stmt = insert(model.__table__).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={field: model.__table__.c[field] + stmt.excluded[field] for field in increments}
+    )
+    db.session.execute(stmt)
+
+
+class RollupDelta:
+    """一次写操作对汇总表产生的增量"""
+
+    def __init__(self):
+        self.daily = {}
+        self.tags = Counter()
+
+    def add(self, day, field, value):
+        if not value:
+            return
+        fields = self.daily.setdefault(day, {})
+        fields[field] = fields.get(field, 0) + value
+
+    def add_task(self, snapshot, sign):
+        if snapshot is None:
+            return
+        is_completed = snapshot.status == 'completed'
+        tags = split_tags(snapshot.tags)
+        
+        if snapshot.created_at:
+            day = snapshot.created_at.date()
+            self.add(day, 'created_count', sign)
+            self.add(day, 'created_completed_count', sign if is_completed else 0)
+            self.add(day, 'created_high_priority_count', sign if snapshot.priority == 3 else 0)
+            for tag in tags:
+                self.tags[(day, 'created', tag)] += sign
+        
+        if is_completed and snapshot.completed_at:
+            day = snapshot.completed_at.date()
+            self.add(day, 'completed_count', sign)
+            for tag in tags:
+                self.tags[(day, 'completed', tag)] += sign
+
+    def add_focus_time(self, focus_time, sign):
+        if focus_time is None or not focus_time.start_time:
+            return
+        day = focus_time.start_time.date()
+        self.add(day, 'session_count', sign)
+        self.add(day, 'focus_minutes', sign * (focus_time.duration or 0))
+        self.add(day, 'efficiency_sum', sign * (focus_time.efficiency_score or 0))
+        self.add(day, BIN_FIELDS[duration_bin(focus_time.duration or 0)], sign)
+
+    def flush(self):
+        """把增量写入汇总表（不提交事务，与业务数据在同一事务中提交）"""
+        for day, fields in self.daily.items():
+            fields = {field: value for field, value in fields.items() if value}
+            if fields:
+                upsert(DailyStats, ['date'], dict(date=day, **fields), list(fields))
+        for (day, kind, tag), count in self.tags.items():
+            if count:
+                upsert(DailyTagStats, ['date', 'kind', 'tag'],
+                        dict(date=day, kind=kind, tag=tag, count=count), ['count'])
+
+
+def record_task_change(old, new):
+    """记录任务变化（old/new为任务快照，新建时old为None，删除时new为None）"""
+    if old == new:
+        return
+    delta = RollupDelta()
+    delta.add_task(old, -1)
+    delta.add_task(new, 1)
+    delta.flush()
+
+
+def record_focus_session(focus_time):
+    """记录新的专注时间"""
+    delta = RollupDelta()
+    delta.add_focus_time(focus_time, 1)
+    delta.flush()
+
+
+def rebuild_daily_stats(since=None):
+    """根据原始数据重建汇总表
+
+    since为None时全量重建；否则只重建since当天及之后的数据，更早的历史汇总保留
+    （原始数据被清理后，汇总表中的历史仍然可用）。
+    """
+    delete_daily = DailyStats.query
+    delete_tags = DailyTagStats.query
+    if since is not None:
+        delete_daily = delete_daily.filter(DailyStats.date >= since)
+        delete_tags = delete_tags.filter(DailyTagStats.date >= since)
+    delete_daily.delete(synchronize_session=False)
+    delete_tags.delete(synchronize_session=False)
+    
+    start = datetime.combine(since, time.min) if since is not None else None
+    delta = RollupDelta()
+    
+    # 按创建日期汇总任务
+    created_day = db.func.date(Task.created_at)
+    query = db.session.query(
+        created_day,
+        db.func.count(Task.id),
+        db.func.sum(db.case((Task.status == 'completed', 1), else_=0)),
+        db.func.sum(db.case((Task.priority == 3, 1), else_=0))
+    ).filter(Task.created_at.isnot(None))
+    if start is not None:
+        query = query.filter(Task.created_at >= start)
+    for day, count, completed, high in query.group_by(created_day):
+        day = _parse_date(day)
+        delta.add(day, 'created_count', count)
+        delta.add(day, 'created_completed_count', completed or 0)
+        delta.add(day, 'created_high_priority_count', high or 0)
+    
+    query = tag_count_query(created_day).filter(Task.created_at.isnot(None))
+    if start is not None:
+        query = query.filter(Task.created_at >= start)
+    for day, tag, count in query.group_by(created_day, Tag.name):
+        delta.tags[(_parse_date(day), 'created', tag)] += count
+    
+    # 按完成日期汇总任务
+    completed_day = db.func.date(Task.completed_at)
+    query = db.session.query(
+        completed_day,
+        db.func.count(Task.id)
+    ).filter(Task.status == 'completed', Task.completed_at.isnot(None))
+    if start is not None:
+        query = query.filter(Task.completed_at >= start)
+    for day, count in query.group_by(completed_day):
+        delta.add(_parse_date(day), 'completed_count', count)
+    
+    query = tag_count_query(completed_day).filter(Task.status == 'completed', Task.completed_at.isnot(None))
+    if start is not None:
+        query = query.filter(Task.completed_at >= start)
+    for day, tag, count in query.group_by(completed_day, Tag.name):
+        delta.tags[(_parse_date(day), 'completed', tag)] += count
+    
+    # 按开始日期汇总专注时间
+    focus_day = db.func.date(FocusTime.start_time)
+    bin_expr = duration_bin_expr(FocusTime.duration)
+    query = db.session.query(
+        focus_day,
+        bin_expr,
+        db.func.count(FocusTime.id),
+        db.func.sum(FocusTime.duration),
+        db.func.sum(db.func.coalesce(FocusTime.efficiency_score, 0))
+    ).filter(FocusTime.start_time.isnot(None))
+    if start is not None:
+        query = query.filter(FocusTime.start_time >= start)
+    for day, bin_index, count, duration_sum, efficiency_sum in query.group_by(focus_day, bin_expr):
+        day = _parse_date(day)
+        delta.add(day, 'session_count', count)
+        delta.add(day, 'focus_minutes', duration_sum or 0)
+        delta.add(day, 'efficiency_sum', efficiency_sum or 0)
+        delta.add(day, BIN_FIELDS[bin_index], count)
+    
+    delta.flush()
+    db.session.commit()
+    return len(delta.daily)
+
+
+def _parse_date(value):
+    """SQL date()函数在SQLite中返回字符串"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+def _empty_summary():
+    summary = {field: 0 for field in DAILY_FIELDS}
+    summary['days'] = {}
+    return summary
+
+
+def window_summary(start):
+    """统计从start开始的时间窗口
+
+    完整的日期直接读取汇总表，start所在的不完整日期从原始数据中补齐，
+    因此结果与直接扫描原始数据一致，但只需要读取O(天数)行汇总数据。
+    """
+    summary = _empty_summary()
+    boundary_end = datetime.combine(start.date() + timedelta(days=1), time.min)
+    
+    rows = DailyStats.query.filter(DailyStats.date > start.date()).all()
+    for row in rows:
+        day = {field: getattr(row, field) or 0 for field in DAILY_FIELDS}
+        summary['days'][row.date.isoformat()] = day
+        for field in DAILY_FIELDS:
+            summary[field] += day[field]
+    
+    # 窗口起点所在日期的部分数据
+    completed_count = db.session.query(db.func.count(Task.id)).filter(
+        Task.status == 'completed',
+        Task.completed_at >= start,
+        Task.completed_at < boundary_end
+    ).scalar() or 0
+    summary['completed_count'] += completed_count
+    
+    created_count, created_completed, created_high = db.session.query(
+        db.func.count(Task.id),
+        db.func.sum(db.case((Task.status == 'completed', 1), else_=0)),
+        db.func.sum(db.case((Task.priority == 3, 1), else_=0))
+    ).filter(
+        Task.created_at >= start,
+        Task.created_at < boundary_end
+    ).one()
+    summary['created_count'] += created_count or 0
+    summary['created_completed_count'] += created_completed or 0
+    summary['created_high_priority_count'] += created_high or 0
+    
+    bin_expr = duration_bin_expr(FocusTime.duration)
+    focus_rows = db.session.query(
+        bin_expr,
+        db.func.count(FocusTime.id),
+        db.func.sum(FocusTime.duration),
+        db.func.sum(db.func.coalesce(FocusTime.efficiency_score, 0))
+    ).filter(
+        FocusTime.start_time >= start,
+        FocusTime.start_time < boundary_end
+    ).group_by(bin_expr).all()
+    for bin_index, count, duration_sum, efficiency_sum in focus_rows:
+        summary['session_count'] += count
+        summary['focus_minutes'] += duration_sum or 0
+        summary['efficiency_sum'] += efficiency_sum or 0
+        summary[BIN_FIELDS[bin_index]] += count
+    
+    summary['duration_bins'] = [summary[field] for field in BIN_FIELDS]
+    return summary
+
+
+def window_tag_counts(kind, start):
+    """统计从start开始的标签数量（kind: completed 或 created）"""
+    boundary_end = datetime.combine(start.date() + timedelta(days=1), time.min)
+    tag_counts = Counter()
+    
+    rows = db.session.query(
+        DailyTagStats.tag,
+        db.func.sum(DailyTagStats.count)
+    ).filter(
+        DailyTagStats.kind == kind,
+        DailyTagStats.date > start.date()
+    ).group_by(DailyTagStats.tag).all()
+    for tag, count in rows:
+        if count:
+            tag_counts[tag] += count
+    
+    time_column = Task.completed_at if kind == 'completed' else Task.created_at
+    query = tag_count_query().filter(
+        time_column >= start,
+        time_column < boundary_end
+    )
+    if kind == 'completed':
+        query = query.filter(Task.status == 'completed')
+    for tag, count in query.group_by(Tag.name):
+        tag_counts[tag] += count
+    
+    return dict(tag_counts)
@@ -0,0 +1,121 @@
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+import decimal
+import gzip
+import json
+import uuid
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库json（输出格式相同，速度较慢）
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只使用gzip
+    brotli = None
+
+# 压缩的响应类型
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain',
+    'text/javascript', 'application/javascript'
+}
+
+
+def _default(o):
+    """orjson（或标准库json）不直接支持的类型"""
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def dumps(obj, indent=False):
+    """序列化为UTF-8编码的JSON字节串
+
+    datetime输出ISO格式（与to_dict的isoformat相同），NumPy数值和数组直接序列化，中文不转义。
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False,
+        indent=2 if indent else None, separators=None if indent else (',', ':')
+    ).encode('utf-8')
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def rows_to_dicts(fields, rows):
+    """把按列查询得到的元组转换为字典（行中多余的列忽略），不加载ORM对象"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask的JSON提供者：jsonify和request.get_json使用orjson
+
+    与默认实现的区别：datetime输出ISO格式而不是HTTP日期格式，支持NumPy类型，
+    中文不转义为\\uXXXX，不对键排序。
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # 直接使用字节串，避免解码后再编码
+        return self._app.response_class(dumps(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+
+def choose_encoding(accept_encodings):
+    """按请求的Accept-Encoding选择压缩算法（安装了brotli时优先br），不接受压缩时返回None"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+def compress_response(response, accept_encodings, min_size=1024, level=6, br_quality=4):
+    """压缩较大的响应（在after_request中调用）
+
+    流式响应（事件流）、文件响应、已编码的响应和小于min_size字节的响应不压缩。
+    压缩后把强ETag改为弱ETag（内容编码不同，字节不再相同）。
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=br_quality)
+    else:
+        data = gzip.compress(data, compresslevel=level, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
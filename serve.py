@@ -0,0 +1,68 @@
+"""生产环境启动脚本
+
+用法:
+    python serve.py --server gunicorn --workers 4 --threads 8 --bind 0.0.0.0:5000
+    python serve.py --server waitress --threads 8 --bind 0.0.0.0:5000
+
+gunicorn（Linux/macOS）启动多个工作进程，每个进程在fork之后调用create_app，
+定时任务通过文件锁或数据库租约（SCHEDULER_ELECTION）只在一个进程中运行；
+waitress（可用于Windows）为单进程多线程。两者都需要单独安装。
+线程数通过环境变量WEB_THREADS传给应用：每个事件流（/api/stream）连接占用一个线程，
+每个进程最多接受线程数四分之一的事件流连接。
+"""
+import argparse
+import importlib.util
+import os
+
+
+def run_gunicorn(bind, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', bind)
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('timeout', timeout)
+            # 不使用preload：应用在每个工作进程fork之后初始化，避免调度器线程和数据库连接被复制
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            from app import create_app
+            return create_app()
+
+    Application().run()
+
+
+def run_waitress(bind, threads):
+    from waitress import serve
+    from app import create_app
+
+    host, _, port = bind.rpartition(':')
+    serve(create_app(), host=host or '0.0.0.0', port=int(port), threads=threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动Web服务')
+    parser.add_argument('--server', choices=['gunicorn', 'waitress'],
+                        default='waitress' if os.name == 'nt' else 'gunicorn', help='WSGI服务器')
+    parser.add_argument('--bind', default=os.environ.get('BIND', '0.0.0.0:5000'), help='监听地址')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+                        help='工作进程数（仅gunicorn）')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)),
+                        help='每个进程的线程数（其中四分之一可用于事件流连接）')
+    parser.add_argument('--timeout', type=int, default=60, help='请求超时秒数（仅gunicorn）')
+    args = parser.parse_args()
+
+    if importlib.util.find_spec(args.server) is None:
+        raise SystemExit(f'未安装{args.server}，请先执行 pip install {args.server}')
+    # 在导入应用之前设置，应用据此限制事件流连接数
+    os.environ['WEB_THREADS'] = str(args.threads)
+    if args.server == 'gunicorn':
+        run_gunicorn(args.bind, args.workers, args.threads, args.timeout)
+    else:
+        run_waitress(args.bind, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,11 +12,16 @@ let topTimerPauseStartTime = null;
 let topTimerInterval = null;
 let currentChartStyle = 'bar';
 let chartInstances = {};
+let tasksVersion = null;  // 任务表版本号，用于增量同步
+let tasksQueue = Promise.resolve();  // 依次执行任务列表的加载，避免旧的响应覆盖新的数据
+let eventSource = null;  // 服务器推送事件（/api/stream）连接
+let analyticsRefreshTimer = null;
 
 // 初始化
 document.addEventListener('DOMContentLoaded', function() {
     try {
         loadTasks();
+        subscribeEvents();
         // 延迟初始化排序，确保任务列表已渲染
         setTimeout(() => {
             initSortable();
@@ -38,14 +43,77 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-// 加载任务列表
-async function loadTasks() {
+// 订阅服务器推送事件：其他客户端的任务变更、新的专注记录和重新训练后的推荐结果由服务器推送。
+// 本页面的写操作之后仍然主动增量同步：事件总线只在进程内，写请求和事件流可能由不同的工作进程处理
+function subscribeEvents() {
+    if (!window.EventSource) return;
+    
+    eventSource = new EventSource('/api/stream');
+    eventSource.addEventListener('error', () => {
+        // 连接断开时浏览器会自动重连；服务器拒绝连接（连接数已达上限返回503）时浏览器不再重连，稍后重新订阅
+        if (eventSource.readyState === EventSource.CLOSED) {
+            eventSource = null;
+            setTimeout(subscribeEvents, 30000);
+        }
+    });
+    
+    // 连接（包括重连）建立后补齐断开期间的变更
+    eventSource.addEventListener('ready', (event) => {
+        const data = JSON.parse(event.data);
+        if (tasksVersion !== null && data.versions.tasks !== tasksVersion) {
+            loadTasks();
+            refreshVisibleAnalytics();
+        }
+    });
+    eventSource.addEventListener('tasks', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.version === tasksVersion) return;
+        loadTasks();
+        refreshVisibleAnalytics();
+    });
+    eventSource.addEventListener('focus', () => {
+        refreshVisibleAnalytics();
+    });
+    eventSource.addEventListener('recommendation', (event) => {
+        if (isSectionVisible('recommendationSection')) {
+            renderRecommendation(JSON.parse(event.data));
+        }
+    });
+    // 处理过慢丢失了事件，重新加载
+    eventSource.addEventListener('reset', () => {
+        loadTasks();
+        refreshVisibleAnalytics();
+    });
+}
+
+function isSectionVisible(id) {
+    const section = document.getElementById(id);
+    return section && section.style.display !== 'none';
+}
+
+// 数据分析已展开时刷新（合并短时间内的多个事件）
+function refreshVisibleAnalytics() {
+    if (!isSectionVisible('analyticsSection')) return;
+    clearTimeout(analyticsRefreshTimer);
+    analyticsRefreshTimer = setTimeout(loadAnalyticsDataOnly, 500);
+}
+
+// 加载任务列表（已加载过时只拉取变更）
+function loadTasks() {
+    tasksQueue = tasksQueue.then(refreshTasks, refreshTasks);
+    return tasksQueue;
+}
+
+async function refreshTasks() {
+    if (tasksVersion !== null && await syncTasks()) return;
+    
     try {
         const response = await fetch('/api/tasks');
         const result = await response.json();
         
         if (result.success) {
             tasks = result.data;
+            tasksVersion = result.version;
             renderTasks();
         } else {
             showError('加载任务失败: ' + result.error);
@@ -55,78 +123,127 @@ async function loadTasks() {
     }
 }
 
-// 渲染任务列表
-function renderTasks() {
+// 增量同步：拉取上次同步之后修改和删除的任务并就地更新，需要重新加载完整列表时返回false
+async function syncTasks() {
+    try {
+        const response = await fetch(`/api/tasks/changes?since=${tasksVersion}`);
+        const result = await response.json();
+        if (!result.success || result.data.reset) return false;
+        
+        applyTaskChanges(result.data.upserts, result.data.deletes);
+        tasksVersion = result.data.version;
+        return true;
+    } catch (error) {
+        return false;
+    }
+}
+
+// 把变更合并到任务数组，只更新受影响的任务卡片
+function applyTaskChanges(upserts, deletes) {
+    if (upserts.length === 0 && deletes.length === 0) return;
+    
+    const byId = new Map(tasks.map(task => [task.id, task]));
+    deletes.forEach(id => byId.delete(id));
+    upserts.forEach(task => byId.set(task.id, task));
+    tasks = Array.from(byId.values());
+    
     const tasksList = document.getElementById('tasksList');
     if (!tasksList) return;
+    // 列表为空时显示的是提示信息，整体重新渲染
+    if (!tasksList.querySelector('.task-card')) {
+        renderTasks();
+        return;
+    }
     
+    const view = currentTaskView();
+    deletes.forEach(id => removeTaskCard(tasksList, id));
+    upserts.forEach(task => {
+        removeTaskCard(tasksList, task.id);
+        if (view.matches(task)) {
+            insertTaskCard(tasksList, task, view.compare, byId);
+        }
+    });
+    
+    if (!tasksList.querySelector('.task-card')) {
+        renderTasks();
+    }
+}
+
+function removeTaskCard(tasksList, taskId) {
+    const card = tasksList.querySelector(`.task-card[data-task-id="${taskId}"]`);
+    if (card) card.remove();
+}
+
+// 按当前排序方式把任务卡片插入到对应位置
+function insertTaskCard(tasksList, task, compare, byId) {
+    const template = document.createElement('template');
+    template.innerHTML = taskCardHtml(task).trim();
+    const next = Array.from(tasksList.querySelectorAll('.task-card')).find(card => {
+        const other = byId.get(parseInt(card.dataset.taskId));
+        return other && compare(task, other) < 0;
+    });
+    tasksList.insertBefore(template.content.firstElementChild, next || null);
+}
+
+// 当前的过滤条件（matches）和排序方式（compare）
+function currentTaskView() {
     const statusFilterEl = document.getElementById('filterStatus');
     const priorityFilterEl = document.getElementById('filterPriority');
     const tagsFilterEl = document.getElementById('filterTags');
     
     const statusFilter = statusFilterEl ? statusFilterEl.value : 'pending'; // 默认只显示待完成
     const priorityFilter = priorityFilterEl ? priorityFilterEl.value : 'all';
-    
-    // 过滤任务
     const tagsFilter = tagsFilterEl ? tagsFilterEl.value.trim().toLowerCase() : '';
     
+    // 查看已完成任务时只显示最近14天
+    const cutoffDate = new Date();
+    cutoffDate.setDate(cutoffDate.getDate() - 14);
+    
+    return {
+        statusFilter: statusFilter,
+        matches(task) {
+            // 默认只显示待完成的任务，除非用户选择查看已完成或全部
+            if (statusFilter !== 'all' && statusFilter !== task.status) return false;
+            
+            if (priorityFilter !== 'all' && task.priority != priorityFilter) return false;
+            if (tagsFilter) {
+                const taskTags = (task.tags || '').toLowerCase();
+                const filterTags = tagsFilter.split(',').map(t => t.trim());
+                const hasMatchingTag = filterTags.some(tag => taskTags.includes(tag));
+                if (!hasMatchingTag) return false;
+            }
+            if (statusFilter === 'completed') {
+                return !!task.completed_at && new Date(task.completed_at) >= cutoffDate;
+            }
+            return true;
+        },
+        compare: statusFilter === 'completed' ?
+            // 已完成任务按完成时间倒序排列（最近完成的在前）
+            (a, b) => {
+                const dateA = a.completed_at ? new Date(a.completed_at) : new Date(0);
+                const dateB = b.completed_at ? new Date(b.completed_at) : new Date(0);
+                return dateB - dateA;
+            } :
+            // 待完成任务按order_index排序
+            (a, b) => a.order_index - b.order_index
+    };
+}
+
+// 渲染任务列表
+function renderTasks() {
+    const tasksList = document.getElementById('tasksList');
+    if (!tasksList) return;
+    
+    const view = currentTaskView();
+    const statusFilter = view.statusFilter;
+    
     // 调试信息
     console.log('renderTasks - statusFilter:', statusFilter, 'tasks总数:', tasks.length);
     const completedCount = tasks.filter(t => t.status === 'completed').length;
     const pendingCount = tasks.filter(t => t.status === 'pending').length;
     console.log('任务状态分布 - pending:', pendingCount, 'completed:', completedCount);
     
-    let filteredTasks = tasks.filter(task => {
-        // 默认只显示待完成的任务，除非用户选择查看已完成或全部
-        if (statusFilter === 'all') {
-            // 如果选择"全部"，显示所有任务
-        } else if (statusFilter !== task.status) {
-            return false;
-        }
-        
-        if (priorityFilter !== 'all' && task.priority != priorityFilter) return false;
-        if (tagsFilter) {
-            const taskTags = (task.tags || '').toLowerCase();
-            const filterTags = tagsFilter.split(',').map(t => t.trim());
-            const hasMatchingTag = filterTags.some(tag => taskTags.includes(tag));
-            if (!hasMatchingTag) return false;
-        }
-        return true;
-    });
-    
-    // 如果查看已完成任务，按完成时间倒序排列（最近完成的在前），且只显示最近14天
-    if (statusFilter === 'completed') {
-        console.log('正在过滤已完成任务，过滤前数量:', filteredTasks.length);
-        // 只显示最近14天的已完成任务
-        const cutoffDate = new Date();
-        cutoffDate.setDate(cutoffDate.getDate() - 14);
-        const beforeCount = filteredTasks.length;
-        
-        // 先过滤出有completed_at的任务
-        filteredTasks = filteredTasks.filter(task => {
-            if (!task.completed_at) {
-                console.log('任务缺少completed_at，将被过滤:', task.id, task.title, '状态:', task.status);
-                return false;
-            }
-            const taskDate = new Date(task.completed_at);
-            const isWithin14Days = taskDate >= cutoffDate;
-            if (!isWithin14Days) {
-                console.log('任务超过14天，将被过滤:', task.id, task.title, '完成时间:', task.completed_at);
-            }
-            return isWithin14Days;
-        });
-        console.log('已完成任务过滤后数量:', filteredTasks.length, '(过滤前:', beforeCount, ')');
-        
-        // 按完成时间倒序排列
-        filteredTasks.sort((a, b) => {
-            const dateA = a.completed_at ? new Date(a.completed_at) : new Date(0);
-            const dateB = b.completed_at ? new Date(b.completed_at) : new Date(0);
-            return dateB - dateA; // 倒序，最近完成的在前
-        });
-    } else {
-        // 待完成任务按order_index排序
-        filteredTasks.sort((a, b) => a.order_index - b.order_index);
-    }
+    const filteredTasks = tasks.filter(view.matches).sort(view.compare);
     
     console.log('最终过滤结果数量:', filteredTasks.length, '状态筛选:', statusFilter);
     
@@ -139,7 +256,17 @@ function renderTasks() {
         return;
     }
     
-    tasksList.innerHTML = filteredTasks.map(task => `
+    tasksList.innerHTML = filteredTasks.map(taskCardHtml).join('');
+    
+    // 重新初始化排序（仅对待完成任务）
+    if (statusFilter !== 'completed') {
+        initSortable();
+    }
+}
+
+// 单个任务卡片的HTML
+function taskCardHtml(task) {
+    return `
         <div class="task-card priority-${getPriorityClass(task.priority)} ${task.status === 'completed' ? 'completed' : ''}" 
              data-task-id="${task.id}">
             <div class="task-info">
@@ -161,11 +288,60 @@ function renderTasks() {
                 <button class="btn btn-danger" onclick="deleteTask(${task.id})">删除</button>
             </div>
         </div>
-    `).join('');
+    `;
+}
+
+// 初始化拖拽排序（拖动后只移动被拖动的任务）
+function initSortable() {
+    const tasksList = document.getElementById('tasksList');
+    if (!tasksList || typeof Sortable === 'undefined') return;
     
-    // 重新初始化排序（仅对待完成任务）
-    if (statusFilter !== 'completed') {
-        initSortable();
+    if (sortable) {
+        sortable.destroy();
+    }
+    
+    sortable = new Sortable(tasksList, {
+        animation: 150,
+        onEnd: function(evt) {
+            if (evt.oldIndex === evt.newIndex) return;
+            const item = evt.item;
+            const prev = item.previousElementSibling;
+            const next = item.nextElementSibling;
+            moveTask(
+                parseInt(item.dataset.taskId),
+                next && next.dataset.taskId ? parseInt(next.dataset.taskId) : null,
+                prev && prev.dataset.taskId ? parseInt(prev.dataset.taskId) : null
+            );
+        }
+    });
+}
+
+// 移动任务到相邻任务之间
+async function moveTask(taskId, beforeId, afterId) {
+    try {
+        const response = await fetch(`/api/tasks/${taskId}/move`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ before_id: beforeId, after_id: afterId })
+        });
+        const result = await response.json();
+        
+        if (result.success) {
+            if (result.rebalanced) {
+                // 服务端重新编号了整个列表，需要重新加载
+                loadTasks();
+            } else {
+                const task = tasks.find(t => t.id === taskId);
+                if (task) task.order_index = result.data.order_index;
+            }
+        } else {
+            showError('排序失败: ' + result.error);
+            loadTasks();
+        }
+    } catch (error) {
+        loadTasks();
     }
 }
 
@@ -443,7 +619,7 @@ async function loadAnalytics() {
             drawTasksChart(data.daily_stats);
             drawTagsChart(data.tasks_by_tags || {});
             drawFocusTimeChart(data.daily_stats);
-            drawFocusDurationChart(data.focus_durations || []);
+            drawFocusDurationChart(data.focus_durations || [], data.focus_duration_bins);
         } else {
             showError('加载数据失败: ' + result.error);
         }
@@ -551,29 +727,31 @@ function drawTagsChart(tagsData) {
 }
 
 // 绘制专注时长分布图表
-function drawFocusDurationChart(durations) {
+function drawFocusDurationChart(durations, durationBins) {
     const ctx = document.getElementById('focusDurationChart');
     if (chartInstances.focusDurationChart) {
         chartInstances.focusDurationChart.destroy();
     }
     
-    if (durations.length === 0) {
+    // 将时长分组（0-15, 15-30, 30-45, 45-60, 60+），优先使用后端统计好的分组
+    const bins = durationBins ? durationBins.slice() : [0, 0, 0, 0, 0];
+    const labels = ['0-15分钟', '15-30分钟', '30-45分钟', '45-60分钟', '60+分钟'];
+    
+    if (!durationBins) {
+        durations.forEach(d => {
+            if (d < 15) bins[0]++;
+            else if (d < 30) bins[1]++;
+            else if (d < 45) bins[2]++;
+            else if (d < 60) bins[3]++;
+            else bins[4]++;
+        });
+    }
+    
+    if (bins.every(count => count === 0)) {
         ctx.getContext('2d').clearRect(0, 0, ctx.width, ctx.height);
         return;
     }
     
-    // 将时长分组（0-15, 15-30, 30-45, 45-60, 60+）
-    const bins = [0, 0, 0, 0, 0];
-    const labels = ['0-15分钟', '15-30分钟', '30-45分钟', '45-60分钟', '60+分钟'];
-    
-    durations.forEach(d => {
-        if (d < 15) bins[0]++;
-        else if (d < 30) bins[1]++;
-        else if (d < 45) bins[2]++;
-        else if (d < 60) bins[3]++;
-        else bins[4]++;
-    });
-    
     chartInstances.focusDurationChart = new Chart(ctx, {
         type: 'doughnut',
         data: {
@@ -668,7 +846,7 @@ function changeChartStyle(style) {
             drawTasksChart(data.daily_stats);
             drawTagsChart(data.tasks_by_tags || {});
             drawFocusTimeChart(data.daily_stats);
-            drawFocusDurationChart(data.focus_durations || []);
+            drawFocusDurationChart(data.focus_durations || [], data.focus_duration_bins);
         } else {
             // 如果没有缓存，重新加载数据
             loadAnalyticsDataOnly();
@@ -702,7 +880,7 @@ async function loadAnalyticsDataOnly() {
             drawTasksChart(data.daily_stats);
             drawTagsChart(data.tasks_by_tags || {});
             drawFocusTimeChart(data.daily_stats);
-            drawFocusDurationChart(data.focus_durations || []);
+            drawFocusDurationChart(data.focus_durations || [], data.focus_duration_bins);
         }
     } catch (error) {
         console.error('加载数据失败:', error);
@@ -721,22 +899,7 @@ async function loadRecommendation() {
         const result = await response.json();
         
         if (result.success) {
-            const data = result.data;
-            document.getElementById('recommendedDuration').textContent = data.recommended_duration;
-            document.getElementById('confidence').textContent = (data.confidence * 100).toFixed(0) + '%';
-            
-            // 显示推荐依据
-            const infoList = document.getElementById('recommendationInfo');
-            if (data.user_data) {
-                infoList.innerHTML = `
-                    <li>平均专注时长: ${data.user_data.avg_duration.toFixed(1)} 分钟</li>
-                    <li>任务完成率: ${(data.user_data.completion_rate * 100).toFixed(0)}%</li>
-                    <li>平均效率: ${(data.user_data.avg_efficiency * 100).toFixed(0)}%</li>
-                    <li>高优先级任务比例: ${(data.user_data.high_priority_ratio * 100).toFixed(0)}%</li>
-                `;
-            } else {
-                infoList.innerHTML = '<li>暂无足够的历史数据，使用默认推荐</li>';
-            }
+            renderRecommendation(result.data);
         } else {
             showError('加载推荐失败: ' + result.error);
         }
@@ -745,6 +908,24 @@ async function loadRecommendation() {
     }
 }
 
+function renderRecommendation(data) {
+    document.getElementById('recommendedDuration').textContent = data.recommended_duration;
+    document.getElementById('confidence').textContent = (data.confidence * 100).toFixed(0) + '%';
+    
+    // 显示推荐依据
+    const infoList = document.getElementById('recommendationInfo');
+    if (data.user_data) {
+        infoList.innerHTML = `
+            <li>平均专注时长: ${data.user_data.avg_duration.toFixed(1)} 分钟</li>
+            <li>任务完成率: ${(data.user_data.completion_rate * 100).toFixed(0)}%</li>
+            <li>平均效率: ${(data.user_data.avg_efficiency * 100).toFixed(0)}%</li>
+            <li>高优先级任务比例: ${(data.user_data.high_priority_ratio * 100).toFixed(0)}%</li>
+        `;
+    } else {
+        infoList.innerHTML = '<li>暂无足够的历史数据，使用默认推荐</li>';
+    }
+}
+
 // 开始专注计时器
 function startFocusTimer() {
     // 让用户选择任务
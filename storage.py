@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# 只读分析引擎的bind key
+ANALYTICS_BIND = 'analytics'
+
+# SQLite每个新连接建立时设置的参数
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',       # 写入不阻塞读取（持久保存在数据库文件中）
+    'synchronous': 'NORMAL',     # WAL模式下只在检查点时fsync，断电最多丢失最后的事务
+    'busy_timeout': 5000,        # 等待写锁的毫秒数，超时才报 database is locked
+    'cache_size': -64000,        # 每个连接的页缓存，负数单位为KB（64 MB）
+    'mmap_size': 268435456,      # 内存映射读取的大小（256 MB）
+    'temp_store': 'MEMORY',      # 排序和临时表放在内存中
+}
+
+# 当前上下文中的读查询是否使用只读分析引擎
+_analytics_reads = ContextVar('analytics_reads', default=False)
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_memory(url):
+    """是否为SQLite内存数据库（每个引擎各自一份，不能共享给只读引擎）"""
+    url = make_url(url)
+    return is_sqlite(url) and (url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory')
+
+
+def engine_options(url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800, read_only=False):
+    """按数据库类型生成引擎参数（连接池大小、PostgreSQL只读连接等）"""
+    if is_memory(url):
+        # 内存数据库由Flask-SQLAlchemy使用StaticPool，不需要连接池参数
+        return {}
+
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+    }
+    if not is_sqlite(url):
+        # 服务器数据库：检测并回收被服务端断开的连接
+        options['pool_pre_ping'] = True
+        options['pool_recycle'] = pool_recycle
+        if read_only and make_url(url).get_backend_name() == 'postgresql':
+            options['connect_args'] = {'options': '-c default_transaction_read_only=on'}
+    return options
+
+
+def install_pragmas(engine, pragmas, read_only=False):
+    """在SQLite引擎的每个新连接上设置PRAGMA（read_only时禁止该连接写入）"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+            if read_only:
+                cursor.execute('PRAGMA query_only=ON')
+        finally:
+            cursor.close()
+
+
+def configure_storage(app):
+    """根据应用配置生成主引擎和只读分析引擎的参数（需在db.init_app之前调用）"""
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    pool = {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, **pool)
+
+    # 未单独配置只读地址时使用主库；内存数据库无法共享，不使用单独的分析引擎
+    read_url = app.config.get('DATABASE_READ_URL') or url
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.pop(ANALYTICS_BIND, None)
+    if app.config['DB_ANALYTICS_ENGINE'] and not is_memory(read_url):
+        pool['pool_size'] = app.config['DB_ANALYTICS_POOL_SIZE']
+        binds[ANALYTICS_BIND] = dict(engine_options(read_url, read_only=True, **pool), url=read_url)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_storage(app, db):
+    """初始化数据库：配置引擎参数、初始化Flask-SQLAlchemy，并为SQLite连接设置PRAGMA"""
+    configure_storage(app)
+    db.init_app(app)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            install_pragmas(engine, app.config['SQLITE_PRAGMAS'], read_only=key == ANALYTICS_BIND)
+
+
+class RoutingSession(Session):
+    """在 analytics_reads() 上下文中把读查询路由到只读分析引擎的会话
+
+    写语句和flush始终使用主引擎；没有配置分析引擎时所有查询使用主引擎。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _analytics_reads.get() and not self._flushing:
+            is_write = clause is not None and getattr(clause, 'is_dml', False)
+            engine = self._db.engines.get(ANALYTICS_BIND) if not is_write else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def analytics_reads():
+    """上下文中的读查询使用只读分析引擎（读取已提交的数据，不会被写事务阻塞）"""
+    token = _analytics_reads.set(True)
+    try:
+        yield
+    finally:
+        _analytics_reads.reset(token)
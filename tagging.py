@@ -0,0 +1,90 @@
+from models import db, Task, Tag, task_tags
+
+
+def split_tags(tags):
+    """解析逗号分隔的标签字符串（去除空白和重复标签，保持原有顺序）"""
+    if not tags:
+        return []
+    names = []
+    for tag in tags.split(','):
+        tag = tag.strip()
+        if tag and tag not in names:
+            names.append(tag)
+    return names
+
+
+def get_or_create_tags(names):
+    """按名称获取标签，不存在的标签会被创建
+
+    用 INSERT ... ON CONFLICT DO NOTHING 插入缺少的标签后重新查询，
+    并发请求同时创建同名标签时不会违反唯一约束。
+    """
+    if not names:
+        return {}
+    existing = {tag.name: tag for tag in Tag.query.filter(Tag.name.in_(names)).all()}
+    missing = [name for name in names if name not in existing]
+    if missing:
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        
+        db.session.execute(
+            insert(Tag.__table__).on_conflict_do_nothing(index_elements=['name']),
+            [{'name': name} for name in missing]
+        )
+        existing.update((tag.name, tag) for tag in Tag.query.filter(Tag.name.in_(missing)).all())
+    return existing
+
+
+def sync_task_tags(task):
+    """根据任务的tags字段同步关联表"""
+    names = split_tags(task.tags)
+    tags = get_or_create_tags(names)
+    task.tag_objects = [tags[name] for name in names]
+
+
+def tag_filter(name):
+    """按标签过滤任务的条件（走tags.name和task_tags.tag_id索引）"""
+    task_ids = db.session.query(task_tags.c.task_id).join(
+        Tag, Tag.id == task_tags.c.tag_id
+    ).filter(Tag.name == name)
+    return Task.id.in_(task_ids)
+
+
+def tag_count_query(*columns):
+    """按标签分组计数的查询，调用方追加任务过滤条件后再group_by"""
+    return db.session.query(
+        *columns,
+        Tag.name,
+        db.func.count(task_tags.c.task_id)
+    ).select_from(Task).join(
+        task_tags, task_tags.c.task_id == Task.id
+    ).join(
+        Tag, Tag.id == task_tags.c.tag_id
+    )
+
+
+def migrate_task_tags():
+    """把已有任务的tags字段迁移到标签关联表，返回迁移的任务数"""
+    rows = db.session.query(Task.id, Task.tags).filter(
+        Task.tags.isnot(None),
+        Task.tags != ''
+    ).all()
+    if not rows:
+        return 0
+    
+    parsed = [(task_id, split_tags(tags_str)) for task_id, tags_str in rows]
+    names = sorted({name for _, names in parsed for name in names})
+    tags = get_or_create_tags(names)
+    
+    db.session.execute(task_tags.delete())
+    links = [
+        {'task_id': task_id, 'tag_id': tags[name].id}
+        for task_id, names in parsed for name in names
+    ]
+    if links:
+        db.session.execute(task_tags.insert(), links)
+    db.session.commit()
+    return len(parsed)
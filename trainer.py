@@ -0,0 +1,158 @@
+from datetime import datetime
+import copy
+import threading
+import time
+
+
+class TrainingWorker:
+    """后台模型训练器
+
+    在APScheduler的线程池中执行训练，训练期间到达的多次触发会合并为一次后续训练；
+    训练使用快照数据生成新的预测器，完成后原子替换当前预测器。
+    在线模型还可以通过 partial_fit 逐条增量更新，每save_every次更新在后台调用save_func保存一次；
+    多进程部署时只有can_save()为真的进程（选举出的主进程）保存，其他进程的增量更新只在本进程生效，
+    会被同步进来的主进程模型替换（对应的记录在下次全量训练时纳入模型）。
+    """
+
+    JOB_ID = 'retrain_model'
+    SAVE_JOB_ID = 'save_online_model'
+
+    def __init__(self, scheduler, train_func, predictor, save_func=None, save_every=10, can_save=None):
+        self.scheduler = scheduler
+        self.train_func = train_func
+        self.predictor = predictor
+        self.save_func = save_func
+        self.save_every = save_every
+        self.can_save = can_save
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._train_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._pending = 0
+        self._scheduled = False
+        self._running = False
+
+        self.runs = 0
+        self.online_updates = 0
+        self.coalesced = 0
+        self.last_duration = None
+        self.last_finished_at = None
+        self.last_result = None
+        self.last_error = None
+
+    @property
+    def model_version(self):
+        """当前模型版本号"""
+        return f'v1.{self.version}'
+
+    def submit(self):
+        """提交一次训练请求，已排队的请求会被合并"""
+        with self._lock:
+            self._pending += 1
+            if self._scheduled:
+                self.coalesced += 1
+                return False
+            self._scheduled = True
+
+        try:
+            self.scheduler.add_job(self._run, id=self.JOB_ID, replace_existing=True)
+        except Exception as e:
+            with self._lock:
+                self._scheduled = False
+            print(f"提交训练任务错误: {e}")
+            return False
+        return True
+
+    def _run(self):
+        """后台执行训练，直到没有待处理的请求"""
+        while True:
+            with self._lock:
+                if self._pending == 0:
+                    self._scheduled = False
+                    return
+                self._pending = 0
+            self.train_now()
+
+    def train_now(self):
+        """立即训练（同一时间只有一个训练在执行）"""
+        with self._train_lock:
+            self._running = True
+            started = time.perf_counter()
+            try:
+                self.last_result = bool(self.train_func())
+                self.last_error = None
+            except Exception as e:
+                self.last_result = False
+                self.last_error = str(e)
+                print(f"后台训练错误: {e}")
+            finally:
+                self._running = False
+                self.runs += 1
+                self.last_duration = time.perf_counter() - started
+                self.last_finished_at = datetime.utcnow()
+            return self.last_result
+
+    def partial_fit(self, X, y):
+        """增量更新当前预测器（只有在线模型支持），返回是否更新了模型
+
+        更新锁同时保护替换预测器，更新不会落到刚被替换掉的预测器上；保存在后台执行。
+        """
+        with self._update_lock:
+            if not self.predictor.partial_fit(X, y):
+                return False
+            
+            with self._lock:
+                self.online_updates += 1
+                should_save = self.save_func and self.save_every and self.online_updates % self.save_every == 0
+        if should_save:
+            self.submit_save()
+        return True
+
+    def submit_save(self):
+        """提交一次在线模型的后台保存（不允许保存的进程直接跳过），已排队的保存会被合并"""
+        if self.can_save is not None and not self.can_save():
+            return False
+        try:
+            self.scheduler.add_job(self._save, id=self.SAVE_JOB_ID, replace_existing=True)
+        except Exception as e:
+            print(f"提交保存任务错误: {e}")
+            return False
+        return True
+
+    def _save(self):
+        """后台保存在线模型：在更新锁内复制模型参数，写入存储时不阻塞增量更新"""
+        with self._update_lock:
+            predictor = self.predictor
+            snapshot = copy.copy(predictor)
+            snapshot.estimator = copy.deepcopy(predictor.estimator)
+        try:
+            version = self.save_func(snapshot)
+        except Exception as e:
+            print(f"保存在线模型错误: {e}")
+            return
+        with self._lock:
+            if self.predictor is predictor:
+                self.version = version
+
+    def swap(self, predictor, version=None):
+        """原子替换当前预测器（version为模型存储中的版本号），会等待进行中的增量更新完成"""
+        with self._update_lock, self._lock:
+            self.predictor = predictor
+            self.version = version if version is not None else self.version + 1
+
+    def status(self):
+        """训练状态"""
+        with self._lock:
+            return {
+                'queue_depth': self._pending,
+                'running': self._running,
+                'runs': self.runs,
+                'coalesced': self.coalesced,
+                'online_updates': self.online_updates,
+                'model_version': self.model_version,
+                'last_duration': round(self.last_duration, 4) if self.last_duration is not None else None,
+                'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+                'last_result': self.last_result,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,108 @@
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+
+# 默认搜索空间：随机森林的树数量和深度，以及在线模型的遗忘因子
+DEFAULT_GRID = [
+    {'backend': ['forest'], 'n_estimators': [10, 25, 50, 100, 200], 'max_depth': [4, 6, 8, 10, None]},
+    {'backend': ['online'], 'forgetting': [1.0, 0.99, 0.95]}
+]
+
+# 测量推理延迟时单条预测的重复次数
+LATENCY_REPEAT = 200
+
+# 子进程中的训练/验证数据（通过进程池的initializer传入一次，避免每个任务重复传输）
+_data = {}
+
+
+def time_split(X, y, valid_ratio=0.2):
+    """按时间顺序划分训练集和验证集（样本已按时间排序，最后valid_ratio作为验证集）"""
+    n_valid = max(1, int(round(len(y) * valid_ratio)))
+    if len(y) - n_valid < 2:
+        raise ValueError('样本数量不足，无法划分训练集和验证集')
+    return X[:-n_valid], y[:-n_valid], X[-n_valid:], y[-n_valid:]
+
+
+def expand_grid(grid):
+    """把搜索空间展开为参数组合列表"""
+    configs = []
+    for space in grid:
+        names = list(space)
+        for values in itertools.product(*(space[name] for name in names)):
+            configs.append(dict(zip(names, values)))
+    return configs
+
+
+def _init_worker(X_train, y_train, X_valid, y_valid):
+    _data.update(X_train=X_train, y_train=y_train, X_valid=X_valid, y_valid=y_valid)
+
+
+def evaluate_config(config):
+    """训练并评估一组参数，返回MAE、训练耗时和推理延迟"""
+    from ml_model import FocusTimePredictor
+
+    X_train, y_train = _data['X_train'], _data['y_train']
+    X_valid, y_valid = _data['X_valid'], _data['y_valid']
+
+    predictor = FocusTimePredictor(**config)
+    started = time.perf_counter()
+    if not predictor.train(X_train, y_train):
+        raise ValueError(f'训练失败: {config}')
+    train_time = time.perf_counter() - started
+
+    # 与线上一致，评估限制在15-60分钟后的预测值
+    predictions, _ = predictor.predict_batch(X_valid)
+    mae = float(np.mean(np.abs(predictions - y_valid)))
+
+    row = X_valid[:1]
+    timings = []
+    for _ in range(LATENCY_REPEAT):
+        started = time.perf_counter()
+        predictor.predict_batch(row)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'params': config,
+        'mae': round(mae, 4),
+        'train_time': round(train_time, 4),
+        'latency_us': round(float(np.median(timings)) * 1e6, 1)
+    }
+
+
+def choose(results, tolerance=0.02):
+    """在MAE不超过最佳值(1+tolerance)倍的参数中选择推理最快、训练最快的一组"""
+    best_mae = min(r['mae'] for r in results)
+    candidates = [r for r in results if r['mae'] <= best_mae * (1 + tolerance)]
+    return min(candidates, key=lambda r: (r['latency_us'], r['train_time']))
+
+
+def tune(X, y, grid=None, valid_ratio=0.2, jobs=None, samples=None, seed=42, tolerance=0.02):
+    """离线调优
+
+    按时间顺序划分训练/验证集，用进程池并行评估搜索空间中的参数组合
+    （samples不为空时随机抽取samples组），返回 (选中的结果, 所有结果)。
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    X_train, y_train, X_valid, y_valid = time_split(X, y, valid_ratio)
+
+    configs = expand_grid(grid or DEFAULT_GRID)
+    if samples and samples < len(configs):
+        configs = random.Random(seed).sample(configs, samples)
+
+    jobs = jobs or os.cpu_count() or 1
+    # 使用spawn启动子进程，不继承Web应用的调度器线程和数据库连接
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(configs)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(X_train, y_train, X_valid, y_valid)
+    ) as executor:
+        results = list(executor.map(evaluate_config, configs))
+
+    results.sort(key=lambda r: r['mae'])
+    return choose(results, tolerance), results
@@ -0,0 +1,140 @@
+def _clean_text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def validate_task_data(data, partial=False):
+    """校验任务数据
+
+    partial为False时按创建任务的规则校验（缺省字段使用默认值），
+    为True时按更新任务的规则只校验传入的字段。
+    返回 (字段字典, 错误信息)，校验通过时错误信息为None。
+    """
+    if not isinstance(data, dict):
+        return None, '请求数据不能为空'
+    
+    values = {}
+    
+    if not partial or 'title' in data:
+        title = _clean_text(data.get('title', ''))
+        if not title:
+            return None, '任务标题不能为空'
+        if len(title) > 200:
+            return None, '任务标题不能超过200个字符'
+        values['title'] = title
+    
+    if not partial or 'description' in data:
+        description = _clean_text(data.get('description', ''))
+        if len(description) > 2000:
+            return None, '任务描述不能超过2000个字符'
+        values['description'] = description
+    
+    if not partial or 'priority' in data:
+        priority = data.get('priority', 1)
+        if priority not in [1, 2, 3]:
+            return None, '优先级必须是1、2或3'
+        values['priority'] = priority
+    
+    if not partial or 'tags' in data:
+        tags = _clean_text(data.get('tags', ''))
+        if len(tags) > 500:
+            return None, '标签总长度不能超过500个字符'
+        values['tags'] = tags
+    
+    if partial and 'status' in data:
+        status = data['status']
+        if status not in ['pending', 'completed']:
+            return None, '状态必须是pending或completed'
+        values['status'] = status
+    
+    return values, None
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _validate_overrides(overrides, feature_names):
+    """校验单个场景的特征覆盖（tag为标签名称，按标签编码覆盖tag_encoded）"""
+    if not isinstance(overrides, dict):
+        return None, '场景必须是对象'
+    
+    values = {}
+    for name, value in overrides.items():
+        if name == 'label':
+            continue
+        if name == 'tag':
+            if not isinstance(value, str) or not value.strip():
+                return None, '标签必须是非空字符串'
+            values['tag'] = value.strip()
+            continue
+        if name not in feature_names:
+            return None, f'未知的特征: {name}'
+        if not _is_number(value):
+            return None, f'特征 {name} 的值必须是数字'
+        values[name] = float(value)
+    return values, None
+
+
+def validate_scenarios(data, feature_names, max_count=500):
+    """校验批量推荐的场景
+
+    data['scenarios'] 为特征覆盖列表（可带label和tag），data['sweep'] 为
+    {feature, values} 或 {feature, start, stop, step}，对某个特征取一组值；
+    两者同时提供时对每个场景展开sweep的所有取值。
+    返回 (场景列表, 错误信息)，每个场景为 {'label', 'overrides'}。
+    """
+    if not isinstance(data, dict):
+        return None, '请求数据不能为空'
+    
+    raw_scenarios = data.get('scenarios')
+    sweep = data.get('sweep')
+    if raw_scenarios is None and sweep is None:
+        return None, '必须提供scenarios或sweep'
+    
+    scenarios = []
+    if raw_scenarios is not None:
+        if not isinstance(raw_scenarios, list):
+            return None, 'scenarios必须是列表'
+        if len(raw_scenarios) > max_count:
+            return None, f'场景数量不能超过{max_count}'
+        for index, item in enumerate(raw_scenarios):
+            overrides, error = _validate_overrides(item, feature_names)
+            if error:
+                return None, f'场景{index}: {error}'
+            label = item.get('label')
+            scenarios.append({'label': str(label) if label is not None else None, 'overrides': overrides})
+    else:
+        scenarios.append({'label': None, 'overrides': {}})
+    
+    if sweep is not None:
+        if not isinstance(sweep, dict):
+            return None, 'sweep必须是对象'
+        feature = sweep.get('feature')
+        if feature not in feature_names:
+            return None, f'未知的特征: {feature}'
+        
+        if 'values' in sweep:
+            sweep_values = sweep['values']
+            if not isinstance(sweep_values, list) or not all(_is_number(v) for v in sweep_values):
+                return None, 'sweep.values必须是数字列表'
+        else:
+            start, stop, step = sweep.get('start'), sweep.get('stop'), sweep.get('step')
+            if not all(_is_number(v) for v in (start, stop, step)) or step <= 0 or stop < start:
+                return None, 'sweep需要提供start <= stop 和正数step'
+            # 包含stop，容忍浮点误差
+            count = int((stop - start) / step + 1e-9) + 1
+            if count * len(scenarios) > max_count:
+                return None, f'场景数量不能超过{max_count}'
+            sweep_values = [round(start + i * step, 10) for i in range(count)]
+        
+        if len(sweep_values) * len(scenarios) > max_count:
+            return None, f'场景数量不能超过{max_count}'
+        scenarios = [
+            {'label': scenario['label'], 'overrides': dict(scenario['overrides'], **{feature: float(value)})}
+            for scenario in scenarios
+            for value in sweep_values
+        ]
+    
+    if not scenarios:
+        return None, '场景不能为空'
+    return scenarios, None
@@ -0,0 +1,37 @@
+from models import db, TableVersion
+from sqlalchemy.exc import IntegrityError
+
+
+def bump_version(name):
+    """递增数据表版本号并返回新版本号（不提交事务，与业务数据在同一事务中提交）
+
+    UPDATE会锁住版本号所在的行直到事务提交，同一数据表的写事务按版本号顺序提交。
+    """
+    table = TableVersion.__table__
+    increment = table.update().where(table.c.name == name).values(
+        version=table.c.version + 1
+    ).returning(table.c.version)
+    version = db.session.execute(increment).scalar()
+    if version is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(name=name, version=1))
+            version = 1
+        except IntegrityError:
+            # 并发请求已插入该行
+            version = db.session.execute(increment).scalar()
+    return version
+
+
+def get_version(name):
+    """获取数据表当前版本号"""
+    return db.session.query(TableVersion.version).filter(TableVersion.name == name).scalar() or 0
+
+
+def get_versions(names):
+    """一次查询获取多个数据表的版本号"""
+    rows = db.session.query(TableVersion.name, TableVersion.version).filter(
+        TableVersion.name.in_(names)
+    ).all()
+    versions = dict(rows)
+    return tuple(versions.get(name, 0) for name in names)
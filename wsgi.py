@@ -0,0 +1,12 @@
+"""WSGI入口
+
+gunicorn -w 4 --threads 8 -b 0.0.0.0:5000 wsgi:app
+waitress-serve --threads 8 --port 5000 wsgi:app
+
+应用按每个进程8个线程限制事件流连接数（WEB_THREADS，默认8），--threads不是8时需设置
+WEB_THREADS与之一致，或者使用会自动设置的 serve.py。
+每个工作进程导入时调用一次create_app，定时任务只在选举出的一个进程中运行。
+"""
+from app import create_app
+
+app = application = create_app()